@@ -0,0 +1,406 @@
+"""
+Admission control in front of the OpenAI call.
+
+Two gates, both answered in microseconds so that overload is turned away
+with a fast 429 instead of queueing inside the app:
+
+- a token bucket per client IP on the chat endpoints, so one client cannot
+  burn the OpenAI rate limit for everyone
+- a global cap on upstream calls in flight, with a short bounded queue in
+  front of it; callers that do not get a slot within the queue timeout (or
+  find the queue full) are rejected
+
+State lives in a store: in-process for a single worker, or SQLite so every
+gunicorn worker on the host shares the same buckets and in-flight count.
+"""
+
+import asyncio
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """The request was turned away; retry_after is in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def client_key(remote_addr, forwarded_for=None, trusted_proxies=1):
+    """The client IP as seen by the outermost trusted proxy.
+
+    Each proxy appends the peer it saw to X-Forwarded-For, so with N trusted
+    proxies (Heroku's router is one) the client is the Nth entry from the
+    end; anything before it can be forged by the client.
+    """
+    if trusted_proxies > 0 and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+        if hops:
+            return hops[-min(trusted_proxies, len(hops))]
+    return remote_addr or 'unknown'
+
+
+def _refill(tokens, updated, now, rate, burst):
+    if tokens is None:
+        return burst
+    return min(burst, tokens + max(0.0, now - updated) * rate)
+
+
+def _spend(tokens, cost, rate, burst):
+    """Return (tokens left, seconds to wait) for a request costing `cost` tokens.
+
+    A cost larger than the bucket can never be covered, so it is let through
+    once the bucket is full and the rest is charged as debt: the bucket goes
+    negative and the client waits cost/rate seconds before its next request,
+    the same as if it had sent the messages one by one.
+    """
+    needed = min(cost, burst)
+    if tokens < needed:
+        return tokens, (needed - tokens) / rate
+    return tokens - cost, 0.0
+
+
+class MemoryAdmissionStore:
+    """Buckets and in-flight counts for a single worker process."""
+
+    def __init__(self, max_clients=10000):
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._in_flight = 0
+        self._waiting = 0
+        self._leases = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def take(self, key, cost, rate, burst):
+        """Spend `cost` tokens; return 0 if allowed, else seconds until they are available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (None, now))
+            tokens, wait = _spend(_refill(tokens, updated, now, rate, burst), cost, rate, burst)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def try_acquire(self, max_in_flight, lease_ttl):
+        with self._lock:
+            if self._in_flight >= max_in_flight:
+                return None
+            self._in_flight += 1
+            return next(self._leases)
+
+    def release(self, lease):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+
+    def enter_queue(self, queue_size, ttl):
+        with self._lock:
+            if self._waiting >= queue_size:
+                return None
+            self._waiting += 1
+            return True
+
+    def leave_queue(self, ticket):
+        with self._lock:
+            self._waiting = max(0, self._waiting - 1)
+
+    def counts(self):
+        return {'in_flight': self._in_flight, 'waiting': self._waiting, 'clients': len(self._buckets)}
+
+
+class SQLiteAdmissionStore(SQLiteStore):
+    """Buckets and in-flight leases shared by every worker on the same host.
+
+    Leases expire after lease_ttl so a worker that dies mid-call cannot leak
+    capacity forever.
+    """
+
+    PURGE_EVERY = 256
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._takes = itertools.count()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS upstream_leases ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def take(self, key, cost, rate, burst):
+        # Wall-clock time, since buckets are shared between processes
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(row[0], row[1], now, rate, burst) if row else burst
+            tokens, wait = _spend(tokens, cost, rate, burst)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens, now)
+            )
+            if next(self._takes) % self.PURGE_EVERY == 0:
+                # A bucket that has refilled since it was last touched is full again; forget it
+                conn.execute("DELETE FROM rate_buckets WHERE updated + (? - tokens) / ? < ?", (burst, rate, now))
+        return wait
+
+    def _try_insert(self, kind, limit, ttl):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM upstream_leases WHERE expires_at <= ?", (now,))
+            count = conn.execute("SELECT COUNT(*) FROM upstream_leases WHERE kind = ?", (kind,)).fetchone()[0]
+            if count >= limit:
+                return None
+            return conn.execute(
+                "INSERT INTO upstream_leases (kind, expires_at) VALUES (?, ?)", (kind, now + ttl)
+            ).lastrowid
+
+    def _delete(self, row_id):
+        self._connect().execute("DELETE FROM upstream_leases WHERE id = ?", (row_id,))
+
+    def try_acquire(self, max_in_flight, lease_ttl):
+        return self._try_insert('slot', max_in_flight, lease_ttl)
+
+    def release(self, lease):
+        self._delete(lease)
+
+    def enter_queue(self, queue_size, ttl):
+        return self._try_insert('queue', queue_size, ttl)
+
+    def leave_queue(self, ticket):
+        self._delete(ticket)
+
+    def counts(self):
+        conn = self._connect()
+        now = time.time()
+        rows = dict(conn.execute(
+            "SELECT kind, COUNT(*) FROM upstream_leases WHERE expires_at > ? GROUP BY kind", (now,)
+        ).fetchall())
+        clients = conn.execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+        return {'in_flight': rows.get('slot', 0), 'waiting': rows.get('queue', 0), 'clients': clients}
+
+
+class AdmissionController:
+    """Per-client token buckets plus a global in-flight cap with a bounded queue.
+
+    rate: tokens per second refilled per client (0 disables rate limiting)
+    burst: bucket size, i.e. requests a client may make back to back
+    max_in_flight: upstream calls allowed at once (0 disables the cap)
+    queue_size: callers allowed to wait for a slot; the rest are rejected at once
+    queue_timeout: longest a caller waits for a slot
+    lease_ttl: seconds after which a slot held by a crashed worker is reclaimed
+    trusted_proxies: proxies in front of the app that append to X-Forwarded-For
+    """
+
+    POLL_INTERVAL = 0.01
+
+    def __init__(self, store, rate=0.5, burst=10, max_in_flight=8, queue_size=16,
+                 queue_timeout=2.0, lease_ttl=120.0, trusted_proxies=1):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.lease_ttl = lease_ttl
+        self.trusted_proxies = trusted_proxies
+        self.rate_limited = 0
+        self.overloaded = 0
+        self._lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def client(self, remote_addr, forwarded_for=None):
+        return client_key(remote_addr, forwarded_for, self.trusted_proxies)
+
+    def check_rate(self, client, cost=1):
+        """Raise AdmissionRejected if `client` is over its rate limit."""
+        if self.rate <= 0:
+            return
+        wait = self.store.take(client, cost, self.rate, self.burst)
+        if wait:
+            self._count('rate_limited')
+            logger.warning(f"Rate limited client {client} for {wait:.1f}s")
+            raise AdmissionRejected("Too many requests. Please slow down.", math.ceil(wait))
+
+    def _overloaded(self):
+        self._count('overloaded')
+        logger.warning("Rejecting request: upstream capacity and queue are full")
+        return AdmissionRejected("Service is at capacity. Please try again shortly.", 1)
+
+    def _enter_queue(self):
+        if self.queue_size <= 0:
+            return None
+        return self.store.enter_queue(self.queue_size, self.queue_timeout + 1)
+
+    def acquire(self):
+        """Return a lease on an upstream slot, waiting up to queue_timeout for one."""
+        if self.max_in_flight <= 0:
+            return None
+        lease = self.store.try_acquire(self.max_in_flight, self.lease_ttl)
+        if lease is not None:
+            return lease
+        ticket = self._enter_queue()
+        if ticket is None:
+            raise self._overloaded()
+        try:
+            deadline = time.monotonic() + self.queue_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.POLL_INTERVAL)
+                lease = self.store.try_acquire(self.max_in_flight, self.lease_ttl)
+                if lease is not None:
+                    return lease
+        finally:
+            self.store.leave_queue(ticket)
+        raise self._overloaded()
+
+    async def async_acquire(self):
+        """Async twin of acquire; waits without blocking the event loop.
+
+        Store calls run in a worker thread, since the SQLite store may wait
+        up to its busy timeout for another process's transaction.
+        """
+        if self.max_in_flight <= 0:
+            return None
+        lease = await self._async_try_acquire()
+        if lease is not None:
+            return lease
+        ticket = await asyncio.to_thread(self._enter_queue)
+        if ticket is None:
+            raise self._overloaded()
+        try:
+            deadline = time.monotonic() + self.queue_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.POLL_INTERVAL)
+                lease = await self._async_try_acquire()
+                if lease is not None:
+                    return lease
+        finally:
+            await asyncio.to_thread(self.store.leave_queue, ticket)
+        raise self._overloaded()
+
+    async def _async_try_acquire(self):
+        attempt = asyncio.ensure_future(
+            asyncio.to_thread(self.store.try_acquire, self.max_in_flight, self.lease_ttl)
+        )
+        try:
+            return await asyncio.shield(attempt)
+        except asyncio.CancelledError:
+            # The thread runs on after the caller is cancelled and may still be granted a slot
+            attempt.add_done_callback(self._release_abandoned)
+            raise
+
+    def _release_abandoned(self, attempt):
+        if attempt.cancelled() or attempt.exception() is not None or attempt.result() is None:
+            return
+        asyncio.get_running_loop().run_in_executor(None, self.release, attempt.result())
+
+    def release(self, lease):
+        if lease is None:
+            return
+        try:
+            self.store.release(lease)
+        except Exception as e:
+            # The lease expires on its own; never fail a request over bookkeeping
+            logger.warning(f"Could not release upstream slot: {str(e)}")
+
+    @contextmanager
+    def upstream_slot(self):
+        lease = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(lease)
+
+    async def async_release(self, lease):
+        if lease is not None:
+            # Shielded so a caller cancelled while releasing still gives the slot back
+            await asyncio.shield(asyncio.to_thread(self.release, lease))
+
+    @asynccontextmanager
+    async def async_upstream_slot(self):
+        lease = await self.async_acquire()
+        try:
+            yield
+        finally:
+            await self.async_release(lease)
+
+    def hold_until_exhausted(self, iterator, lease):
+        """Keep a streaming call's slot until its chunks are consumed."""
+        try:
+            yield from iterator
+        finally:
+            self.release(lease)
+
+    async def async_hold_until_exhausted(self, iterator, lease):
+        try:
+            async for item in iterator:
+                yield item
+        finally:
+            await self.async_release(lease)
+
+    def stats(self):
+        try:
+            counts = self.store.counts()
+        except Exception as e:
+            logger.warning(f"Admission stats unavailable: {str(e)}")
+            counts = {}
+        return {
+            'backend': type(self.store).__name__,
+            'rate_limited': self.rate_limited,
+            'overloaded': self.overloaded,
+            'max_in_flight': self.max_in_flight,
+            **counts
+        }
+
+
+def create_admission_from_env():
+    """Build the admission controller from ADMISSION_* settings, or None if disabled."""
+    backend_name = os.getenv('ADMISSION_BACKEND', 'memory').lower()
+    if backend_name in ('off', 'none', 'disabled'):
+        return None
+    if backend_name == 'sqlite':
+        store = SQLiteAdmissionStore(os.getenv('ADMISSION_PATH', 'admission.sqlite3'))
+    elif backend_name == 'memory':
+        store = MemoryAdmissionStore()
+    else:
+        raise ValueError(f"Unknown ADMISSION_BACKEND: {backend_name}")
+
+    return AdmissionController(
+        store,
+        rate=float(os.getenv('RATE_LIMIT_RATE', 0.5)),
+        burst=float(os.getenv('RATE_LIMIT_BURST', 10)),
+        max_in_flight=int(os.getenv('UPSTREAM_MAX_IN_FLIGHT', 8)),
+        queue_size=int(os.getenv('UPSTREAM_QUEUE_SIZE', 16)),
+        queue_timeout=float(os.getenv('UPSTREAM_QUEUE_TIMEOUT', 2.0)),
+        trusted_proxies=int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', 1))
+    )
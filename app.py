@@ -1,19 +1,47 @@
-from flask import Flask, request, jsonify, redirect
+from flask import Flask, Response, request, jsonify, redirect, stream_with_context
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
-import openai
 import logging
-from functools import wraps
 import time
-import traceback
 import json
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from cache import create_cache_from_env, make_cache_key
+from semantic_cache import create_semantic_cache_from_env
+from singleflight import create_single_flight_from_env
+from intent_router import create_intent_router_from_env
+from retrieval import create_retriever_from_env
+from knowledge import create_knowledge_store_from_env
+from sessions import create_session_store_from_env, validate_session_id
+from static_responses import PrecomputedResponse
+from batch import (
+    BatchError,
+    create_batch_settings_from_env,
+    fan_out,
+    item_result,
+    ordered_results,
+    parse_batch,
+    run_batch,
+)
+from admission import AdmissionRejected, create_admission_from_env
+from metrics import count_attempts, create_metrics_from_env
+from upstream import create_upstream_client_from_env
+from tiering import create_tier_policy_from_env
+from structured_logging import (
+    LoggedStage,
+    configure_logging,
+    create_request_logger_from_env,
+    current_request_id,
+    note,
+)
+from resilience import (
+    CircuitOpenError,
+    call_with_retries,
+    create_circuit_breaker_from_env,
+    create_retry_policy_from_env,
 )
+
+# Configure logging (see structured_logging.py for LOG_* settings)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -38,197 +66,483 @@ CORS(app,
      max_age=3600)
 
 # Configure OpenAI
-openai.api_key = os.getenv('OPENAI_API_KEY')
-if not openai.api_key:
+if not os.getenv('OPENAI_API_KEY'):
     logger.error("OpenAI API key is not set in environment variables")
+# One pooled, kept-alive HTTP client per worker, pointed at OPENAI_API_BASE (see upstream.py).
+# The openai module itself is imported on the first upstream call, or by warm_up().
+upstream = create_upstream_client_from_env()
 
-# Manuel David's Knowledge Base
-MANUEL_KNOWLEDGE = {
-    "personal_info": {
-        "name": "Manuel David",
-        "title": "Software Developer & AI Engineer",
-        "experience": "2+ years",
-        "location": "Atlanta, GA",
-        "email": "manueldavid500@gmail.com",
-        "phone": "(479) 250-8678",
-        "website": "nouvo.dev",
-        "company": "Nouvo.dev (Founder)"
-    },
-    "summary": {
-        "overview": "Results-driven Software Developer & AI Engineer with 2+ years of experience architecting and deploying high-performance, full-stack applications and AI-driven web solutions. Proven ability to lead technical initiatives and deliver measurable business outcomes.",
-        "specialization": "Specialized in React, Python, and AI APIs including OpenAI and Eleven Labs to automate workflows, power intelligent chatbots, and scale SaaS platforms.",
-        "expertise": "Demonstrated expertise in delivering clean, maintainable code and innovative client-facing solutions that drive user engagement and business growth.",
-        "goal": "Seeking senior software engineering roles that leverage AI and full-stack development expertise to drive organizational transformation and technological innovation."
-    },
-    "projects": {
-        "resume_site_ai": {
-            "name": "Resume Site AI",
-            "description": "An intelligent portfolio site featuring a smart Q&A agent that dynamically answers questions about experience using NLP and contextual matching from resume content.",
-            "technologies": ["React", "OpenAI API", "Python", "Natural Language Processing", "Firebase"],
-            "status": "Live",
-            "features": [
-                "Natural language Q&A assistant",
-                "Personalized content responses", 
-                "Dynamic resume parsing and matching",
-                "Clean, mobile-friendly UI"
-            ],
-            "challenges_solved": [
-                "Interpreting vague questions - solved with fallback prompts and intent clarification",
-                "Structuring resume data for NLP - created tagging system for roles, skills, and achievements"
-            ]
-        },
-        "cold_email_saas": {
-            "name": "Cold Email SaaS",
-            "description": "A platform that automates cold email campaigns by combining OpenAI-generated copy with BillionMail's SMTP/domain management system for seamless outreach.",
-            "technologies": ["Node.js", "OpenAI", "BillionMail", "React", "Firebase"],
-            "status": "Live",
-            "features": [
-                "AI-written cold email sequences",
-                "Automated inbox/domain warm-up",
-                "Campaign scheduling and analytics",
-                "Lead segmentation and filters"
-            ],
-            "challenges_solved": [
-                "Deliverability and compliance - used BillionMail's warm-up and rotation tools",
-                "Dynamic message personalization - created input templates and personas for scalable customization"
-            ]
-        },
-        "therapist_ai": {
-            "name": "Therapist AI",
-            "description": "A voice-based AI mental health assistant that engages in empathetic, therapeutic conversations, using natural dialogue and emotional nuance.",
-            "technologies": ["Python", "OpenAI API", "Eleven Labs", "Firebase"],
-            "status": "Prototype",
-            "features": [
-                "Conversational voice interaction",
-                "Topic memory across sessions",
-                "Emotion-aware response tuning",
-                "Safe-mode for mental health conversations"
-            ],
-            "challenges_solved": [
-                "Ensuring ethical responses - embedded OpenAI's moderation API + post-processing filters",
-                "Natural voice cadence - preprocessed responses with timing metadata"
-            ]
-        },
-        "nouvo_platform": {
-            "name": "Nouvo.dev Platform",
-            "description": "An all-in-one AI agency platform that automates service onboarding, client engagement, and task delivery through chatbot and workflow logic.",
-            "technologies": ["React", "OpenAI + External APIs", "Firebase", "Zoho", "Calendly", "Slack API", "Heroku"],
-            "status": "Live",
-            "features": [
-                "Dynamic onboarding flows",
-                "Embedded service catalog",
-                "Custom AI chatbot assistant",
-                "Third-party integrations (Calendly, Zoho, Slack)"
-            ],
-            "challenges_solved": [
-                "Automating diverse services - used schema-driven onboarding logic",
-                "Client communications sync - integrated Slack bot alerts and Zoho inbox routing"
-            ]
-        },
-        "popup_drink_website": {
-            "name": "Business Website (Pop Up)",
-            "description": "An interactive beverage brand site that uses AI to recommend drinks based on user taste, vibe, or event — combining e-commerce with AI-powered engagement.",
-            "technologies": ["React", "OpenAI", "Firebase", "Custom CSS Animations"],
-            "status": "Live",
-            "features": [
-                "AI drink recommendation tool",
-                "Taste quiz with GPT integration",
-                "Real-time product filters",
-                "Clean e-commerce flow"
-            ],
-            "challenges_solved": [
-                "Mapping AI suggestions to real products - built matching layer using categories and tags",
-                "Optimizing performance on mobile - lazy-loaded assets and used Lottie for lightweight animations"
-            ]
-        },
-        "business_websites": {
-            "name": "Business Websites Portfolio",
-            "description": "A growing collection of modern, mobile-first websites for brands in fashion, tech, and services — customized for performance, design, and interactivity.",
-            "technologies": ["React", "Webflow", "Firebase", "TailwindCSS", "Stripe"],
-            "status": "Live",
-            "features": [
-                "Unique client branding",
-                "Responsive design and UX flows",
-                "Integrated e-commerce features",
-                "SEO and performance optimized"
-            ],
-            "challenges_solved": [
-                "Custom designs at scale - created reusable design system with components",
-                "Client non-technical handoff - built admin panels and site documentation"
-            ]
-        }
-    },
-    "skills": {
-        "frontend": ["React", "Next.js", "TypeScript", "JavaScript", "TailwindCSS", "HTML5", "CSS3"],
-        "backend": ["Python", "Node.js", "Flask", "Express.js", "Firebase Functions"],
-        "ai_ml": ["OpenAI API", "Eleven Labs", "Natural Language Processing", "AI Integration", "Prompt Engineering"],
-        "databases": ["Firebase", "MongoDB", "PostgreSQL", "Firestore"],
-        "tools": ["Git", "GitHub", "Heroku", "Vercel", "Webflow", "Figma"],
-        "other": ["RESTful APIs", "Responsive Design", "SEO Optimization", "Performance Optimization"]
-    },
-    "metrics": {
-        "years_experience": "2+",
-        "websites_delivered": "12+", 
-        "ai_projects": "5",
-        "companies_founded": "1",
-        "client_satisfaction": "100%"
-    }
+# Cache answers to repeated questions (see cache.py for RESPONSE_CACHE_* settings)
+response_cache = create_cache_from_env()
+# Paraphrase tier behind the exact cache (see semantic_cache.py for SEMANTIC_CACHE_* settings)
+semantic_cache = create_semantic_cache_from_env()
+# Concurrent identical questions share one upstream call (see singleflight.py)
+single_flight = create_single_flight_from_env()
+# Conversation history for multi-turn chat (see sessions.py for SESSIONS_* settings)
+sessions = create_session_store_from_env()
+
+# Backoff, deadline and circuit breaker for upstream calls (see resilience.py)
+retry_policy = create_retry_policy_from_env()
+circuit_breaker = create_circuit_breaker_from_env()
+# Per-client rate limits and a cap on in-flight upstream calls (see admission.py)
+admission = create_admission_from_env()
+# Model and max_tokens per question, stepping down when a tier is over budget (see tiering.py)
+model_tiers = create_tier_policy_from_env()
+
+# Per-stage latency histograms and pipeline counters, served at /metrics (see metrics.py)
+metrics = create_metrics_from_env()
+request_seconds = metrics.histogram(
+    'chatbot_request_seconds', 'Time spent in the request handler by route', ('route',)
+)
+requests_total = metrics.counter('chatbot_requests_total', 'Responses by route and status code', ('route', 'status'))
+stage_seconds = metrics.histogram(
+    'chatbot_stage_seconds',
+    'Time spent in each stage of answering a question; upstream includes retries and backoff',
+    ('stage',)
+)
+cache_lookups = metrics.counter(
+    'chatbot_cache_lookups_total', 'Local answer lookups by result (intent, exact, semantic or miss)', ('result',)
+)
+upstream_retries = metrics.counter('chatbot_upstream_retries_total', 'Upstream attempts after the first')
+upstream_errors = metrics.counter(
+    'chatbot_upstream_errors_total', 'Failed upstream attempts by exception type', ('type',)
+)
+upstream_tokens = metrics.counter(
+    'chatbot_upstream_tokens_total', 'Tokens billed as reported by the OpenAI API', ('kind',)
+)
+model_tier_requests = metrics.counter(
+    'chatbot_model_tier_requests_total', 'Upstream calls by model tier', ('tier',)
+)
+model_tier_fallbacks = metrics.counter(
+    'chatbot_model_tier_fallbacks_total', 'Questions sent to a faster tier because theirs was over budget', ('tier',)
+)
+# Bound once, so timing a stage on the hot path is two clock reads and an observe
+stages = {
+    stage: stage_seconds.labels(stage)
+    for stage in ('validate', 'cache_lookup', 'prompt_build', 'admission_wait', 'upstream',
+                  'upstream_attempt', 'serialize')
 }
+# One JSON line per request with its stage timings, when LOG_FORMAT=json
+request_log = create_request_logger_from_env()
+if request_log is not None:
+    stages = {stage: LoggedStage(stage, child) for stage, child in stages.items()}
 
-def create_system_prompt():
+SYSTEM_PROMPT_INSTRUCTIONS = """INSTRUCTIONS:
+1. Answer questions about Manuel David based ONLY on the knowledge provided above
+2. Be conversational, professional, and enthusiastic about Manuel's work
+3. If asked about something not in your knowledge base, respond with: "I'm sorry, I don't have that specific information about Manuel in my knowledge base. You can contact him directly at manueldavid500@gmail.com for more details."
+4. When discussing projects, be specific about technologies, features, and challenges solved
+5. Always represent Manuel in a professional and positive manner
+6. If asked about contact information, provide his email and phone number
+7. Keep responses concise but informative (2-3 paragraphs max unless specifically asked for more detail)
+"""
+
+def compile_system_prompt(knowledge):
     return f"""You are an AI assistant representing Manuel David, a Software Developer & AI Engineer. 
 
 Your knowledge about Manuel includes:
 
 PERSONAL INFO:
-- Name: {MANUEL_KNOWLEDGE['personal_info']['name']}
-- Title: {MANUEL_KNOWLEDGE['personal_info']['title']}
-- Experience: {MANUEL_KNOWLEDGE['personal_info']['experience']}
-- Location: {MANUEL_KNOWLEDGE['personal_info']['location']}
-- Email: {MANUEL_KNOWLEDGE['personal_info']['email']}
-- Phone: {MANUEL_KNOWLEDGE['personal_info']['phone']}
-- Website: {MANUEL_KNOWLEDGE['personal_info']['website']}
-- Company: {MANUEL_KNOWLEDGE['personal_info']['company']}
+- Name: {knowledge['personal_info']['name']}
+- Title: {knowledge['personal_info']['title']}
+- Experience: {knowledge['personal_info']['experience']}
+- Location: {knowledge['personal_info']['location']}
+- Email: {knowledge['personal_info']['email']}
+- Phone: {knowledge['personal_info']['phone']}
+- Website: {knowledge['personal_info']['website']}
+- Company: {knowledge['personal_info']['company']}
 
 PROFESSIONAL SUMMARY:
-{MANUEL_KNOWLEDGE['summary']['overview']} {MANUEL_KNOWLEDGE['summary']['specialization']} {MANUEL_KNOWLEDGE['summary']['expertise']} {MANUEL_KNOWLEDGE['summary']['goal']}
+{knowledge['summary']['overview']} {knowledge['summary']['specialization']} {knowledge['summary']['expertise']} {knowledge['summary']['goal']}
 
 PROJECTS:
-{json.dumps(MANUEL_KNOWLEDGE['projects'], indent=2)}
+{json.dumps(knowledge['projects'], indent=2)}
 
 SKILLS:
-{json.dumps(MANUEL_KNOWLEDGE['skills'], indent=2)}
+{json.dumps(knowledge['skills'], indent=2)}
 
 METRICS:
-{json.dumps(MANUEL_KNOWLEDGE['metrics'], indent=2)}
+{json.dumps(knowledge['metrics'], indent=2)}
 
-INSTRUCTIONS:
-1. Answer questions about Manuel David based ONLY on the knowledge provided above
-2. Be conversational, professional, and enthusiastic about Manuel's work
-3. If asked about something not in your knowledge base, respond with: "I'm sorry, I don't have that specific information about Manuel in my knowledge base. You can contact him directly at manueldavid500@gmail.com for more details."
-4. When discussing projects, be specific about technologies, features, and challenges solved
-5. Always represent Manuel in a professional and positive manner
-6. If asked about contact information, provide his email and phone number
-7. Keep responses concise but informative (2-3 paragraphs max unless specifically asked for more detail)
-"""
+{SYSTEM_PROMPT_INSTRUCTIONS}"""
+
+def build_knowledge_summary(knowledge):
+    return {
+        'status': 'success',
+        'data': {
+            'name': knowledge['personal_info']['name'],
+            'title': knowledge['personal_info']['title'],
+            'projects_count': len(knowledge['projects']),
+            'skills_categories': list(knowledge['skills'].keys()),
+            'contact': {
+                'email': knowledge['personal_info']['email'],
+                'website': knowledge['personal_info']['website']
+            }
+        }
+    }
+
+def build_knowledge_views(knowledge):
+    """Everything derived from one knowledge version, computed once per reload."""
+    return {
+        'system_prompt': compile_system_prompt(knowledge),
+        'summary_response': PrecomputedResponse(
+            build_knowledge_summary(knowledge),
+            cache_control=f"public, max-age={os.getenv('KNOWLEDGE_CACHE_MAX_AGE', 60)}"
+        ),
+        # Answers structured questions straight from the knowledge base (see intent_router.py)
+        'intent_router': create_intent_router_from_env(knowledge),
+        # Sends only the knowledge sections relevant to each question (see retrieval.py)
+        'retriever': create_retriever_from_env(knowledge, SYSTEM_PROMPT_INSTRUCTIONS)
+    }
+
+# Manuel David's knowledge base, hot-reloaded from KNOWLEDGE_PATH (see knowledge.py).
+# Each request reads knowledge_store.current once and passes that snapshot down,
+# so a reload mid-request cannot mix one version's prompt with another's router.
+knowledge_store = create_knowledge_store_from_env(
+    build_knowledge_views,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge_base.json')
+)
+
+def create_system_prompt():
+    return knowledge_store.current.views['system_prompt']
+
+def get_local_response(user_message, knowledge):
+    """Answer without calling OpenAI: routed intent first, then the caches."""
+    start = time.perf_counter()
+    source, answer = find_local_response(user_message, knowledge)
+    stages['cache_lookup'].observe(time.perf_counter() - start)
+    cache_lookups.labels(source).inc()
+    note('cache', source)
+    return answer
+
+def find_local_response(user_message, knowledge):
+    """Return (source, answer); answer is None on a miss."""
+    intent_router = knowledge.views['intent_router']
+    if intent_router is not None:
+        route = intent_router.route(user_message)
+        if route is not None:
+            logger.info("Answered locally by intent router (%s)", route.intent)
+            return 'intent', route.answer
+    return get_cached_response(user_message, knowledge.views['system_prompt'])
+
+def get_cached_response(user_message, system_prompt):
+    if response_cache is not None:
+        cached_response = response_cache.get(user_message, system_prompt)
+        if cached_response is not None:
+            return 'exact', cached_response
+    if semantic_cache is not None:
+        cached_response = semantic_cache.get(user_message, system_prompt)
+        if cached_response is not None:
+            # Promote so the next identical question skips the vector lookup
+            if response_cache is not None:
+                response_cache.set(user_message, system_prompt, cached_response)
+            return 'semantic', cached_response
+    return 'miss', None
+
+def store_response(user_message, system_prompt, ai_response):
+    if response_cache is not None:
+        response_cache.set(user_message, system_prompt, ai_response)
+    if semantic_cache is not None:
+        semantic_cache.set(user_message, system_prompt, ai_response)
+
+def upstream_system_prompt(user_message, knowledge):
+    """The prompt actually sent upstream; caches keep keying on the full prompt."""
+    retriever = knowledge.views['retriever']
+    if retriever is None:
+        return knowledge.views['system_prompt']
+    return retriever.build_prompt(user_message)
+
+def retrieval_query(user_message, history=None):
+    """Follow-ups ("what tech did that one use?") need the previous exchange to find their sections."""
+    if not history:
+        return user_message
+    return ' '.join([turn['content'] for turn in history[-2:]] + [user_message])
+
+def build_chat_request(user_message, system_prompt, stream=False, history=None, tier=None, max_tokens=None):
+    tier = tier or model_tiers.default
+    return {
+        "model": tier.model,
+        "messages": [
+            {
+                "role": "system",
+                "content": system_prompt
+            },
+            *(history or []),
+            {
+                "role": "user",
+                "content": user_message
+            }
+        ],
+        "temperature": tier.temperature,
+        "max_tokens": max_tokens or tier.max_tokens,
+        "stream": stream
+    }
+
+def choose_tier(user_message, history=None):
+    """The TierChoice for this question, counted in /metrics and the request log."""
+    choice = model_tiers.choose(user_message, history)
+    model_tier_requests.labels(choice.tier.name).inc()
+    if choice.tier is not choice.preferred:
+        model_tier_fallbacks.labels(choice.preferred.name).inc()
+    note('tier', choice.tier.name)
+    return choice
+
+def translate_openai_error(e):
+    """Map OpenAI client errors onto the messages upstream_error_payload recognizes."""
+    if isinstance(e, CircuitOpenError):
+        logger.warning("Failing fast: circuit breaker is open")
+        return e
+    if isinstance(e, AdmissionRejected):
+        return e
+    openai = upstream.openai()
+    if isinstance(e, openai.error.AuthenticationError):
+        logger.error(f"OpenAI Authentication Error: {str(e)}")
+        return Exception("OpenAI API key is invalid or expired")
+    if isinstance(e, openai.error.RateLimitError):
+        logger.error(f"OpenAI Rate Limit Error: {str(e)}")
+        return Exception("OpenAI API rate limit exceeded")
+    if isinstance(e, openai.error.APIError):
+        logger.error(f"OpenAI API Error: {str(e)}")
+        return Exception("OpenAI API is currently experiencing issues")
+    logger.error("OpenAI API call failed: %s", e, exc_info=True)
+    return e
+
+def record_usage(response):
+    """Count the tokens OpenAI reports; streamed responses carry no usage."""
+    usage = response.get('usage')
+    if usage:
+        upstream_tokens.labels('prompt').inc(usage.get('prompt_tokens', 0))
+        upstream_tokens.labels('completion').inc(usage.get('completion_tokens', 0))
+
+def get_openai_response(user_message, knowledge, stream=False, deadline=None, history=None):
+    start = time.perf_counter()
+    choice = choose_tier(user_message, history)
+    chat_request = build_chat_request(
+        user_message,
+        upstream_system_prompt(retrieval_query(user_message, history), knowledge),
+        stream=stream,
+        history=history,
+        tier=choice.tier,
+        max_tokens=choice.max_tokens
+    )
+    stages['prompt_build'].observe(time.perf_counter() - start)
+    openai = upstream.openai()
+
+    def attempt(timeout):
+        logger.info("Attempting OpenAI API call")
+        return openai.ChatCompletion.create(
+            **chat_request,
+            request_timeout=upstream.request_timeout(timeout)
+        )
+
+    lease = None
+    try:
+        if not openai.api_key:
+            logger.error("OpenAI API key is not configured")
+            raise Exception("OpenAI API key is not configured")
+
+        if admission is not None:
+            with stages['admission_wait'].time():
+                lease = admission.acquire()
+        with stages['upstream'].time(), model_tiers.track(choice.tier, stream) as upstream_start:
+            response = call_with_retries(
+                count_attempts(attempt, stages['upstream_attempt'], upstream_retries, upstream_errors),
+                retry_policy, circuit_breaker, deadline=deadline
+            )
+        logger.info("OpenAI API call successful")
+    except Exception as e:
+        if admission is not None:
+            admission.release(lease)
+        raise translate_openai_error(e)
+
+    if stream:
+        # The call returned with the headers; the tier's sample is taken when the stream ends
+        response = model_tiers.watch(choice.tier, response, upstream_start)
+    if admission is None:
+        return response
+    if stream:
+        # The upstream connection stays busy until the last chunk is read
+        return admission.hold_until_exhausted(response, lease)
+    admission.release(lease)
+    return response
+
+def answer_question(user_message, knowledge, deadline=None, history=None):
+    """Answer without streaming. Returns (payload, status); upstream errors propagate."""
+    if history:
+        # Follow-ups depend on the conversation, so single-turn caches and coalescing do not apply
+        return fetch_answer(user_message, knowledge, deadline, history)
+
+    cached_response = get_local_response(user_message, knowledge)
+    if cached_response is not None:
+        logger.info("Serving response from cache")
+        return {
+            'response': cached_response,
+            'status': 'success'
+        }, 200
+
+    if single_flight is None:
+        return fetch_answer(user_message, knowledge, deadline)
+    # Identical questions already on their way upstream share that call
+    return single_flight.do(
+        make_cache_key(user_message, knowledge.views['system_prompt']),
+        lambda: fetch_answer(user_message, knowledge, deadline)
+    )
+
+def fetch_answer(user_message, knowledge, deadline=None, history=None):
+    """Ask the model and cache its answer. Returns (payload, status)."""
+    response = get_openai_response(user_message, knowledge, deadline=deadline, history=history)
+    logger.info("Successfully received OpenAI response")
+    record_usage(response)
+
+    if not response.choices or not response.choices[0].message.content:
+        logger.error("Empty response from OpenAI API")
+        return {
+            'error': 'Unable to generate response. Please try again.',
+            'details': 'Empty response from AI service'
+        }, 500
+
+    ai_response = response.choices[0].message.content
+    logger.info("Successfully generated response")
+    if not history:
+        store_response(user_message, knowledge.views['system_prompt'], ai_response)
+    return {
+        'response': ai_response,
+        'status': 'success'
+    }, 200
+
+def upstream_error_payload(e):
+    if isinstance(e, AdmissionRejected):
+        return {
+            'error': str(e),
+            'details': None
+        }, 429
+    logger.error(f"OpenAI API error: {str(e)}")
+    error_message = str(e)
+    if "API key" in error_message:
+        return {
+            'error': 'Service configuration error. Please contact support.',
+            'details': 'API key issue' if app.debug else None
+        }, 503
+    elif "rate limit" in error_message.lower():
+        return {
+            'error': 'Service is busy. Please try again in a few minutes.',
+            'details': 'Rate limit exceeded' if app.debug else None
+        }, 503
+    else:
+        return {
+            'error': 'AI service is temporarily unavailable. Please try again in a few minutes.',
+            'details': error_message if app.debug else None
+        }, 503
+
+def upstream_error_response(e):
+    payload, status = upstream_error_payload(e)
+    response = jsonify(payload)
+    if getattr(e, 'retry_after', None):
+        response.headers['Retry-After'] = str(e.retry_after)
+    return response, status
+
+def sse_event(payload, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+def read_session_id(data):
+    """Return (session_id or None, error message or None) for a chat request body."""
+    value = data.get('session_id')
+    if value is None or sessions is None:
+        return None, None
+    is_valid, result = validate_session_id(value)
+    return (result, None) if is_valid else (None, result)
+
+def session_history(session_id):
+    return sessions.history(session_id) if session_id else []
+
+def remember_turn(session_id, user_message, payload):
+    """Record a successful exchange in its session and echo the session_id back."""
+    if not session_id or payload.get('status') != 'success':
+        return payload
+    sessions.append(session_id, user_message, payload['response'])
+    return dict(payload, session_id=session_id)
+
+def stream_chat_response(user_message, session_id=None):
+    knowledge = knowledge_store.current
+    history = session_history(session_id)
+    cached_response = None if history else get_local_response(user_message, knowledge)
+    if cached_response is not None:
+        logger.info("Streaming response from cache")
+        deltas = iter([cached_response])
+    else:
+        # Errors raised before the first token keep the regular 503 mapping
+        try:
+            completion = get_openai_response(user_message, knowledge, stream=True, history=history)
+        except Exception as e:
+            return upstream_error_response(e)
+        deltas = (
+            chunk.choices[0].delta.get('content')
+            for chunk in completion
+            if chunk.choices
+        )
+
+    def generate():
+        parts = []
+        try:
+            for content in deltas:
+                if content:
+                    parts.append(content)
+                    yield sse_event({'delta': content})
+        except Exception as e:
+            logger.error(f"OpenAI stream interrupted: {str(e)}")
+            yield sse_event({
+                'error': 'AI service is temporarily unavailable. Please try again in a few minutes.',
+                'details': str(e) if app.debug else None
+            }, event='error')
+            return
+
+        ai_response = ''.join(parts)
+        if not ai_response:
+            logger.error("Empty response from OpenAI API")
+            yield sse_event({
+                'error': 'Unable to generate response. Please try again.',
+                'details': 'Empty response from AI service'
+            }, event='error')
+            return
 
-def retry_on_failure(max_retries=3, delay=1):
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            last_error = None
-            for attempt in range(max_retries):
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    last_error = e
-                    logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
-                    if attempt < max_retries - 1:
-                        time.sleep(delay)
-            logger.error(f"All {max_retries} attempts failed. Last error: {str(last_error)}")
-            raise last_error
-        return wrapper
-    return decorator
+        logger.info("Successfully streamed response")
+        if cached_response is None and not history:
+            store_response(user_message, knowledge.views['system_prompt'], ai_response)
+        yield sse_event(
+            remember_turn(session_id, user_message, {'response': ai_response, 'status': 'success'}),
+            event='done'
+        )
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+SERVICE_INFO = {
+    'status': 'Manuel David Portfolio Chatbot API',
+    'version': '1.0.0',
+    'description': 'AI assistant with knowledge about Manuel David\'s portfolio and experience'
+}
+
+SERVICE_INFO_RESPONSE = PrecomputedResponse(SERVICE_INFO, cache_control='public, max-age=3600')
+
+def health_payload():
+    return {
+        'status': 'healthy', 
+        'timestamp': time.time(),
+        'service': 'Manuel David Portfolio Chatbot',
+        'cache': response_cache.stats() if response_cache is not None else None,
+        'semantic_cache': semantic_cache.stats() if semantic_cache is not None else None,
+        'single_flight': single_flight.stats() if single_flight is not None else None,
+        'sessions': sessions.stats() if sessions is not None else None,
+        'circuit_breaker': circuit_breaker.stats(),
+        'admission': admission.stats() if admission is not None else None,
+        'upstream': upstream.describe(),
+        'model_tiers': model_tiers.stats(),
+        'knowledge': knowledge_store.stats()
+    }
 
 def validate_input(data):
     try:
@@ -255,13 +569,79 @@ def validate_input(data):
         logger.error(f"Error in validate_input: {str(e)}")
         return False, "Error validating input"
 
+@app.before_request
+def start_request_timer():
+    request.environ['chatbot.request_start'] = time.perf_counter()
+    if request_log is not None:
+        # Heroku's router sets X-Request-ID, which ties this line to its router log
+        request_log.begin(request.headers.get('X-Request-ID'))
+
+def finish_request(method, route, status, start):
+    """Count and log a finished request; returns its request id if it was logged."""
+    request_seconds.labels(route).observe(time.perf_counter() - start)
+    requests_total.labels(route, str(status)).inc()
+    request_id = request_log.finish(method, route, status) if request_log is not None else None
+    metrics.maybe_flush()
+    return request_id
+
+@app.after_request
+def record_request_metrics(response):
+    # Each access through the request proxy costs about a microsecond, so resolve it once
+    current = request._get_current_object()
+    start = current.environ.pop('chatbot.request_start', None)
+    if start is None:
+        metrics.maybe_flush()
+        return response
+    # The URL rule, not the path, so unknown paths cannot blow up label cardinality
+    route = current.url_rule.rule if current.url_rule is not None else 'unmatched'
+    if response.is_streamed:
+        # The body is generated after this hook returns; finish once the server has sent it
+        request_id = current_request_id()
+        if request_id is not None:
+            response.headers['X-Request-ID'] = request_id
+        method, status = current.method, response.status_code
+        response.call_on_close(lambda: finish_request(method, route, status, start))
+        return response
+    request_id = finish_request(current.method, route, response.status_code, start)
+    if request_id is not None:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+@app.before_request
+def reload_knowledge():
+    knowledge_store.maybe_reload()
+
+RATE_LIMITED_PATHS = ('/api/chat', '/api/chat/stream', '/api/chat/batch')
+
+def rate_limit_cost(path, data):
+    """A batch costs one token per message, so it cannot bypass the per-client limit."""
+    if path == '/api/chat/batch' and isinstance(data, dict) and isinstance(data.get('messages'), list):
+        return max(1, len(data['messages']))
+    return 1
+
+@app.before_request
+def check_rate_limit():
+    if admission is None or request.method != 'POST' or request.path not in RATE_LIMITED_PATHS:
+        return None
+    client = admission.client(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    try:
+        admission.check_rate(client, rate_limit_cost(request.path, request.get_json(silent=True)))
+    except AdmissionRejected as e:
+        return upstream_error_response(e)
+    return None
+
+def precomputed_response(precomputed):
+    status, body, headers = precomputed.render(
+        request.headers.get('If-None-Match'),
+        request.headers.get('Accept-Encoding')
+    )
+    # CORS headers differ per Origin, so shared caches must key on it too
+    headers['Vary'] = f"{headers['Vary']}, Origin" if 'Vary' in headers else 'Origin'
+    return Response(body, status=status, headers=headers)
+
 @app.route('/', methods=['GET'])
 def root():
-    return jsonify({
-        'status': 'Manuel David Portfolio Chatbot API',
-        'version': '1.0.0',
-        'description': 'AI assistant with knowledge about Manuel David\'s portfolio and experience'
-    }), 200
+    return precomputed_response(SERVICE_INFO_RESPONSE)
 
 @app.route('/api/chat', methods=['POST', 'OPTIONS'])
 def chat():
@@ -272,95 +652,128 @@ def chat():
 
     try:
         logger.info("Received chat request")
-        data = request.get_json()
-        logger.debug(f"Request data: {data}")
-        
+        start = time.perf_counter()
+        data = request.get_json(silent=True)
         is_valid, result = validate_input(data)
+        stages['validate'].observe(time.perf_counter() - start)
+        logger.debug("Request data: %s", data)
+
         if not is_valid:
             logger.warning(f"Invalid input: {result}")
             return jsonify({'error': result}), 400
 
         user_message = result
-        logger.info(f"Processing message: {user_message[:50]}...")
-
-        @retry_on_failure(max_retries=3, delay=1)
-        def get_openai_response():
-            try:
-                logger.info("Attempting OpenAI API call")
-                if not openai.api_key:
-                    logger.error("OpenAI API key is not configured")
-                    raise Exception("OpenAI API key is not configured")
-                
-                response = openai.ChatCompletion.create(
-                    model="gpt-4",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": create_system_prompt()
-                        },
-                        {
-                            "role": "user",
-                            "content": user_message
-                        }
-                    ],
-                    temperature=0.7,
-                    max_tokens=500
-                )
-                logger.info("OpenAI API call successful")
-                return response
-            except openai.error.AuthenticationError as e:
-                logger.error(f"OpenAI Authentication Error: {str(e)}")
-                raise Exception("OpenAI API key is invalid or expired")
-            except openai.error.RateLimitError as e:
-                logger.error(f"OpenAI Rate Limit Error: {str(e)}")
-                raise Exception("OpenAI API rate limit exceeded")
-            except openai.error.APIError as e:
-                logger.error(f"OpenAI API Error: {str(e)}")
-                raise Exception("OpenAI API is currently experiencing issues")
-            except Exception as e:
-                logger.error(f"OpenAI API call failed: {str(e)}")
-                logger.error(f"Traceback: {traceback.format_exc()}")
-                raise
+        logger.info("Processing message: %.50s...", user_message)
+
+        session_id, error = read_session_id(data)
+        if error:
+            logger.warning(f"Invalid input: {error}")
+            return jsonify({'error': error}), 400
+
+        if data.get('stream') is True:
+            return stream_chat_response(user_message, session_id)
 
         try:
-            response = get_openai_response()
-            logger.info("Successfully received OpenAI response")
+            payload, status = answer_question(
+                user_message, knowledge_store.current, history=session_history(session_id)
+            )
         except Exception as e:
-            logger.error(f"OpenAI API error: {str(e)}")
-            error_message = str(e)
-            if "API key" in error_message:
-                return jsonify({
-                    'error': 'Service configuration error. Please contact support.',
-                    'details': 'API key issue' if app.debug else None
-                }), 503
-            elif "rate limit" in error_message.lower():
-                return jsonify({
-                    'error': 'Service is busy. Please try again in a few minutes.',
-                    'details': 'Rate limit exceeded' if app.debug else None
-                }), 503
-            else:
-                return jsonify({
-                    'error': 'AI service is temporarily unavailable. Please try again in a few minutes.',
-                    'details': error_message if app.debug else None
-                }), 503
-
-        if not response.choices or not response.choices[0].message.content:
-            logger.error("Empty response from OpenAI API")
-            return jsonify({
-                'error': 'Unable to generate response. Please try again.',
-                'details': 'Empty response from AI service'
-            }), 500
+            return upstream_error_response(e)
+        payload = remember_turn(session_id, user_message, payload)
+        start = time.perf_counter()
+        response = jsonify(payload)
+        stages['serialize'].observe(time.perf_counter() - start)
+        return response, status
 
-        ai_response = response.choices[0].message.content
-        logger.info("Successfully generated response")
+    except Exception as e:
+        logger.exception("Unexpected error in chat route: %s", e)
         return jsonify({
-            'response': ai_response,
+            'error': 'An unexpected error occurred. Please try again later.',
+            'details': str(e) if app.debug else None
+        }), 500
+
+@app.route('/api/chat/stream', methods=['POST', 'OPTIONS'])
+def chat_stream():
+    if request.method == 'OPTIONS':
+        response = jsonify({'status': 'ok'})
+        response.status_code = 200
+        return response
+
+    try:
+        logger.info("Received streaming chat request")
+        data = request.get_json(silent=True)
+
+        is_valid, result = validate_input(data)
+        if not is_valid:
+            logger.warning(f"Invalid input: {result}")
+            return jsonify({'error': result}), 400
+
+        session_id, error = read_session_id(data)
+        if error:
+            logger.warning(f"Invalid input: {error}")
+            return jsonify({'error': error}), 400
+
+        return stream_chat_response(result, session_id)
+
+    except Exception as e:
+        logger.exception("Unexpected error in chat stream route: %s", e)
+        return jsonify({
+            'error': 'An unexpected error occurred. Please try again later.',
+            'details': str(e) if app.debug else None
+        }), 500
+
+batch_settings = create_batch_settings_from_env()
+
+def answer_batch_question(user_message, knowledge, deadline):
+    try:
+        payload, status = answer_question(user_message, knowledge, deadline=deadline)
+    except Exception as e:
+        payload, status = upstream_error_payload(e)
+    return item_result(payload, status)
+
+@app.route('/api/chat/batch', methods=['POST', 'OPTIONS'])
+def chat_batch():
+    if request.method == 'OPTIONS':
+        response = jsonify({'status': 'ok'})
+        response.status_code = 200
+        return response
+
+    try:
+        data = request.get_json(silent=True)
+        try:
+            invalid, questions = parse_batch(data, validate_input, batch_settings.max_messages)
+        except BatchError as e:
+            logger.warning(f"Invalid batch: {str(e)}")
+            return jsonify({'error': str(e)}), 400
+        logger.info("Received batch of %d messages (%d unique)", len(data['messages']), len(questions))
+
+        knowledge = knowledge_store.current
+        results = run_batch(
+            questions,
+            lambda message, deadline: answer_batch_question(message, knowledge, deadline),
+            batch_settings
+        )
+
+        if data.get('stream') is True:
+            def generate():
+                for index, result in invalid.items():
+                    yield json.dumps(dict(result, index=index)) + '\n'
+                for key, result in results:
+                    for line in fan_out(questions, key, result):
+                        yield json.dumps(line) + '\n'
+
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            })
+
+        return jsonify({
+            'results': ordered_results(invalid, questions, results),
             'status': 'success'
         })
 
     except Exception as e:
-        logger.error(f"Unexpected error in chat route: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Unexpected error in chat batch route: %s", e)
         return jsonify({
             'error': 'An unexpected error occurred. Please try again later.',
             'details': str(e) if app.debug else None
@@ -369,28 +782,30 @@ def chat():
 # Health check endpoint
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({
-        'status': 'healthy', 
-        'timestamp': time.time(),
-        'service': 'Manuel David Portfolio Chatbot'
-    }), 200
+    # Live timestamp and counters, so never cacheable
+    response = jsonify(health_payload())
+    response.headers['Cache-Control'] = 'no-store'
+    return response, 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text format, summed over all workers with METRICS_BACKEND=sqlite."""
+    response = Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 # Knowledge endpoint for testing
 @app.route('/api/knowledge', methods=['GET'])
 def get_knowledge():
-    return jsonify({
-        'status': 'success',
-        'data': {
-            'name': MANUEL_KNOWLEDGE['personal_info']['name'],
-            'title': MANUEL_KNOWLEDGE['personal_info']['title'],
-            'projects_count': len(MANUEL_KNOWLEDGE['projects']),
-            'skills_categories': list(MANUEL_KNOWLEDGE['skills'].keys()),
-            'contact': {
-                'email': MANUEL_KNOWLEDGE['personal_info']['email'],
-                'website': MANUEL_KNOWLEDGE['personal_info']['website']
-            }
-        }
-    }), 200
+    return precomputed_response(knowledge_store.current.views['summary_response'])
+
+def warm_up():
+    """Load what the first request would otherwise pay for: the openai client and its imports.
+
+    gunicorn.conf.py calls this in a preloaded master, so forked workers
+    share it; a worker started without preload defers it to its first upstream call.
+    """
+    upstream.openai()
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=int(os.getenv('PORT', 5000))) 
\ No newline at end of file
@@ -0,0 +1,502 @@
+"""
+Asyncio serving mode for the chatbot API.
+
+The Flask app in app.py runs under sync gunicorn workers, so every in-flight
+OpenAI call blocks a whole worker for seconds. This module serves the same
+routes, CORS policy and JSON contract on aiohttp, awaiting the model API with
+openai's non-blocking client so one worker can hold many requests at once.
+
+Run it with:
+    gunicorn async_app:app --worker-class aiohttp.GunicornWebWorker
+
+The caches, sessions, rate limits and metrics may be backed by SQLite, which
+can wait seconds on another process's lock, and knowledge reloads read and
+parse files. Those calls go through asyncio.to_thread so a slow one holds a
+thread, not the loop every other request is waiting on.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+
+from aiohttp import web
+
+# Shared state is read through the module on each use, so replacing it in app applies here too
+import app as chatbot
+from app import (
+    ALLOWED_ORIGINS,
+    RATE_LIMITED_PATHS,
+    SERVICE_INFO_RESPONSE,
+    build_chat_request,
+    choose_tier,
+    get_local_response,
+    health_payload,
+    rate_limit_cost,
+    read_session_id,
+    record_usage,
+    remember_turn,
+    retrieval_query,
+    session_history,
+    sse_event,
+    store_response,
+    translate_openai_error,
+    upstream_error_payload,
+    upstream_system_prompt,
+    validate_input,
+)
+from admission import AdmissionRejected
+from batch import BatchError, async_run_batch, fan_out, item_result, ordered_results, parse_batch
+from cache import make_cache_key
+from metrics import async_count_attempts
+from resilience import async_call_with_retries
+from structured_logging import current_request_id
+
+logger = logging.getLogger(__name__)
+
+CORS_ALLOW_METHODS = "GET, POST, OPTIONS"
+CORS_ALLOW_HEADERS = "Content-Type, Authorization, Accept"
+CORS_MAX_AGE = "3600"
+
+
+def json_response(payload, status=200):
+    return web.json_response(payload, status=status)
+
+
+async def get_openai_response(user_message, knowledge, stream=False, deadline=None, history=None):
+    """Async twin of app.get_openai_response; backs off without blocking the loop."""
+    start = time.perf_counter()
+    choice = choose_tier(user_message, history)
+    chat_request = build_chat_request(
+        user_message,
+        upstream_system_prompt(retrieval_query(user_message, history), knowledge),
+        stream=stream,
+        history=history,
+        tier=choice.tier,
+        max_tokens=choice.max_tokens
+    )
+    chatbot.stages['prompt_build'].observe(time.perf_counter() - start)
+    openai = chatbot.upstream.openai()
+
+    async def attempt(timeout):
+        logger.info("Attempting OpenAI API call")
+        return await openai.ChatCompletion.acreate(
+            **chat_request,
+            # aiohttp applies this to the whole body, which would cut long streams
+            request_timeout=chatbot.upstream.request_timeout(None if stream else timeout)
+        )
+
+    chatbot.upstream.bind_async()
+
+    lease = None
+    try:
+        if not openai.api_key:
+            logger.error("OpenAI API key is not configured")
+            raise Exception("OpenAI API key is not configured")
+
+        if chatbot.admission is not None:
+            with chatbot.stages['admission_wait'].time():
+                lease = await chatbot.admission.async_acquire()
+        with chatbot.stages['upstream'].time(), chatbot.model_tiers.track(choice.tier, stream) as upstream_start:
+            response = await async_call_with_retries(
+                async_count_attempts(attempt, chatbot.stages['upstream_attempt'],
+                                     chatbot.upstream_retries, chatbot.upstream_errors),
+                chatbot.retry_policy, chatbot.circuit_breaker, deadline=deadline
+            )
+        logger.info("OpenAI API call successful")
+    except BaseException as e:
+        # Including cancellation at a batch deadline, or the slot would never come back
+        if chatbot.admission is not None:
+            await chatbot.admission.async_release(lease)
+        if not isinstance(e, Exception):
+            raise
+        raise translate_openai_error(e)
+
+    if stream:
+        # The call returned with the headers; the tier's sample is taken when the stream ends
+        response = chatbot.model_tiers.async_watch(choice.tier, response, upstream_start)
+    if chatbot.admission is None:
+        return response
+    if stream:
+        return chatbot.admission.async_hold_until_exhausted(response, lease)
+    await chatbot.admission.async_release(lease)
+    return response
+
+
+async def answer_question(user_message, knowledge, deadline=None, history=None):
+    """Async twin of app.answer_question."""
+    if history:
+        return await fetch_answer(user_message, knowledge, deadline, history)
+
+    cached_response = await asyncio.to_thread(get_local_response, user_message, knowledge)
+    if cached_response is not None:
+        logger.info("Serving response from cache")
+        return {
+            'response': cached_response,
+            'status': 'success'
+        }, 200
+
+    if chatbot.single_flight is None:
+        return await fetch_answer(user_message, knowledge, deadline)
+    # Identical questions already on their way upstream share that call
+    return await chatbot.single_flight.do_async(
+        make_cache_key(user_message, knowledge.views['system_prompt']),
+        lambda: fetch_answer(user_message, knowledge, deadline)
+    )
+
+
+async def fetch_answer(user_message, knowledge, deadline=None, history=None):
+    """Ask the model and cache its answer. Returns (payload, status)."""
+    response = await get_openai_response(user_message, knowledge, deadline=deadline, history=history)
+    logger.info("Successfully received OpenAI response")
+    record_usage(response)
+
+    if not response.choices or not response.choices[0].message.content:
+        logger.error("Empty response from OpenAI API")
+        return {
+            'error': 'Unable to generate response. Please try again.',
+            'details': 'Empty response from AI service'
+        }, 500
+
+    ai_response = response.choices[0].message.content
+    logger.info("Successfully generated response")
+    if not history:
+        await asyncio.to_thread(store_response, user_message, knowledge.views['system_prompt'], ai_response)
+    return {
+        'response': ai_response,
+        'status': 'success'
+    }, 200
+
+
+def upstream_error_response(e):
+    payload, status = upstream_error_payload(e)
+    response = json_response(payload, status=status)
+    if getattr(e, 'retry_after', None):
+        response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+
+def record_request(request, response, start):
+    resource = request.match_info.route.resource
+    # The route pattern, not the path, so unknown paths cannot blow up label cardinality
+    route = resource.canonical if resource is not None else 'unmatched'
+    chatbot.request_seconds.labels(route).observe(time.perf_counter() - start)
+    chatbot.requests_total.labels(route, str(response.status)).inc()
+    if chatbot.request_log is not None:
+        request_id = chatbot.request_log.finish(request.method, route, response.status)
+        # Streams got theirs from add_request_id_header when they were prepared
+        if request_id is not None and not response.prepared:
+            response.headers['X-Request-ID'] = request_id
+
+
+async def flush_metrics():
+    if chatbot.metrics.flush_due():
+        await asyncio.to_thread(chatbot.metrics.maybe_flush)
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    start = time.perf_counter()
+    if chatbot.request_log is not None:
+        # Each request runs in its own task, so the record lives in that task's context
+        chatbot.request_log.begin(request.headers.get('X-Request-ID'))
+    try:
+        response = await handler(request)
+    except web.HTTPException as e:
+        record_request(request, e, start)
+        await flush_metrics()
+        raise
+    record_request(request, response, start)
+    await flush_metrics()
+    return response
+
+
+@web.middleware
+async def reload_knowledge_middleware(request, handler):
+    if chatbot.knowledge_store.reload_due():
+        await asyncio.to_thread(chatbot.knowledge_store.maybe_reload)
+    return await handler(request)
+
+
+@web.middleware
+async def rate_limit_middleware(request, handler):
+    if chatbot.admission is None or request.method != 'POST' or request.path not in RATE_LIMITED_PATHS:
+        return await handler(request)
+    client = chatbot.admission.client(request.remote, request.headers.get('X-Forwarded-For'))
+    try:
+        cost = rate_limit_cost(request.path, await read_json(request))
+        await asyncio.to_thread(chatbot.admission.check_rate, client, cost)
+    except AdmissionRejected as e:
+        return upstream_error_response(e)
+    return await handler(request)
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    """Mirror the flask-cors configuration in app.py (preflight half)."""
+    if request.method == 'OPTIONS' and 'Access-Control-Request-Method' in request.headers:
+        response = web.Response(status=200)
+        if request.headers.get('Origin') in ALLOWED_ORIGINS:
+            response.headers['Access-Control-Allow-Methods'] = CORS_ALLOW_METHODS
+            response.headers['Access-Control-Allow-Headers'] = CORS_ALLOW_HEADERS
+            response.headers['Access-Control-Max-Age'] = CORS_MAX_AGE
+        return response
+    return await handler(request)
+
+
+async def add_cors_headers(request, response):
+    """on_response_prepare hook, so streamed responses get CORS headers before they are sent."""
+    origin = request.headers.get('Origin')
+    if origin in ALLOWED_ORIGINS:
+        response.headers['Access-Control-Allow-Origin'] = origin
+        response.headers['Access-Control-Allow-Credentials'] = 'true'
+    response.headers.add('Vary', 'Origin')
+
+
+async def add_request_id_header(request, response):
+    """on_response_prepare hook, so streamed responses carry the id of their log line."""
+    request_id = current_request_id()
+    if request_id is not None:
+        response.headers['X-Request-ID'] = request_id
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+
+def precomputed_response(request, precomputed):
+    status, body, headers = precomputed.render(
+        request.headers.get('If-None-Match'),
+        request.headers.get('Accept-Encoding')
+    )
+    return web.Response(body=body, status=status, headers=headers)
+
+
+async def root(request):
+    return precomputed_response(request, SERVICE_INFO_RESPONSE)
+
+
+async def chat(request):
+    if request.method == 'OPTIONS':
+        return json_response({'status': 'ok'})
+
+    try:
+        logger.info("Received chat request")
+        start = time.perf_counter()
+        data = await read_json(request)
+        is_valid, result = validate_input(data)
+        chatbot.stages['validate'].observe(time.perf_counter() - start)
+        if not is_valid:
+            logger.warning(f"Invalid input: {result}")
+            return json_response({'error': result}, status=400)
+
+        user_message = result
+        logger.info("Processing message: %.50s...", user_message)
+
+        session_id, error = read_session_id(data)
+        if error:
+            logger.warning(f"Invalid input: {error}")
+            return json_response({'error': error}, status=400)
+
+        if data.get('stream') is True:
+            return await stream_chat_response(request, user_message, session_id)
+
+        try:
+            history = await asyncio.to_thread(session_history, session_id)
+            payload, status = await answer_question(user_message, chatbot.knowledge_store.current, history=history)
+        except Exception as e:
+            return upstream_error_response(e)
+        payload = await asyncio.to_thread(remember_turn, session_id, user_message, payload)
+        start = time.perf_counter()
+        response = json_response(payload, status=status)
+        chatbot.stages['serialize'].observe(time.perf_counter() - start)
+        return response
+
+    except Exception as e:
+        logger.exception("Unexpected error in chat route: %s", e)
+        return json_response({
+            'error': 'An unexpected error occurred. Please try again later.',
+            'details': None
+        }, status=500)
+
+
+async def stream_chat_response(request, user_message, session_id=None):
+    knowledge = chatbot.knowledge_store.current
+    history = await asyncio.to_thread(session_history, session_id)
+    cached_response = None if history else await asyncio.to_thread(get_local_response, user_message, knowledge)
+    completion = None
+    if cached_response is None:
+        try:
+            completion = await get_openai_response(user_message, knowledge, stream=True, history=history)
+        except Exception as e:
+            return upstream_error_response(e)
+
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    await response.prepare(request)
+
+    parts = []
+    try:
+        if completion is None:
+            parts.append(cached_response)
+            await response.write(sse_event({'delta': cached_response}).encode('utf-8'))
+        else:
+            async for chunk in completion:
+                content = chunk.choices[0].delta.get('content') if chunk.choices else None
+                if content:
+                    parts.append(content)
+                    await response.write(sse_event({'delta': content}).encode('utf-8'))
+    except Exception as e:
+        logger.error(f"OpenAI stream interrupted: {str(e)}")
+        await response.write(sse_event({
+            'error': 'AI service is temporarily unavailable. Please try again in a few minutes.',
+            'details': None
+        }, event='error').encode('utf-8'))
+        await response.write_eof()
+        return response
+
+    ai_response = ''.join(parts)
+    if ai_response:
+        logger.info("Successfully streamed response")
+        if completion is not None and not history:
+            await asyncio.to_thread(store_response, user_message, knowledge.views['system_prompt'], ai_response)
+        done = await asyncio.to_thread(
+            remember_turn, session_id, user_message, {'response': ai_response, 'status': 'success'}
+        )
+        await response.write(sse_event(done, event='done').encode('utf-8'))
+    else:
+        logger.error("Empty response from OpenAI API")
+        await response.write(sse_event({
+            'error': 'Unable to generate response. Please try again.',
+            'details': 'Empty response from AI service'
+        }, event='error').encode('utf-8'))
+    await response.write_eof()
+    return response
+
+
+async def chat_stream(request):
+    if request.method == 'OPTIONS':
+        return json_response({'status': 'ok'})
+
+    logger.info("Received streaming chat request")
+    data = await read_json(request)
+    is_valid, result = validate_input(data)
+    if not is_valid:
+        logger.warning(f"Invalid input: {result}")
+        return json_response({'error': result}, status=400)
+
+    session_id, error = read_session_id(data)
+    if error:
+        logger.warning(f"Invalid input: {error}")
+        return json_response({'error': error}, status=400)
+    return await stream_chat_response(request, result, session_id)
+
+
+async def answer_batch_question(user_message, knowledge, deadline):
+    try:
+        payload, status = await answer_question(user_message, knowledge, deadline=deadline)
+    except Exception as e:
+        payload, status = upstream_error_payload(e)
+    return item_result(payload, status)
+
+
+async def chat_batch(request):
+    if request.method == 'OPTIONS':
+        return json_response({'status': 'ok'})
+
+    try:
+        data = await read_json(request)
+        try:
+            invalid, questions = parse_batch(data, validate_input, chatbot.batch_settings.max_messages)
+        except BatchError as e:
+            logger.warning(f"Invalid batch: {str(e)}")
+            return json_response({'error': str(e)}, status=400)
+        logger.info("Received batch of %d messages (%d unique)", len(data['messages']), len(questions))
+
+        knowledge = chatbot.knowledge_store.current
+        results = async_run_batch(
+            questions,
+            lambda message, deadline: answer_batch_question(message, knowledge, deadline),
+            chatbot.batch_settings
+        )
+
+        if data.get('stream') is not True:
+            return json_response({
+                'results': ordered_results(invalid, questions, [item async for item in results]),
+                'status': 'success'
+            })
+
+        response = web.StreamResponse(headers={
+            'Content-Type': 'application/x-ndjson',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        await response.prepare(request)
+        for index, result in invalid.items():
+            await response.write((json.dumps(dict(result, index=index)) + '\n').encode('utf-8'))
+        async for key, result in results:
+            for line in fan_out(questions, key, result):
+                await response.write((json.dumps(line) + '\n').encode('utf-8'))
+        await response.write_eof()
+        return response
+
+    except Exception as e:
+        logger.exception("Unexpected error in chat batch route: %s", e)
+        return json_response({
+            'error': 'An unexpected error occurred. Please try again later.',
+            'details': None
+        }, status=500)
+
+
+async def health_check(request):
+    response = json_response(await asyncio.to_thread(health_payload))
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+async def get_metrics(request):
+    return web.Response(text=await asyncio.to_thread(chatbot.metrics.render), headers={
+        'Content-Type': 'text/plain; version=0.0.4; charset=utf-8',
+        'Cache-Control': 'no-store'
+    })
+
+
+async def get_knowledge(request):
+    return precomputed_response(request, chatbot.knowledge_store.current.views['summary_response'])
+
+
+async def close_upstream(application):
+    await chatbot.upstream.aclose()
+
+
+def create_app():
+    application = web.Application(middlewares=[
+        metrics_middleware, cors_middleware, rate_limit_middleware, reload_knowledge_middleware
+    ])
+    application.on_response_prepare.append(add_cors_headers)
+    application.on_response_prepare.append(add_request_id_header)
+    application.on_cleanup.append(close_upstream)
+    application.router.add_get('/', root)
+    application.router.add_route('POST', '/api/chat', chat)
+    application.router.add_route('OPTIONS', '/api/chat', chat)
+    application.router.add_route('POST', '/api/chat/stream', chat_stream)
+    application.router.add_route('OPTIONS', '/api/chat/stream', chat_stream)
+    application.router.add_route('POST', '/api/chat/batch', chat_batch)
+    application.router.add_route('OPTIONS', '/api/chat/batch', chat_batch)
+    application.router.add_get('/health', health_check)
+    application.router.add_get('/metrics', get_metrics)
+    application.router.add_get('/api/knowledge', get_knowledge)
+    return application
+
+
+app = create_app()
+
+if __name__ == '__main__':
+    web.run_app(app, host='0.0.0.0', port=int(os.getenv('PORT', 5000)))
@@ -0,0 +1,153 @@
+"""
+Batch answering for POST /api/chat/batch.
+
+The frontend pre-warms its suggested questions and eval jobs send dozens of
+questions at once. A batch is validated item by item, identical questions
+(after cache normalization) are answered once, and the rest fan out to the
+model with bounded concurrency under one deadline for the whole batch.
+Results are reported per input index, either collected in input order or
+streamed as NDJSON lines as they finish.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import os
+import time
+
+from cache import normalize_message
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_ERROR = 'Batch deadline exceeded before this question was answered.'
+
+
+class BatchError(ValueError):
+    """The batch request itself is malformed (as opposed to a single item)."""
+
+
+class BatchSettings:
+    def __init__(self, max_messages=50, concurrency=4, deadline=30.0):
+        self.max_messages = max_messages
+        self.concurrency = concurrency
+        self.deadline = deadline
+
+
+def item_result(payload, code):
+    """Shape an endpoint payload (and its HTTP status) as one batch item."""
+    result = dict(payload)
+    result.setdefault('status', 'error' if code >= 400 else 'success')
+    result['code'] = code
+    return result
+
+
+def parse_batch(data, validate_input, max_messages):
+    """Validate a batch body.
+
+    Returns (invalid, questions): `invalid` maps input index to an error
+    result; `questions` maps each normalized question to its first spelling
+    and every input index that asked it. Raises BatchError if the body is
+    not a usable batch.
+    """
+    if not isinstance(data, dict):
+        raise BatchError("Invalid request format")
+    messages = data.get('messages')
+    if not isinstance(messages, list) or not messages:
+        raise BatchError("messages must be a non-empty list")
+    if len(messages) > max_messages:
+        raise BatchError(f"A batch can contain at most {max_messages} messages")
+
+    invalid = {}
+    questions = {}
+    for index, entry in enumerate(messages):
+        # Items are either bare strings or objects shaped like a /api/chat body
+        is_valid, result = validate_input({'message': entry} if isinstance(entry, str) else entry)
+        if not is_valid:
+            invalid[index] = item_result({'error': result}, 400)
+            continue
+        key = normalize_message(result) or result
+        questions.setdefault(key, (result, []))[1].append(index)
+    return invalid, questions
+
+
+def _deadline_results(questions, answered):
+    for key in questions:
+        if key not in answered:
+            yield key, item_result({'error': DEADLINE_ERROR}, 504)
+
+
+def run_batch(questions, answer, settings):
+    """Answer questions on a thread pool, yielding (key, result) as each finishes.
+
+    answer(message, deadline) must return an item_result and not raise.
+    Questions still unanswered at the batch deadline are reported as 504s;
+    their threads stop at the same deadline because it is passed down to the
+    upstream retry loop.
+    """
+    deadline = time.monotonic() + settings.deadline
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(settings.concurrency, len(questions))))
+    # Each question runs in a copy of the caller's context, so its stages and notes
+    # land on the batch request's log line
+    futures = {
+        executor.submit(contextvars.copy_context().run, answer, message, deadline): key
+        for key, (message, _) in questions.items()
+    }
+    answered = set()
+    try:
+        for future in concurrent.futures.as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+            key = futures[future]
+            answered.add(key)
+            yield key, future.result()
+    except concurrent.futures.TimeoutError:
+        logger.warning(f"Batch deadline exceeded with {len(questions) - len(answered)} questions unanswered")
+        yield from _deadline_results(questions, answered)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def async_run_batch(questions, answer, settings):
+    """Async twin of run_batch; answer(message, deadline) is a coroutine."""
+    deadline = time.monotonic() + settings.deadline
+    semaphore = asyncio.Semaphore(max(1, settings.concurrency))
+
+    async def run(key, message):
+        async with semaphore:
+            return key, await answer(message, deadline)
+
+    tasks = [asyncio.ensure_future(run(key, message)) for key, (message, _) in questions.items()]
+    answered = set()
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=max(0.0, deadline - time.monotonic())):
+            key, result = await next_done
+            answered.add(key)
+            yield key, result
+    except asyncio.TimeoutError:
+        logger.warning(f"Batch deadline exceeded with {len(questions) - len(answered)} questions unanswered")
+        for item in _deadline_results(questions, answered):
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def fan_out(questions, key, result):
+    """One result line per input index that asked the question under `key`."""
+    return [dict(result, index=index) for index in questions[key][1]]
+
+
+def ordered_results(invalid, questions, results):
+    """Collect (key, result) pairs plus the invalid items into a list in input order."""
+    by_index = {index: dict(result, index=index) for index, result in invalid.items()}
+    for key, result in results:
+        for line in fan_out(questions, key, result):
+            by_index[line['index']] = line
+    return [by_index[index] for index in sorted(by_index)]
+
+
+def create_batch_settings_from_env():
+    return BatchSettings(
+        max_messages=int(os.getenv('BATCH_MAX_MESSAGES', 50)),
+        concurrency=int(os.getenv('BATCH_CONCURRENCY', 4)),
+        deadline=float(os.getenv('BATCH_DEADLINE', 30.0))
+    )
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Overload benchmark for admission control
+Runs the Flask app under gunicorn (gthread workers sharing one SQLite
+admission store) in front of a mock upstream that can only serve a few
+requests at once, and drives it with more concurrent clients than the
+upstream can absorb. Compares latency percentiles with admission control
+off and on
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import requests
+
+from bench_async import free_port, start_gunicorn
+from mock_openai import MockOpenAIServer
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_load(base_url, clients, duration):
+    """Closed loop: each client posts, waits for the answer and posts again."""
+    results = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(number):
+        session = requests.Session()
+        # Each client looks like its own visitor to the per-IP buckets
+        headers = {'X-Forwarded-For': f'198.51.100.{number}'}
+        i = 0
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                status = session.post(f'{base_url}/api/chat', headers=headers, timeout=60,
+                                      json={'message': f'Question {number}-{i}'}).status_code
+            except requests.RequestException:
+                status = 0
+            with lock:
+                results.append((status, time.perf_counter() - start))
+            i += 1
+            if status == 429:
+                # Well-behaved clients wait out Retry-After (1s when the service is at capacity)
+                time.sleep(1.0)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=0.25, help='mock upstream latency in seconds')
+    parser.add_argument('--capacity', type=int, default=4, help='requests the upstream serves at once')
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    print("🤖 Admission Control Overload Benchmark")
+    print(f"Upstream {args.latency * 1000:.0f} ms, capacity {args.capacity}; {args.clients} clients for "
+          f"{args.duration:.0f}s against {args.workers} workers x {args.threads} threads")
+    print("=" * 50)
+    gunicorn_args = ['app:app', '--worker-class', 'gthread', '--threads', str(args.threads)]
+    with tempfile.TemporaryDirectory() as directory:
+        scenarios = {
+            'admission off': {'ADMISSION_BACKEND': 'off'},
+            'admission on': {
+                'ADMISSION_BACKEND': 'sqlite',
+                'ADMISSION_PATH': os.path.join(directory, 'admission.sqlite3'),
+                # Generous per-client rate, so the in-flight cap is what is measured
+                'RATE_LIMIT_RATE': '50',
+                'UPSTREAM_MAX_IN_FLIGHT': str(args.capacity),
+                'UPSTREAM_QUEUE_SIZE': str(args.capacity * 2),
+                'UPSTREAM_QUEUE_TIMEOUT': '1.0',
+            },
+        }
+        for name, extra_env in scenarios.items():
+            with MockOpenAIServer(latency=args.latency, capacity=args.capacity) as upstream:
+                port = free_port()
+                process = start_gunicorn(gunicorn_args, upstream.url, port,
+                                         workers=args.workers, extra_env=extra_env)
+                try:
+                    results, elapsed = run_load(f'http://127.0.0.1:{port}', args.clients, args.duration)
+                finally:
+                    process.terminate()
+                    process.wait()
+
+            ok = [latency for status, latency in results if status == 200]
+            rejected = [latency for status, latency in results if status == 429]
+            failed = len(results) - len(ok) - len(rejected)
+            everything = [latency for _, latency in results]
+            print(f"\n{name}: {len(results)} requests, {len(ok)} ok ({len(ok) / elapsed:.1f}/s), "
+                  f"{len(rejected)} rejected with 429, {failed} failed")
+            print(f"  answered: p50 {statistics.median(ok) * 1000 if ok else 0:.0f} ms, "
+                  f"p99 {percentile(ok, 0.99) * 1000:.0f} ms")
+            if rejected:
+                print(f"  429s:     p50 {statistics.median(rejected) * 1000:.0f} ms, "
+                      f"p99 {percentile(rejected, 0.99) * 1000:.0f} ms")
+            print(f"  all:      p99 {percentile(everything, 0.99) * 1000:.0f} ms, "
+                  f"max {max(everything) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: sync Flask worker vs asyncio (aiohttp) worker
+Both run as a single gunicorn worker against mock_openai.py with injected
+latency, and are hit with the same burst of concurrent /api/chat requests
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from mock_openai import MockOpenAIServer
+
+SERVERS = {
+    'sync (app:app)': ['app:app'],
+    'async (async_app:app)': ['async_app:app', '--worker-class', 'aiohttp.GunicornWebWorker'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(args, upstream_url, port, workers=1, extra_env=None):
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY='sk-test',
+        OPENAI_API_BASE=upstream_url,
+        RESPONSE_CACHE_BACKEND='off',
+        SEMANTIC_CACHE_ENABLED='false',
+        INTENT_ROUTER_ENABLED='false',
+        ADMISSION_BACKEND='off',
+    )
+    env.update(extra_env or {})
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--timeout', '120',
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'] + args,
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/health', timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"gunicorn {args[0]} did not start")
+
+
+def run_burst(base_url, concurrency):
+    def one(i):
+        start = time.perf_counter()
+        response = requests.post(f'{base_url}/api/chat', json={'message': f'Question {i}'}, timeout=120)
+        return response.status_code, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for status, _ in results if status == 200)
+    return ok, elapsed, max(latency for _, latency in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=1.0, help='mock upstream latency in seconds')
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+
+    print("🤖 Async Serving Benchmark")
+    print(f"Upstream latency {args.latency:.1f}s, {args.concurrency} concurrent requests, 1 worker")
+    print("=" * 50)
+    with MockOpenAIServer(latency=args.latency) as upstream:
+        for name, gunicorn_args in SERVERS.items():
+            port = free_port()
+            process = start_gunicorn(gunicorn_args, upstream.url, port)
+            try:
+                ok, elapsed, slowest = run_burst(f'http://127.0.0.1:{port}', args.concurrency)
+            finally:
+                process.terminate()
+                process.wait()
+            print(f"{name:<24} {ok}/{args.concurrency} ok in {elapsed:.2f}s "
+                  f"({ok / elapsed:.1f} req/s, slowest {slowest:.2f}s, "
+                  f"~{ok * args.latency / elapsed:.1f} concurrent requests per worker)")
+
+
+if __name__ == "__main__":
+    main()
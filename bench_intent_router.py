@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the local intent router
+Reports which questions in the fixed corpus are answered locally, the
+router's coverage, and per-request routing latency
+"""
+
+import statistics
+import time
+
+from app import knowledge_store
+from intent_router import IntentRouter
+from question_corpus import QUESTIONS
+
+
+def main():
+    """Run the benchmark"""
+    print("🤖 Intent Router Benchmark")
+    print("=" * 50)
+    router = IntentRouter(knowledge_store.current.knowledge)
+
+    routed = 0
+    for question in QUESTIONS:
+        route = router.route(question)
+        if route is None:
+            print(f"   → model          {question}")
+        else:
+            routed += 1
+            print(f"✅ {route.intent:<15} {question}")
+
+    timings = []
+    for _ in range(200):
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            router.route(question)
+            timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+
+    print("\n" + "=" * 50)
+    print(f"Coverage: {routed}/{len(QUESTIONS)} questions answered locally "
+          f"({routed / len(QUESTIONS):.0%})")
+    print(f"Routing latency: p50 {statistics.median(timings):.1f} µs, "
+          f"p99 {timings[int(len(timings) * 0.99) - 1]:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the chatbot API
+Drives /api/chat, /api/chat/stream, /api/knowledge and /health with a
+weighted mix of requests, either from a fixed number of closed-loop clients
+(--concurrency) or at a fixed arrival rate (--rps), and reports throughput,
+latency percentiles and error rates per endpoint.
+
+Without --url it starts mock_openai.py and the app under gunicorn itself,
+so nothing talks to the real API. Results can be saved with --output and
+checked against an earlier run with --compare, which exits non-zero when a
+percentile, the throughput or the error rate regressed beyond --tolerance.
+
+    python bench_load.py --duration 30 --output results/baseline.json
+    python bench_load.py --duration 30 --compare results/baseline.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench_admission import percentile
+from bench_async import free_port, start_gunicorn
+from mock_openai import MockOpenAIServer
+from question_corpus import QUESTIONS
+
+ENDPOINTS = {
+    'chat': ('POST', '/api/chat'),
+    'chat_stream': ('POST', '/api/chat/stream'),
+    'knowledge': ('GET', '/api/knowledge'),
+    'health': ('GET', '/health'),
+}
+SERVERS = {
+    'sync': ['app:app'],
+    'gthread': ['app:app', '--worker-class', 'gthread', '--threads', '8'],
+    'async': ['async_app:app', '--worker-class', 'aiohttp.GunicornWebWorker'],
+}
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def parse_mix(text):
+    """'chat=8,knowledge=1' -> {'chat': 8.0, 'knowledge': 1.0}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class LoadClient:
+    """One simulated visitor: a keep-alive session and its own random stream."""
+
+    def __init__(self, base_url, mix, seed, timeout):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.random = random.Random(seed)
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.timeout = timeout
+
+    def request(self, scheduled=None):
+        """Send one request; returns (endpoint, status, latency, ttfb, ok).
+
+        Latency is measured from `scheduled` when given, so time spent
+        waiting for a free client under a fixed arrival rate counts too.
+        """
+        name = self.random.choices(self.names, self.weights)[0]
+        method, path = ENDPOINTS[name]
+        body = {'message': self.random.choice(QUESTIONS)} if method == 'POST' else None
+        start = scheduled if scheduled is not None else time.perf_counter()
+        ttfb = None
+        try:
+            response = self.session.request(method, self.base_url + path, json=body,
+                                            timeout=self.timeout, stream=name == 'chat_stream')
+            if name == 'chat_stream':
+                parts = []
+                for chunk in response.iter_content(chunk_size=None):
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - start
+                    parts.append(chunk)
+                ok = response.status_code == 200 and b'event: done' in b''.join(parts)
+            else:
+                response.content
+                ok = response.status_code == 200
+            status = response.status_code
+        except requests.RequestException:
+            status, ok = 0, False
+        return name, status, time.perf_counter() - start, ttfb, ok
+
+
+def run_load(base_url, mix, duration, concurrency, rps=None, warmup=0.0, seed=0, timeout=60):
+    """Returns (samples, measured seconds); samples from the warmup are dropped."""
+    samples = []
+    lock = threading.Lock()
+    begin = time.perf_counter()
+    measure_from = begin + warmup
+    stop_at = measure_from + duration
+
+    def record(sample, started):
+        if started >= measure_from:
+            with lock:
+                samples.append(sample)
+
+    clients = [LoadClient(base_url, mix, seed + i, timeout) for i in range(concurrency)]
+    if rps is None:
+        # Closed loop: each client sends its next request when the last one is answered
+        def loop(client):
+            while True:
+                started = time.perf_counter()
+                if started >= stop_at:
+                    return
+                record(client.request(), started)
+
+        threads = [threading.Thread(target=loop, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        # Open loop: arrivals follow the schedule whatever the response times are
+        idle = list(clients)
+        idle_lock = threading.Lock()
+
+        def send(scheduled):
+            with idle_lock:
+                client = idle.pop()
+            try:
+                record(client.request(scheduled), scheduled)
+            finally:
+                with idle_lock:
+                    idle.append(client)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for i in range(int((warmup + duration) * rps)):
+                scheduled = begin + i / rps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(send, scheduled)
+    return samples, max(time.perf_counter() - measure_from, 1e-9)
+
+
+def summarize(samples, elapsed):
+    """Per-endpoint and overall throughput, latency percentiles (ms) and error rates."""
+    by_endpoint = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    by_endpoint['overall'] = samples
+
+    summary = {}
+    for name, group in by_endpoint.items():
+        if not group:
+            continue
+        latencies = [latency for _, _, latency, _, _ in group]
+        ok = sum(1 for sample in group if sample[4])
+        statuses = {}
+        for _, status, _, _, _ in group:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        entry = {
+            'requests': len(group),
+            'ok': ok,
+            'throughput': round(ok / elapsed, 2),
+            'error_rate': round(1 - ok / len(group), 4),
+            'statuses': statuses,
+            'latency_ms': latency_summary(latencies),
+        }
+        ttfbs = [ttfb for _, _, _, ttfb, _ in group if ttfb is not None]
+        if ttfbs and name != 'overall':
+            entry['ttfb_ms'] = latency_summary(ttfbs)
+        summary[name] = entry
+    return summary
+
+
+def latency_summary(latencies):
+    result = {f'p{int(fraction * 100)}': round(percentile(latencies, fraction) * 1000, 1) for fraction in PERCENTILES}
+    result['mean'] = round(sum(latencies) / len(latencies) * 1000, 1)
+    result['max'] = round(max(latencies) * 1000, 1)
+    return result
+
+
+def compare(current, baseline, tolerance):
+    """Print the change per endpoint and return the regressions found."""
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('timestamp', 'baseline')} "
+          f"(commit {baseline['meta'].get('commit') or '?'}), tolerance {tolerance:.0%}:")
+    for key in ('mix', 'concurrency', 'rps', 'server', 'mock'):
+        if key in current['meta'] and current['meta'].get(key) != baseline['meta'].get(key):
+            print(f"  ⚠️  {key} differs from the baseline, so the numbers are not like for like")
+    for name, entry in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        changes = []
+        for key in ('p50', 'p95', 'p99'):
+            before, after = base['latency_ms'][key], entry['latency_ms'][key]
+            changes.append(f"{key} {before:.0f}->{after:.0f} ms")
+            # Ignore sub-millisecond noise on the fast local routes
+            if after > before * (1 + tolerance) and after - before >= 1.0:
+                regressions.append(f"{name} {key} {before:.1f} -> {after:.1f} ms")
+        if entry['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(f"{name} throughput {base['throughput']} -> {entry['throughput']} req/s")
+        if entry['error_rate'] > base['error_rate'] + 0.01:
+            regressions.append(f"{name} error rate {base['error_rate']:.2%} -> {entry['error_rate']:.2%}")
+        print(f"  {name:<12} {', '.join(changes)}, "
+              f"{base['throughput']}->{entry['throughput']} req/s, "
+              f"errors {base['error_rate']:.2%}->{entry['error_rate']:.2%}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(results):
+    print(f"\n{'endpoint':<12} {'requests':>8} {'req/s':>8} {'errors':>7} "
+          f"{'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    for name, entry in results.items():
+        latency = entry['latency_ms']
+        print(f"{name:<12} {entry['requests']:>8} {entry['throughput']:>8.1f} {entry['error_rate']:>7.1%} "
+              f"{latency['p50']:>8.1f} {latency['p90']:>8.1f} {latency['p95']:>8.1f} "
+              f"{latency['p99']:>8.1f} {latency['max']:>8.1f}")
+        if 'ttfb_ms' in entry:
+            print(f"{'  first byte':<12} {'':>8} {'':>8} {'':>7} {entry['ttfb_ms']['p50']:>8.1f} "
+                  f"{entry['ttfb_ms']['p90']:>8.1f} {entry['ttfb_ms']['p95']:>8.1f} "
+                  f"{entry['ttfb_ms']['p99']:>8.1f} {entry['ttfb_ms']['max']:>8.1f}")
+        non_ok = {status: count for status, count in entry['statuses'].items() if status != '200'}
+        if non_ok and name != 'overall':
+            print(f"{'':<12} non-200: {non_ok}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='test a running server instead of starting one')
+    parser.add_argument('--mix', type=parse_mix, default='chat=6,chat_stream=2,knowledge=1,health=1',
+                        help='weighted endpoint mix, e.g. chat=8,knowledge=1')
+    parser.add_argument('--concurrency', type=int, default=16, help='clients (closed loop) or max in flight (--rps)')
+    parser.add_argument('--rps', type=float, default=None, help='fixed arrival rate instead of a closed loop')
+    parser.add_argument('--duration', type=float, default=20.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds run before measuring')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON from an earlier --output')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed relative regression')
+    server = parser.add_argument_group('spawned server (without --url)')
+    server.add_argument('--server', choices=SERVERS, default='gthread')
+    server.add_argument('--workers', type=int, default=2)
+    server.add_argument('--local-answers', action='store_true',
+                        help='keep the intent router and caches on (off by default so every chat goes upstream)')
+    mock = parser.add_argument_group('mock upstream (without --url)')
+    mock.add_argument('--mock-latency', type=float, default=0.3, help='median seconds before the first byte')
+    mock.add_argument('--mock-latency-sigma', type=float, default=0.4, help='log-normal spread of the latency')
+    mock.add_argument('--mock-token-delay', type=float, default=0.005, help='seconds between tokens')
+    mock.add_argument('--mock-error-rate', type=float, default=0.01, help='fraction failing with 500')
+    mock.add_argument('--mock-rate-limit-rate', type=float, default=0.01, help='fraction rejected with 429')
+    mock.add_argument('--mock-capacity', type=int, default=None, help='upstream requests served at once')
+    args = parser.parse_args()
+    mix = args.mix if isinstance(args.mix, dict) else parse_mix(args.mix)
+
+    print("🤖 Chatbot Load Test")
+    mode = f"{args.rps:g} req/s (max {args.concurrency} in flight)" if args.rps else f"{args.concurrency} clients"
+    print(f"{mode} for {args.duration:g}s after {args.warmup:g}s warmup; mix {mix}")
+    print("=" * 50)
+
+    meta = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'mix': mix,
+        'concurrency': args.concurrency,
+        'rps': args.rps,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'seed': args.seed,
+    }
+    if args.url:
+        meta['url'] = args.url
+        samples, elapsed = run_load(args.url.rstrip('/'), mix, args.duration, args.concurrency,
+                                    rps=args.rps, warmup=args.warmup, seed=args.seed)
+    else:
+        upstream = MockOpenAIServer(latency=args.mock_latency, latency_sigma=args.mock_latency_sigma,
+                                    token_delay=args.mock_token_delay, error_rate=args.mock_error_rate,
+                                    rate_limit_rate=args.mock_rate_limit_rate, capacity=args.mock_capacity,
+                                    seed=args.seed)
+        extra_env = {}
+        if args.local_answers:
+            extra_env = {'RESPONSE_CACHE_BACKEND': 'memory', 'SEMANTIC_CACHE_ENABLED': 'true',
+                         'INTENT_ROUTER_ENABLED': 'true'}
+        with upstream:
+            port = free_port()
+            process = start_gunicorn(SERVERS[args.server], upstream.url, port,
+                                     workers=args.workers, extra_env=extra_env)
+            try:
+                samples, elapsed = run_load(f'http://127.0.0.1:{port}', mix, args.duration, args.concurrency,
+                                            rps=args.rps, warmup=args.warmup, seed=args.seed)
+            finally:
+                process.terminate()
+                process.wait()
+        meta['server'] = {'kind': args.server, 'workers': args.workers, 'local_answers': args.local_answers}
+        meta['mock'] = upstream.config()
+        meta['upstream_calls'] = {'total': upstream.calls, 'errors': upstream.errors,
+                                  'rate_limited': upstream.rate_limited}
+
+    if not samples:
+        print("No requests completed")
+        sys.exit(1)
+    result = {'meta': meta, 'results': summarize(samples, elapsed)}
+    print_summary(result['results'])
+    if 'upstream_calls' in meta:
+        calls = meta['upstream_calls']
+        print(f"\nMock upstream: {calls['total']} calls, {calls['errors']} injected 500s, "
+              f"{calls['rate_limited']} injected 429s (retried by the app where possible)")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions beyond tolerance")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Logging overhead benchmark
+Times /api/chat through the Flask test client with logging off, with the
+default text logging at INFO, and with LOG_FORMAT=json (queue handler plus
+one request line) with and without success sampling. Runs a cached question
+and one answered by the local mock upstream, and reports both wall time and
+the CPU time spent on the request thread, which is what the queue handler
+takes formatting and I/O off. Log output goes to a real file.
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import tempfile
+import time
+
+os.environ.setdefault('OPENAI_API_KEY', 'sk-test')
+os.environ['ADMISSION_BACKEND'] = 'off'
+os.environ['RESPONSE_CACHE_BACKEND'] = 'memory'
+os.environ['SEMANTIC_CACHE_ENABLED'] = 'false'
+os.environ['INTENT_ROUTER_ENABLED'] = 'false'
+
+import openai  # noqa: E402
+import app as chatbot  # noqa: E402
+import structured_logging  # noqa: E402
+from mock_openai import MockOpenAIServer  # noqa: E402
+from resilience import CircuitBreaker, RetryPolicy  # noqa: E402
+from structured_logging import LoggedStage, RequestLogger, configure_logging  # noqa: E402
+
+MODES = ('off', 'text', 'json', 'json-sampled')
+CACHED_QUESTION = 'What is the benchmark question?'
+PLAIN_STAGES = dict(chatbot.stages)
+LOGGED_STAGES = {stage: LoggedStage(stage, child) for stage, child in PLAIN_STAGES.items()}
+
+
+def use_mode(mode, stream):
+    """Reconfigure logging as the app would start up with the matching LOG_* settings."""
+    if mode == 'off':
+        configure_logging('text', 'CRITICAL', stream=stream)
+    elif mode == 'text':
+        configure_logging('text', 'INFO', stream=stream)
+    else:
+        configure_logging('json', 'WARNING', stream=stream)
+    if mode.startswith('json'):
+        logger = logging.getLogger('chatbot.request')
+        logger.setLevel(logging.INFO)
+        chatbot.request_log = RequestLogger(logger, sample_rate=0.1 if mode == 'json-sampled' else 1.0)
+        chatbot.stages = LOGGED_STAGES
+    else:
+        chatbot.request_log = None
+        chatbot.stages = PLAIN_STAGES
+
+
+def per_request(client, messages, iterations):
+    """(wall seconds, request-thread CPU seconds) per request."""
+    wall, cpu = time.perf_counter(), time.thread_time()
+    for _ in range(iterations):
+        response = client.post('/api/chat', json={'message': next(messages)})
+        assert response.status_code == 200
+    return (time.perf_counter() - wall) / iterations, (time.thread_time() - cpu) / iterations
+
+
+def run_scenario(client, messages, iterations, rounds, directory):
+    results = {mode: [] for mode in MODES}
+    sizes = {}
+    # Interleave the modes, so drift in machine load hits all of them alike
+    for _ in range(rounds):
+        for mode in MODES:
+            with open(os.path.join(directory, f'{mode}.log'), 'w') as stream:
+                use_mode(mode, stream)
+                per_request(client, messages, 50)
+                start = stream.tell()
+                results[mode].append(per_request(client, messages, iterations))
+                structured_logging.stop_logging()
+                sizes[mode] = (stream.tell() - start) / iterations
+    configure_logging('text', 'INFO')
+    return {mode: (min(wall for wall, _ in timings), min(cpu for _, cpu in timings), sizes[mode])
+            for mode, timings in results.items()}
+
+
+def print_scenario(name, results):
+    print(f"\n{name}")
+    off_wall, off_cpu, _ = results['off']
+    for mode in MODES:
+        wall, cpu, size = results[mode]
+        extra = '' if mode == 'off' else f"  (+{(wall - off_wall) * 1e6:5.1f} wall, +{(cpu - off_cpu) * 1e6:5.1f} cpu)"
+        print(f"{mode:>13}: {wall * 1e6:7.1f} µs wall, {cpu * 1e6:7.1f} µs request-thread cpu, "
+              f"{size:5.0f} bytes/request{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5, help='best of this many rounds per mode')
+    args = parser.parse_args()
+
+    print("🤖 Logging Overhead Benchmark")
+    print("=" * 50)
+    client = chatbot.app.test_client()
+    chatbot.store_response(CACHED_QUESTION, chatbot.create_system_prompt(), 'A cached answer.')
+    with tempfile.TemporaryDirectory() as directory:
+        cached = run_scenario(client, itertools.repeat(CACHED_QUESTION), args.iterations, args.rounds, directory)
+        print_scenario("Cached answer", cached)
+
+        with MockOpenAIServer() as upstream:
+            openai.api_base = upstream.url
+            chatbot.retry_policy = RetryPolicy(max_attempts=1)
+            chatbot.circuit_breaker = CircuitBreaker()
+            # A fresh question every time, so each one goes upstream
+            fresh = (f'Tell me about project {i}' for i in itertools.count())
+            # Each costs a local HTTP round trip, so run fewer of them
+            answered = run_scenario(client, fresh, max(1, args.iterations // 20), args.rounds, directory)
+        print_scenario("Answered by the mock upstream", answered)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Metrics overhead benchmark
+Times the recording primitives, everything app.py records for a cached and
+for an upstream /api/chat request (request hooks included), and a /metrics
+scrape that sums several workers' snapshots from the SQLite store
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault('OPENAI_API_KEY', 'sk-test')
+os.environ['ADMISSION_BACKEND'] = 'off'
+
+import app as chatbot  # noqa: E402
+from metrics import MetricsRegistry, SQLiteMetricsStore  # noqa: E402
+
+
+def per_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def cached_request():
+    """What a /api/chat answered from a local cache records."""
+    chatbot.start_request_timer()
+    for stage in ('validate', 'cache_lookup', 'serialize'):
+        start = time.perf_counter()
+        chatbot.stages[stage].observe(time.perf_counter() - start)
+    chatbot.cache_lookups.labels('exact').inc()
+    chatbot.record_request_metrics(RESPONSE)
+
+
+def upstream_request():
+    """What a /api/chat answered by the model records on top of the lookups."""
+    chatbot.start_request_timer()
+    for stage in ('validate', 'cache_lookup', 'prompt_build', 'serialize'):
+        start = time.perf_counter()
+        chatbot.stages[stage].observe(time.perf_counter() - start)
+    chatbot.cache_lookups.labels('miss').inc()
+    with chatbot.stages['upstream'].time():
+        chatbot.count_attempts(lambda timeout: None, chatbot.stages['upstream_attempt'],
+                               chatbot.upstream_retries, chatbot.upstream_errors)(None)
+    chatbot.record_usage({'usage': {'prompt_tokens': 900, 'completion_tokens': 120}})
+    chatbot.record_request_metrics(RESPONSE)
+
+
+class _Response:
+    status_code = 200
+
+
+RESPONSE = _Response()
+
+
+def empty_request():
+    """The same loop with nothing recorded, to subtract the harness."""
+    for stage in ('validate', 'cache_lookup', 'serialize'):
+        start = time.perf_counter()
+        time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=4, help='worker snapshots summed per scrape')
+    args = parser.parse_args()
+
+    print("🤖 Metrics Overhead Benchmark")
+    print("=" * 50)
+    counter = chatbot.cache_lookups.labels('exact')
+    histogram = chatbot.stages['validate']
+
+    def timed_block():
+        with histogram.time():
+            pass
+
+    print(f"counter inc:        {per_call(counter.inc, args.iterations) * 1e9:.0f} ns")
+    print(f"histogram observe:  {per_call(lambda: histogram.observe(0.003), args.iterations) * 1e9:.0f} ns")
+    print(f"timer block:        {per_call(timed_block, args.iterations) * 1e9:.0f} ns")
+
+    with chatbot.app.test_request_context('/api/chat', method='POST') as context:
+        context.match_request()
+        harness = per_call(empty_request, args.iterations)
+        cached = per_call(cached_request, args.iterations) - harness
+        upstream = per_call(upstream_request, args.iterations) - harness
+    print(f"cached /api/chat:   {cached * 1e6:.2f} µs of instrumentation per request")
+    print(f"upstream /api/chat: {upstream * 1e6:.2f} µs of instrumentation per request")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'metrics.sqlite3')
+        workers = []
+        for _ in range(args.workers):
+            registry = MetricsRegistry(SQLiteMetricsStore(path))
+            stage_seconds = registry.histogram('chatbot_stage_seconds', 'Stage time', ('stage',))
+            for stage in chatbot.stages:
+                for i in range(100):
+                    stage_seconds.labels(stage).observe(i / 1000)
+            registry.flush()
+            workers.append(registry)
+        flush = per_call(workers[0].flush, 200)
+        scrape = per_call(workers[0].render, 200)
+        print(f"\nSQLite snapshot flush (once per METRICS_FLUSH_INTERVAL): {flush * 1e3:.2f} ms")
+        print(f"/metrics render summing {args.workers} workers: {scrape * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full system prompt vs retrieved per-question prompt
+Reports prompt tokens and end-to-end /api/chat latency for the question
+corpus against mock_openai.py, whose latency grows with prompt length
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+# Every question must reach the mock upstream
+os.environ.setdefault('OPENAI_API_KEY', 'sk-test')
+os.environ['RESPONSE_CACHE_BACKEND'] = 'off'
+os.environ['SEMANTIC_CACHE_ENABLED'] = 'false'
+os.environ['INTENT_ROUTER_ENABLED'] = 'false'
+os.environ['ADMISSION_BACKEND'] = 'off'
+
+import openai  # noqa: E402
+import app as chatbot  # noqa: E402
+from mock_openai import MockOpenAIServer  # noqa: E402
+from question_corpus import QUESTIONS  # noqa: E402
+from retrieval import estimate_tokens  # noqa: E402
+
+
+def run(client, retrieval_enabled):
+    os.environ['PROMPT_RETRIEVAL_ENABLED'] = 'true' if retrieval_enabled else 'false'
+    chatbot.knowledge_store.reload()
+    tokens = []
+    latencies = []
+    knowledge = chatbot.knowledge_store.current
+    for question in QUESTIONS:
+        prompt = chatbot.upstream_system_prompt(question, knowledge)
+        tokens.append(estimate_tokens(prompt) + estimate_tokens(question))
+        start = time.perf_counter()
+        response = client.post('/api/chat', json={'message': question})
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.json
+    return tokens, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=0.05, help='fixed upstream latency in seconds')
+    parser.add_argument('--prompt-token-latency', type=float, default=0.0002,
+                        help='upstream seconds per prompt token')
+    parser.add_argument('--top-k', type=int, default=4)
+    args = parser.parse_args()
+
+    print("🤖 Prompt Retrieval Benchmark")
+    print(f"{len(QUESTIONS)} questions, upstream {args.latency * 1000:.0f} ms "
+          f"+ {args.prompt_token_latency * 1000:.2f} ms per prompt token")
+    print("=" * 50)
+    os.environ['PROMPT_RETRIEVAL_TOP_K'] = str(args.top_k)
+    with MockOpenAIServer(latency=args.latency, prompt_token_latency=args.prompt_token_latency) as upstream:
+        openai.api_base = upstream.url
+        client = chatbot.app.test_client()
+        results = {
+            'full prompt': run(client, False),
+            f'retrieved (top {args.top_k})': run(client, True),
+        }
+
+    for name, (tokens, latencies) in results.items():
+        print(f"{name:<18} prompt tokens: mean {statistics.mean(tokens):.0f}, max {max(tokens)} | "
+              f"latency: mean {statistics.mean(latencies):.0f} ms, "
+              f"p50 {statistics.median(latencies):.0f} ms")
+    (full_tokens, full_latency), (slim_tokens, slim_latency) = results.values()
+    print(f"\nPrompt tokens saved: {1 - sum(slim_tokens) / sum(full_tokens):.0%}, "
+          f"latency saved: {1 - sum(slim_latency) / sum(full_latency):.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the semantic answer cache
+Measures paraphrase hit rate and lookup latency as the index grows to 100k entries
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from semantic_cache import SemanticCache
+
+SYSTEM_PROMPT = "benchmark system prompt"
+
+# (answered question, paraphrase that should reuse the answer)
+PARAPHRASES = [
+    ("What has Manuel built?", "What projects has Manuel built?"),
+    ("How can I contact Manuel?", "How do I contact Manuel?"),
+    ("What are Manuel's skills in AI?", "What AI skills does Manuel have?"),
+    ("Tell me about the Resume Site AI project", "Tell me about Resume Site AI"),
+    ("Where is Manuel located?", "Where is Manuel based?"),
+    ("What is Manuel's email?", "What's Manuel's email address?"),
+]
+
+# Questions that look alike but must NOT share an answer
+DISTINCT = [
+    ("What are Manuel's skills in AI?", "What are Manuel's skills in React?"),
+    ("Tell me about the Resume Site AI project", "Tell me about the Therapist AI project"),
+    ("What is Manuel's email?", "What is Manuel's phone number?"),
+]
+
+FILLER_WORDS = [
+    "kubernetes", "rust", "salary", "hobbies", "university", "degree", "marathon",
+    "guitar", "blockchain", "swift", "android", "graphql", "terraform", "pets",
+    "travel", "chess", "cooking", "photography", "startup", "investors", "golang",
+]
+
+
+def filler_question(rng):
+    words = rng.sample(FILLER_WORDS, 3)
+    return f"Does Manuel know {words[0]} {words[1]} or {words[2]} {rng.randint(0, 10**6)}?"
+
+
+def test_hit_rate():
+    """Paraphrases should hit, look-alike questions should miss"""
+    print("🔍 Measuring paraphrase hit rate...")
+    cache = SemanticCache()
+    for question, _ in PARAPHRASES + DISTINCT:
+        cache.set(question, SYSTEM_PROMPT, f"answer to {question}")
+
+    hits = sum(
+        cache.get(paraphrase, SYSTEM_PROMPT) == f"answer to {question}"
+        for question, paraphrase in PARAPHRASES
+    )
+    false_hits = sum(
+        cache.get(other, SYSTEM_PROMPT) == f"answer to {question}"
+        for question, other in DISTINCT
+    )
+    print(f"Paraphrase hits: {hits}/{len(PARAPHRASES)}")
+    print(f"False hits on distinct questions: {false_hits}/{len(DISTINCT)}")
+    assert false_hits == 0
+    return hits, false_hits
+
+
+def test_lookup_latency(sizes=(1000, 10000, 100000), lookups=200):
+    """Lookup latency as the index grows"""
+    print("\n🔍 Measuring lookup latency...")
+    rng = random.Random(42)
+    cache = SemanticCache(max_entries=max(sizes))
+    results = {}
+    for size in sizes:
+        while len(cache.index) < size:
+            cache.set(filler_question(rng), SYSTEM_PROMPT, "filler")
+        timings = []
+        for i in range(lookups):
+            question = PARAPHRASES[i % len(PARAPHRASES)][1]
+            start = time.perf_counter()
+            cache.get(question, SYSTEM_PROMPT)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results[size] = {
+            'p50_ms': statistics.median(timings),
+            'p99_ms': timings[int(len(timings) * 0.99) - 1],
+        }
+        print(f"{size:>7} entries: p50 {results[size]['p50_ms']:.3f} ms, "
+              f"p99 {results[size]['p99_ms']:.3f} ms")
+    return results
+
+
+def main():
+    """Run the benchmark"""
+    print("🤖 Semantic Cache Benchmark")
+    print("=" * 50)
+    test_hit_rate()
+    sizes = (1000, 10000, 100000)
+    if len(sys.argv) > 1:
+        sizes = tuple(int(arg) for arg in sys.argv[1:])
+    test_lookup_latency(sizes)
+
+
+if __name__ == "__main__":
+    main()
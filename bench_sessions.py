@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Session store benchmark
+Measures memory per 10k sessions for __slots__ turns against plain dict
+turns, and history lookup / append latency for the memory and SQLite
+backends
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from bench_admission import percentile
+from sessions import MemorySessionBackend, SessionStore, SQLiteSessionBackend, Turn
+
+QUESTION = "Which of Manuel's projects used Kafka, and what did it do?"
+ANSWER = ("The real-time analytics pipeline used Kafka to stream click events into Spark, "
+          "which aggregated them into Postgres for the dashboard.")
+
+
+def dict_turn(role, content):
+    return {'role': role, 'content': content, 'tokens': len(content) // 4}
+
+
+def measure_memory(sessions, exchanges, make_turn):
+    """Bytes held by `sessions` conversations of `exchanges` user/assistant pairs each."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = {}
+    for i in range(sessions):
+        turns = []
+        for j in range(exchanges):
+            # Distinct strings per session, as real conversations would be
+            turns.append(make_turn('user', f'{QUESTION} #{i}.{j}'))
+            turns.append(make_turn('assistant', f'{ANSWER} #{i}.{j}'))
+        store[f'session-{i:08d}'] = turns
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used
+
+
+def measure_latency(store, sessions, lookups):
+    for i in range(sessions):
+        store.append(f'session-{i:08d}', QUESTION, ANSWER)
+
+    appends = []
+    for i in range(min(lookups, sessions)):
+        start = time.perf_counter()
+        store.append(f'session-{i:08d}', QUESTION, ANSWER)
+        appends.append(time.perf_counter() - start)
+
+    reads = []
+    for i in range(lookups):
+        start = time.perf_counter()
+        store.history(f'session-{(i * 7919) % sessions:08d}')
+        reads.append(time.perf_counter() - start)
+    return reads, appends
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--exchanges', type=int, default=3, help='user/assistant pairs per session')
+    parser.add_argument('--lookups', type=int, default=5000)
+    args = parser.parse_args()
+
+    print("🤖 Session Store Benchmark")
+    print(f"{args.sessions} sessions x {args.exchanges} exchanges")
+    print("=" * 50)
+
+    slots = measure_memory(args.sessions, args.exchanges, Turn)
+    dicts = measure_memory(args.sessions, args.exchanges, dict_turn)
+    text = sum(len(f'{QUESTION} #0.0') + len(f'{ANSWER} #0.0') for _ in range(args.exchanges)) * args.sessions
+    print(f"__slots__ turns: {slots / 2 ** 20:.1f} MiB ({slots / args.sessions:.0f} B/session)")
+    print(f"dict turns:      {dicts / 2 ** 20:.1f} MiB ({dicts / args.sessions:.0f} B/session)")
+    print(f"  of which message text: ~{text / 2 ** 20:.1f} MiB")
+
+    with tempfile.TemporaryDirectory() as directory:
+        backends = {
+            'memory': MemorySessionBackend(max_sessions=args.sessions),
+            'sqlite': SQLiteSessionBackend(os.path.join(directory, 'sessions.sqlite3'),
+                                           max_sessions=args.sessions),
+        }
+        print()
+        for name, backend in backends.items():
+            reads, appends = measure_latency(SessionStore(backend), args.sessions, args.lookups)
+            print(f"{name:<7} history: p50 {statistics.median(reads) * 1e6:.1f} µs, "
+                  f"p99 {percentile(reads, 0.99) * 1e6:.1f} µs | "
+                  f"append: p50 {statistics.median(appends) * 1e6:.1f} µs, "
+                  f"p99 {percentile(appends, 0.99) * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark
+Measures how long `import app` takes in a fresh interpreter, with the
+openai client left to first use and with warm_up() loading it, and how long
+`gunicorn app:app` (the Procfile command, reading gunicorn.conf.py) takes
+with and without GUNICORN_PRELOAD:
+
+- ready: from spawning gunicorn to the first answered /health
+- first chat: the first /api/chat, answered by mock_openai.py
+- respawn: from killing every worker to /health answering again, which is
+  what a crashed or recycled worker costs
+- memory: proportional set size of the master and its workers together,
+  counting pages shared copy-on-write once
+"""
+
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+from bench_async import free_port
+from bench_load import SERVERS
+from mock_openai import MockOpenAIServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.warm_up()
+warmed = time.perf_counter()
+print(json.dumps({'import': imported - start, 'warm_up': warmed - imported, 'modules': len(sys.modules)}))
+"""
+
+
+def measure_import(rounds):
+    env = dict(os.environ, OPENAI_API_KEY=os.getenv('OPENAI_API_KEY', 'sk-test'), LOG_LEVEL='ERROR')
+    runs = []
+    for _ in range(rounds):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], cwd=HERE, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                # The parent pid follows the parenthesized command name
+                if int(stat.read().rsplit(')', 1)[1].split()[1]) == pid:
+                    found.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            pass
+    return found
+
+
+def pss_mb(pids):
+    total = 0
+    for pid in pids:
+        with open(f'/proc/{pid}/smaps_rollup') as rollup:
+            total += next(int(line.split()[1]) for line in rollup if line.startswith('Pss:'))
+    return total / 1024
+
+
+def wait_for_health(base_url, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if requests.get(f'{base_url}/health', timeout=timeout).status_code == 200:
+                return
+        except requests.ConnectionError:
+            time.sleep(0.002)
+    raise RuntimeError("gunicorn did not answer /health")
+
+
+def measure_server(server_args, upstream_url, workers, preload):
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_PRELOAD='true' if preload else 'false',
+        OPENAI_API_KEY='sk-test',
+        OPENAI_API_BASE=upstream_url,
+        RESPONSE_CACHE_BACKEND='off',
+        SEMANTIC_CACHE_ENABLED='false',
+        INTENT_ROUTER_ENABLED='false',
+        ADMISSION_BACKEND='off',
+    )
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--log-level', 'warning'] + server_args,
+                               cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_health(base_url)
+        ready = time.perf_counter() - start
+
+        chat_start = time.perf_counter()
+        response = requests.post(f'{base_url}/api/chat', json={'message': 'Tell me about project 1'}, timeout=60)
+        assert response.status_code == 200, response.text
+        first_chat = time.perf_counter() - chat_start
+
+        # Let every worker finish booting before counting memory
+        while len(children(process.pid)) < workers:
+            time.sleep(0.01)
+        time.sleep(0.5)
+        memory = pss_mb([process.pid] + children(process.pid))
+
+        killed = children(process.pid)
+        respawn_start = time.perf_counter()
+        for pid in killed:
+            os.kill(pid, signal.SIGKILL)
+        wait_for_health(base_url)
+        respawn = time.perf_counter() - respawn_start
+    finally:
+        process.terminate()
+        process.wait()
+    return {'ready': ready, 'first_chat': first_chat, 'respawn': respawn, 'pss_mb': memory}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5, help='median of this many cold starts')
+    parser.add_argument('--server', choices=SERVERS, default='sync')
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    print("🤖 Cold Start Benchmark")
+    print("=" * 50)
+    timings = measure_import(args.rounds)
+    print(f"import app:            {timings['import'] * 1000:6.0f} ms ({timings['modules']:.0f} modules)")
+    print(f"warm_up() afterwards:  {timings['warm_up'] * 1000:6.0f} ms (openai, requests, aiohttp)")
+
+    print(f"\ngunicorn {' '.join(SERVERS[args.server])}, {args.workers} workers "
+          f"(median of {args.rounds})")
+    with MockOpenAIServer(latency=0.0) as upstream:
+        for preload in (False, True):
+            runs = [measure_server(SERVERS[args.server], upstream.url, args.workers, preload)
+                    for _ in range(args.rounds)]
+            result = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            print(f"  preload {'on ' if preload else 'off'}: ready {result['ready'] * 1000:6.0f} ms, "
+                  f"first chat {result['first_chat'] * 1000:5.0f} ms, "
+                  f"respawn {result['respawn'] * 1000:5.0f} ms, memory {result['pss_mb']:5.1f} MB PSS")
+
+
+if __name__ == "__main__":
+    main()
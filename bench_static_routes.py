@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the static GET endpoints
+Compares requests/sec for rebuilding and re-jsonifying the payload on every
+hit (the old handlers) with the precomputed ETag responses, including
+conditional GETs answered with 304
+"""
+
+import time
+
+from flask import jsonify
+
+import app as chatbot
+
+REQUESTS = 5000
+
+
+def legacy_root():
+    return jsonify(chatbot.SERVICE_INFO), 200
+
+
+def legacy_knowledge():
+    return jsonify(chatbot.build_knowledge_summary(chatbot.knowledge_store.current.knowledge)), 200
+
+
+# Old handlers, registered side by side so both run through the same Flask stack
+chatbot.app.add_url_rule('/bench/legacy-root', 'legacy_root', legacy_root)
+chatbot.app.add_url_rule('/bench/legacy-knowledge', 'legacy_knowledge', legacy_knowledge)
+
+
+def requests_per_second(client, path, headers=None):
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        client.get(path, headers=headers)
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def handler_microseconds(view, headers=None):
+    """Time just the view function, without the test client's WSGI overhead."""
+    with chatbot.app.test_request_context(headers=headers):
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            view()
+        return (time.perf_counter() - start) / REQUESTS * 1e6
+
+
+def main():
+    """Run the benchmark"""
+    print("🤖 Static Routes Benchmark")
+    print(f"{REQUESTS} requests per case through the Flask test client")
+    print("=" * 50)
+    client = chatbot.app.test_client()
+    knowledge_etag = client.get('/api/knowledge').headers['ETag']
+    root_etag = client.get('/').headers['ETag']
+
+    cases = [
+        ('/ (before)', '/bench/legacy-root', None),
+        ('/ (precomputed)', '/', None),
+        ('/ (304)', '/', {'If-None-Match': root_etag}),
+        ('/api/knowledge (before)', '/bench/legacy-knowledge', None),
+        ('/api/knowledge (precomputed)', '/api/knowledge', None),
+        ('/api/knowledge (gzip)', '/api/knowledge', {'Accept-Encoding': 'gzip'}),
+        ('/api/knowledge (304)', '/api/knowledge', {'If-None-Match': knowledge_etag}),
+    ]
+    for name, path, headers in cases:
+        print(f"{name:<30} {requests_per_second(client, path, headers):>8.0f} req/s")
+
+    print("\nHandler time only")
+    handlers = [
+        ('/api/knowledge (before)', legacy_knowledge, None),
+        ('/api/knowledge (precomputed)', chatbot.get_knowledge, None),
+        ('/api/knowledge (304)', chatbot.get_knowledge, {'If-None-Match': knowledge_etag}),
+    ]
+    for name, view, headers in handlers:
+        print(f"{name:<30} {handler_microseconds(view, headers):>8.1f} µs")
+
+    precomputed = chatbot.knowledge_store.current.views['summary_response']
+    sizes = ', '.join(f"{encoding or 'identity'} {len(body)} B" for encoding, (body, _) in precomputed.variants.items())
+    print(f"\n/api/knowledge payload: {sizes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Model tiering benchmark
+Sends every question in question_corpus.py upstream, to mock_openai.py with
+a latency profile per model, once with every question on gpt-4 at
+max_tokens=500 (MODEL_TIERING_ENABLED=false) and once with the default tier
+table in tiering.py. It reports the tier mix, the latency distribution, the
+cost at each tier's list price and how many answers were cut at max_tokens.
+
+A third run makes the larger models slow, to show questions stepping down to
+a faster tier once a tier is over its latency budget.
+
+The mock's answers are as long as REFERENCE_ANSWER_TOKENS says the question
+needs (hand-labelled, independent of the heuristic), capped at the request's
+max_tokens. Latencies are simulated at --time-scale and reported at full scale.
+"""
+
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('OPENAI_API_KEY', 'sk-test')
+os.environ['RESPONSE_CACHE_BACKEND'] = 'off'
+os.environ['SEMANTIC_CACHE_ENABLED'] = 'false'
+os.environ['INTENT_ROUTER_ENABLED'] = 'false'
+os.environ['ADMISSION_BACKEND'] = 'off'
+
+import openai  # noqa: E402
+import app as chatbot  # noqa: E402
+from bench_admission import percentile  # noqa: E402
+from mock_openai import MockOpenAIServer  # noqa: E402
+from question_corpus import QUESTIONS  # noqa: E402
+from resilience import CircuitBreaker, RetryPolicy  # noqa: E402
+from structured_logging import configure_logging  # noqa: E402
+from tiering import DEFAULT_TIERS, SINGLE_TIER, Tier, TierPolicy  # noqa: E402
+
+# Seconds before the first token and per token, roughly what the API shows
+MODEL_PROFILES = {
+    'gpt-3.5-turbo': {'latency': 0.35, 'token_delay': 0.012},
+    'gpt-4-turbo': {'latency': 0.6, 'token_delay': 0.025},
+    'gpt-4': {'latency': 0.9, 'token_delay': 0.05},
+}
+SLOW_MODELS = {
+    'gpt-4-turbo': {'latency': 2.0, 'token_delay': 0.1},
+    'gpt-4': {'latency': 3.0, 'token_delay': 0.15},
+}
+# Answer length a good reply needs; questions not listed are one-fact answers
+DEFAULT_ANSWER_TOKENS = 50
+REFERENCE_ANSWER_TOKENS = {
+    "Tell me about Manuel David": 150,
+    "What projects has Manuel built?": 180,
+    "What are Manuel's skills in AI?": 100,
+    "Tell me about the Resume Site AI project": 150,
+    "What are Manuel's frontend skills?": 80,
+    "What is Manuel's tech stack?": 120,
+    "What has Manuel built?": 180,
+    "What technologies does the Cold Email SaaS use?": 80,
+    "Tell me about the Nouvo.dev Platform": 150,
+    "What challenges did Manuel solve on the Pop Up drink website?": 150,
+    "Compare Manuel's AI projects": 320,
+    "Why should I hire Manuel?": 250,
+    "How did Manuel make Therapist AI's voice sound natural?": 180,
+    "What are Manuel's skills and which projects use them?": 250,
+    "Is Manuel a good fit for a senior AI engineering role?": 250,
+}
+
+
+def answer_length(body):
+    question = body['messages'][-1]['content']
+    return REFERENCE_ANSWER_TOKENS.get(question, DEFAULT_ANSWER_TOKENS)
+
+
+def scaled(rows, time_scale):
+    return [Tier(**dict(row, latency_budget=row['latency_budget'] * time_scale)) for row in rows]
+
+
+def scaled_profiles(profiles, time_scale):
+    return {model: {key: value * time_scale for key, value in profile.items()}
+            for model, profile in profiles.items()}
+
+
+def ask(question, knowledge):
+    start = time.perf_counter()
+    response = chatbot.get_openai_response(question, knowledge)
+    return time.perf_counter() - start, response
+
+
+def run(policy, rounds, concurrency, time_scale):
+    chatbot.model_tiers = policy
+    tiers = {tier.model: tier for tier in policy.tiers}
+    knowledge = chatbot.knowledge_store.current
+    questions = QUESTIONS * rounds
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda question: ask(question, knowledge), questions))
+    latencies, costs, mix, truncated = [], [], {}, 0
+    for latency, response in results:
+        tier = tiers[response['model']]
+        usage = response['usage']
+        latencies.append(latency / time_scale)
+        costs.append(tier.cost(usage['prompt_tokens'], usage['completion_tokens']))
+        mix[tier.name] = mix.get(tier.name, 0) + 1
+        truncated += response.choices[0].finish_reason == 'length'
+    return {
+        'questions': len(questions),
+        'mix': mix,
+        'latency': {p: percentile(latencies, p) for p in (0.5, 0.9, 0.99)},
+        'mean_latency': statistics.mean(latencies),
+        'cost_per_1k': statistics.mean(costs) * 1000,
+        'truncated': truncated,
+        'fallbacks': policy.fallbacks,
+    }
+
+
+def print_result(name, result):
+    mix = ', '.join(f"{tier} {count}" for tier, count in result['mix'].items())
+    latency = result['latency']
+    print(f"\n{name} ({result['questions']} questions)")
+    print(f"  tiers:   {mix}" + (f" ({result['fallbacks']} stepped down)" if result['fallbacks'] else ''))
+    print(f"  latency: p50 {latency[0.5]:5.2f}s, p90 {latency[0.9]:5.2f}s, p99 {latency[0.99]:5.2f}s, "
+          f"mean {result['mean_latency']:5.2f}s")
+    print(f"  cost:    ${result['cost_per_1k']:6.2f} per 1K questions")
+    print(f"  cut at max_tokens: {result['truncated']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5, help='passes over the corpus per run')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--time-scale', type=float, default=0.05, help='mock time per real second')
+    args = parser.parse_args()
+
+    configure_logging('text', 'ERROR')
+    print("🤖 Model Tiering Benchmark")
+    print("=" * 50)
+    chatbot.retry_policy = RetryPolicy(max_attempts=1, deadline=60)
+    chatbot.circuit_breaker = CircuitBreaker()
+
+    runs = [
+        ('gpt-4 for everything', SINGLE_TIER, MODEL_PROFILES),
+        ('tiered', DEFAULT_TIERS, MODEL_PROFILES),
+        ('tiered, gpt-4 and gpt-4-turbo slow', DEFAULT_TIERS, dict(MODEL_PROFILES, **SLOW_MODELS)),
+    ]
+    for name, rows, profiles in runs:
+        with MockOpenAIServer(model_profiles=scaled_profiles(profiles, args.time_scale),
+                              answer_length=answer_length) as upstream:
+            openai.api_base = upstream.url
+            policy = TierPolicy(scaled(rows, args.time_scale), window=600 * args.time_scale)
+            print_result(name, run(policy, args.rounds, args.concurrency, args.time_scale))
+
+
+if __name__ == "__main__":
+    main()
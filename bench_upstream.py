@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Upstream connection benchmark: openai 0.28's own connection handling vs
+the pooled client in upstream.py, against mock_openai.py served over HTTPS
+with a throwaway self-signed certificate (needs the openssl CLI).
+
+Scenarios:
+- sequential: one thread calling get_openai_response, as a sync worker does
+- batch: /api/chat/batch, whose questions run on a fresh thread pool
+- async: concurrent calls from the aiohttp serving mode
+
+--connect-latency adds a delay to every new connection at the mock, to stand
+in for the TCP and TLS round trips to a distant API.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault('OPENAI_API_KEY', 'sk-test')
+os.environ['RESPONSE_CACHE_BACKEND'] = 'off'
+os.environ['SEMANTIC_CACHE_ENABLED'] = 'false'
+os.environ['INTENT_ROUTER_ENABLED'] = 'false'
+os.environ['ADMISSION_BACKEND'] = 'off'
+
+import aiohttp  # noqa: E402
+import openai  # noqa: E402
+import app as chatbot  # noqa: E402
+import async_app  # noqa: E402
+from mock_openai import MockOpenAIServer, make_self_signed_cert  # noqa: E402
+from resilience import CircuitBreaker, RetryPolicy  # noqa: E402
+from structured_logging import configure_logging  # noqa: E402
+from upstream import UpstreamClient  # noqa: E402
+
+
+class OpenAIDefaults:
+    """openai 0.28's own connection handling, as before upstream.py."""
+
+    def __init__(self, ca_bundle):
+        self.ca_bundle = ca_bundle
+
+    def install(self):
+        openai.requestssession = None
+        # openai's default sessions have no CA setting, so trust the mock's
+        # certificate where requests and aiohttp look by default
+        os.environ['REQUESTS_CA_BUNDLE'] = self.ca_bundle
+        aiohttp.connector._SSL_CONTEXT_VERIFIED.load_verify_locations(self.ca_bundle)
+        return self
+
+    def openai(self):
+        return openai
+
+    def request_timeout(self, read_timeout):
+        return read_timeout
+
+    def bind_async(self):
+        openai.aiosession.set(None)
+
+    async def aclose(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def use(client):
+    client.install()
+    chatbot.upstream = client
+    # openai only reads requestssession when a thread's session is renewed
+    openai.api_requestor._thread_context.session_create_time = 0
+
+
+def latency_ms(latencies):
+    latencies = sorted(latencies)
+    return {
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p95': latencies[int(len(latencies) * 0.95)] * 1000,
+        'mean': statistics.mean(latencies) * 1000,
+    }
+
+
+def run_sequential(requests_total):
+    latencies = []
+    for i in range(requests_total):
+        start = time.perf_counter()
+        chatbot.get_openai_response(f'Sequential question {i}', chatbot.knowledge_store.current)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_batches(requests_total, batch_size):
+    client = chatbot.app.test_client()
+    latencies = []
+    for b in range(requests_total // batch_size):
+        messages = [f'Batch {b} question {i}' for i in range(batch_size)]
+        start = time.perf_counter()
+        response = client.post('/api/chat/batch', json={'messages': messages})
+        assert response.status_code == 200
+        assert all(result['code'] == 200 for result in response.get_json()['results'])
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_async(requests_total, concurrency):
+    async def one(i, semaphore):
+        async with semaphore:
+            start = time.perf_counter()
+            await async_app.get_openai_response(f'Async question {i}', chatbot.knowledge_store.current)
+            return time.perf_counter() - start
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        try:
+            return await asyncio.gather(*[one(i, semaphore) for i in range(requests_total)])
+        finally:
+            await chatbot.upstream.aclose()
+
+    return asyncio.run(run())
+
+
+def measure(upstream, run):
+    before = upstream.connections
+    start = time.perf_counter()
+    latencies = run()
+    return {
+        'elapsed': time.perf_counter() - start,
+        'connections': upstream.connections - before,
+        'latency_ms': latency_ms(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help='upstream calls per scenario')
+    parser.add_argument('--latency', type=float, default=0.02, help='mock latency per call')
+    parser.add_argument('--connect-latency', type=float, default=0.0,
+                        help='seconds added to every new connection at the mock')
+    parser.add_argument('--concurrency', type=int, default=10, help='concurrent async calls')
+    parser.add_argument('--batch-size', type=int, default=5)
+    parser.add_argument('--pool-size', type=int, default=10)
+    args = parser.parse_args()
+
+    configure_logging('text', 'WARNING')
+    print("🤖 Upstream Connection Benchmark")
+    print("=" * 50)
+    print(f"HTTPS mock: {args.latency * 1000:.0f} ms per call, "
+          f"{args.connect_latency * 1000:.0f} ms extra per new connection")
+    chatbot.retry_policy = RetryPolicy(max_attempts=1, deadline=60)
+    chatbot.circuit_breaker = CircuitBreaker()
+    chatbot.batch_settings.concurrency = args.batch_size
+
+    scenarios = {
+        'sequential': lambda: run_sequential(args.requests),
+        'batch': lambda: run_batches(args.requests, args.batch_size),
+        'async': lambda: run_async(args.requests, args.concurrency),
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, keyfile = make_self_signed_cert(directory)
+        with MockOpenAIServer(latency=args.latency, certfile=certfile, keyfile=keyfile,
+                              connect_latency=args.connect_latency) as upstream:
+            openai.api_base = upstream.url
+            clients = {
+                'openai default': OpenAIDefaults(certfile),
+                'pooled': UpstreamClient(upstream.url, pool_size=args.pool_size, ca_bundle=certfile),
+            }
+            for scenario, run in scenarios.items():
+                unit = 'batch' if scenario == 'batch' else 'call'
+                print(f"\n{scenario} ({args.requests} upstream calls, latency per {unit})")
+                for name, client in clients.items():
+                    use(client)
+                    result = measure(upstream, run)
+                    latency = result['latency_ms']
+                    print(f"  {name:>14}: {result['connections']:4d} connections, "
+                          f"p50 {latency['p50']:7.1f} ms, p95 {latency['p95']:7.1f} ms, "
+                          f"mean {latency['mean']:7.1f} ms, {args.requests / result['elapsed']:6.1f} calls/s")
+            clients['pooled'].close()
+
+
+if __name__ == "__main__":
+    main()
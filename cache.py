@@ -0,0 +1,192 @@
+"""
+Response cache for repeated chat questions.
+
+The portfolio bot is asked the same handful of questions over and over, so
+answers are cached by normalized user message plus a fingerprint of the
+system prompt. Backends are pluggable: an in-process LRU for a single worker,
+or SQLite when several gunicorn workers should share one cache.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+_APOSTROPHES = re.compile(r"['’]")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message):
+    """Fold case, punctuation and whitespace so trivial variants share a key."""
+    text = _APOSTROPHES.sub("", message.lower())
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def prompt_fingerprint(system_prompt):
+    return hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:16]
+
+
+def make_cache_key(message, system_prompt):
+    normalized = normalize_message(message)
+    digest = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    return f"{prompt_fingerprint(system_prompt)}:{digest}"
+
+
+class MemoryBackend:
+    """Bounded in-process LRU with per-entry TTL."""
+
+    def __init__(self, max_entries=1024, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend(SQLiteStore):
+    """File-backed LRU/TTL cache shared by every worker on the same host."""
+
+    def __init__(self, path, max_entries=1024, ttl=3600):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS response_cache_lru "
+                "ON response_cache (last_access)"
+            )
+
+    def get(self, key):
+        # Wall-clock time, since entries are shared between processes
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value FROM response_cache WHERE key = ? AND expires_at > ?",
+            (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE response_cache SET last_access = ? WHERE key = ?", (now, key)
+        )
+        return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO response_cache (key, value, expires_at, last_access) "
+            "VALUES (?, ?, ?, ?)",
+            (key, value, now + self.ttl, now)
+        )
+        conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "DELETE FROM response_cache WHERE key IN ("
+            "SELECT key FROM response_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        self._connect().execute("DELETE FROM response_cache")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, message, system_prompt):
+        try:
+            value = self.backend.get(make_cache_key(message, system_prompt))
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {str(e)}")
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, message, system_prompt, response):
+        try:
+            self.backend.set(make_cache_key(message, system_prompt), response)
+        except Exception as e:
+            logger.warning(f"Response cache store failed: {str(e)}")
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'size': len(self.backend)
+        }
+
+
+def create_cache_from_env():
+    """Build the response cache from RESPONSE_CACHE_* settings, or None if disabled."""
+    backend_name = os.getenv('RESPONSE_CACHE_BACKEND', 'memory').lower()
+    max_entries = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    ttl = float(os.getenv('RESPONSE_CACHE_TTL', 3600))
+
+    if backend_name in ('off', 'none', 'disabled'):
+        return None
+    if backend_name == 'sqlite':
+        path = os.getenv('RESPONSE_CACHE_PATH', 'response_cache.sqlite3')
+        backend = SQLiteBackend(path, max_entries=max_entries, ttl=ttl)
+    elif backend_name == 'memory':
+        backend = MemoryBackend(max_entries=max_entries, ttl=ttl)
+    else:
+        raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend_name}")
+    return ResponseCache(backend)
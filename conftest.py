@@ -0,0 +1,50 @@
+"""
+Shared environment and helpers for the test scripts.
+
+Every test_*.py also runs on its own (`python test_batch.py`), so these are
+plain context managers the scripts import rather than pytest fixtures. Under
+pytest all the files share one `app` module, so a test that swaps one of its
+globals must put it back or the next file inherits it.
+"""
+
+import os
+from contextlib import contextmanager
+
+# app reads these once, when it is first imported, so they are set here: pytest
+# loads this file before any test module, and each script imports it before app.
+# Local answers are kept out of the way so every chat reaches the fake upstream.
+os.environ.setdefault('OPENAI_API_KEY', 'sk-test')
+os.environ['RESPONSE_CACHE_BACKEND'] = 'off'
+os.environ['SEMANTIC_CACHE_ENABLED'] = 'false'
+os.environ['INTENT_ROUTER_ENABLED'] = 'false'
+os.environ['ADMISSION_BACKEND'] = 'off'
+os.environ['SESSIONS_BACKEND'] = 'memory'
+
+
+@contextmanager
+def patched(target, **values):
+    """Set attributes on a module for the duration of the block, then restore them."""
+    saved = {name: getattr(target, name) for name in values}
+    for name, value in values.items():
+        setattr(target, name, value)
+    try:
+        yield target
+    finally:
+        for name, value in saved.items():
+            setattr(target, name, value)
+
+
+@contextmanager
+def using_upstream(upstream, **settings):
+    """Point the app at a mock upstream with one attempt per call and a fresh breaker.
+
+    Keyword arguments replace other app globals (admission, batch_settings,
+    model_tiers, ...) for the block as well.
+    """
+    import openai
+    import app
+    from resilience import CircuitBreaker, RetryPolicy
+
+    settings = {'retry_policy': RetryPolicy(max_attempts=1), 'circuit_breaker': CircuitBreaker(), **settings}
+    with patched(openai, api_base=upstream.url), patched(app, **settings):
+        yield app
@@ -0,0 +1,30 @@
+"""
+Gunicorn settings, read automatically by `gunicorn app:app` (see Procfile)
+and `gunicorn async_app:app --worker-class aiohttp.GunicornWebWorker`.
+
+With preload_app the master imports the app once - Flask, the knowledge
+base and its compiled prompt, the caches - and warm_up() loads the openai
+client, all before forking. Workers start with that already in memory,
+shared copy-on-write, instead of each importing and building it, so a new
+or restarted worker serves its first request in milliseconds.
+
+Anything that must not cross a fork is opened per process: SQLite
+connections and metrics worker ids check the pid, the JSON log listener
+restarts after fork, and upstream connection pools are empty until the
+first call. Set GUNICORN_PRELOAD=false to import in each worker instead,
+e.g. to pick up code changes with a HUP.
+
+Workers and the bind address keep gunicorn's defaults: WEB_CONCURRENCY
+and PORT.
+"""
+
+import os
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() not in ('0', 'false', 'off', 'no')
+
+
+def when_ready(server):
+    # Runs in the master after the preload and before the first fork
+    if server.cfg.preload_app:
+        import app
+        app.warm_up()
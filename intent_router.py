@@ -0,0 +1,297 @@
+"""
+Local intent router for structured questions.
+
+Contact details, skill lists, project facts and metrics already sit in the
+knowledge base, so sending those questions to GPT-4 only costs seconds and
+money. Keyword/regex rules classify the question; recognized intents are
+answered from templates rendered off the knowledge dict. Anything ambiguous,
+open-ended or below the confidence threshold falls through to the model.
+
+A keyword alone is not enough: "Where did Manuel go to school?" matches the
+location rule but is not a location question. A route's confidence is its
+rule's weight times the share of the question's content words the rule
+accounts for (its triggers plus the words such a question usually carries),
+so questions about something else fall below the threshold.
+"""
+
+import logging
+import os
+import re
+
+from cache import normalize_message
+
+logger = logging.getLogger(__name__)
+
+# Phrasings that ask for judgement or synthesis rather than a fact lookup
+OPEN_ENDED = re.compile(
+    r"\b(why|compare|comparison|versus|vs|difference|explain|opinion|think|"
+    r"should|recommend|best|better|worst|hire|fit|how did|how does|how do they)\b"
+)
+
+# Words that shape a question without saying what it is about
+FILLER_WORDS = frozenset("""
+    a an the is are was were be what whats which who how do does did can could
+    would i me my you your about tell of in on at for to and or any his he him
+    has have had with from by it its that this there please give know use uses
+    used so far
+""".split())
+
+SKILL_CATEGORIES = {
+    'frontend': ('frontend', r"front ?end|react|ui\b|css|javascript|typescript"),
+    'backend': ('backend', r"back ?end|server|api development|flask|node"),
+    'ai_ml': ('AI/ML', r"\bai\b|\bml\b|machine learning|artificial intelligence|llm|openai|nlp"),
+    'databases': ('database', r"databases?|\bdb\b|sql|mongo|firestore"),
+    'tools': ('tooling', r"tools?|devops|deploy"),
+    'other': ('other', r"other skills"),
+}
+
+
+# What a question about one named project may ask: its status, stack or story
+PROJECT_DETAIL_WORDS = frozenset("""
+    project app platform site status live launched released prototype finished tech technologies stack
+    built made features challenges solved solve description details work works
+""".split())
+
+# How each project status reads in a sentence, and the words of a yes/no
+# question that status answers "yes" to
+PROJECT_STATUSES = {
+    'live': ('live', re.compile(r"\b(live|launched|released|finished|deployed)\b")),
+    'prototype': ('a prototype', re.compile(r"\bprototype\b")),
+}
+STATUS_QUESTION = re.compile(r"\b(status|live|launched|released|prototype|finished)\b")
+YES_NO_QUESTION = re.compile(r"^(is|are|was|has|have)\b")
+
+
+class Route:
+    __slots__ = ('intent', 'confidence', 'answer')
+
+    def __init__(self, intent, confidence, answer):
+        self.intent = intent
+        self.confidence = confidence
+        self.answer = answer
+
+
+def _join(items):
+    items = list(items)
+    if len(items) <= 1:
+        return ''.join(items)
+    return f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+class IntentRouter:
+    """Rule-based classifier that renders answers from a knowledge dict."""
+
+    def __init__(self, knowledge, min_confidence=0.75):
+        self.knowledge = knowledge
+        self.min_confidence = min_confidence
+        self.info = knowledge['personal_info']
+        self.first_name = self.info['name'].split()[0]
+        self._project_aliases = self._build_project_aliases()
+        self._project_words = self._build_project_words()
+        self._filler = FILLER_WORDS | set(normalize_message(self.info['name']).split()) | {
+            normalize_message(f"{self.first_name}'s")
+        }
+        # (intent, weight, trigger, render, other words such a question carries)
+        self._rules = [
+            ('email', 0.95, re.compile(r"\b(e ?mail|email address|mail)\b"), self._email,
+             "address send write"),
+            ('phone', 0.95, re.compile(r"\b(phone|call|number|cell|mobile)\b"), self._phone,
+             "phone number cell mobile call"),
+            ('contact', 0.9, re.compile(r"\b(contact|reach|get in touch|connect with)\b"), self._contact,
+             "info information details best way"),
+            ('location', 0.9, re.compile(r"\b(where|location|located|based|live|city)\b"), self._location,
+             "where located based live lives city"),
+            ('website', 0.9, re.compile(r"\b(website|site|portfolio url|web page)\b"), self._website,
+             "url link address personal"),
+            ('company', 0.9, re.compile(r"\b(company|founder|founded|own business|agency)\b"), self._company,
+             "found run runs own name business"),
+            ('experience', 0.9,
+             re.compile(r"\b(how many years|years of experience|how long|experience level|how experienced)\b"),
+             self._experience, "years experience been coding programming developer working professional"),
+            ('metrics', 0.9,
+             re.compile(r"\b(how many (websites|sites|clients|ai projects)|delivered|client satisfaction|metrics|"
+                        r"track record)\b"),
+             self._metrics, "websites sites clients ai projects delivered built completed"),
+            ('skills', 0.9,
+             re.compile(r"\b(skills?|tech stack|stack|technologies|languages|programming|frameworks|databases|tools)\b"),
+             self._skills, "skills tech stack technologies programming languages frameworks databases tools "
+                           "frontend front backend back end ai ml machine learning database devops other main"),
+            ('projects', 0.9, re.compile(r"\b(projects?|built|build|made|portfolio|work on|worked on)\b"),
+             self._projects, "projects project built made portfolio main major"),
+        ]
+        self._rule_words = {intent: frozenset(words.split()) for intent, _, _, _, words in self._rules}
+
+    def _build_project_aliases(self):
+        aliases = {}
+        for key, project in self.knowledge['projects'].items():
+            names = {
+                normalize_message(project['name']),
+                normalize_message(key.replace('_', ' ')),
+                # "Nouvo.dev Platform" -> "nouvo dev platform" and "nouvo platform"
+                normalize_message(re.sub(r"\.\w+", "", project['name'])),
+                normalize_message(re.sub(r"\s*\(.*?\)", "", project['name'])),
+            }
+            # "Business Website (Pop Up)" is also known as "Pop Up"
+            names.update(normalize_message(alias) for alias in re.findall(r"\((.*?)\)", project['name']))
+            for name in names:
+                aliases[name] = key
+        # Longest first so "resume site ai" wins over a shorter overlapping alias
+        return sorted(aliases.items(), key=lambda item: -len(item[0]))
+
+    def _build_project_words(self):
+        words = {}
+        for alias, key in self._project_aliases:
+            words[key] = words.get(key, frozenset()) | frozenset(alias.split())
+        return words
+
+    def _find_projects(self, text):
+        found = []
+        for alias, key in self._project_aliases:
+            if re.search(rf"\b{re.escape(alias)}\b", text) and key not in found:
+                found.append(key)
+        return found
+
+    def route(self, message):
+        """Return a Route for a confidently recognized question, else None."""
+        text = normalize_message(message)
+        if OPEN_ENDED.search(text):
+            return None
+
+        projects = self._find_projects(text)
+        if len(projects) == 1:
+            words = self._project_words[projects[0]] | PROJECT_DETAIL_WORDS
+            confidence = 0.9 * self._coverage(text, (), words)
+            return self._accept(Route('project_detail', confidence, self._project_detail(projects[0], text)))
+        if len(projects) > 1:
+            return None
+
+        matches = [(intent, weight, pattern, render) for intent, weight, pattern, render, _ in self._rules
+                   if pattern.search(text)]
+        if not matches:
+            return None
+        intents = {intent for intent, _, _, _ in matches}
+        # Email + phone (or contact) together is still just a contact question
+        if intents & {'email', 'phone', 'contact'} and intents <= {'email', 'phone', 'contact', 'website'}:
+            if len(intents) > 1:
+                words = frozenset().union(*(self._rule_words[intent] for intent in intents))
+                confidence = 0.9 * self._coverage(text, [pattern for _, _, pattern, _ in matches], words)
+                return self._accept(Route('contact', confidence, self._contact(text)))
+        if len(intents) > 1:
+            # Several unrelated intents ("skills and projects") need the model to synthesize
+            return None
+
+        intent, weight, pattern, render = matches[0]
+        confidence = weight * self._coverage(text, [pattern], self._rule_words[intent])
+        if confidence < self.min_confidence:
+            return None
+        return self._accept(Route(intent, confidence, render(text)))
+
+    def _coverage(self, text, patterns, words):
+        """Share of the question's content words that the triggers or a rule's words account for."""
+        explained = set(words)
+        for pattern in patterns:
+            for match in pattern.finditer(text):
+                explained.update(match.group(0).split())
+        content = [word for word in text.split() if word not in self._filler]
+        if not content:
+            return 1.0
+        return sum(1 for word in content if word in explained) / len(content)
+
+    def _accept(self, route):
+        if route.answer is None or route.confidence < self.min_confidence:
+            return None
+        return route
+
+    def _email(self, text):
+        return f"You can email {self.first_name} at {self.info['email']}."
+
+    def _phone(self, text):
+        return f"You can reach {self.first_name} by phone at {self.info['phone']}."
+
+    def _contact(self, text):
+        return (
+            f"You can reach {self.info['name']} by email at {self.info['email']} "
+            f"or by phone at {self.info['phone']}. You can also learn more about his work "
+            f"at {self.info['website']}."
+        )
+
+    def _location(self, text):
+        return f"{self.first_name} is based in {self.info['location']}."
+
+    def _website(self, text):
+        return f"{self.first_name}'s website is {self.info['website']}."
+
+    def _company(self, text):
+        return (
+            f"{self.first_name} is the founder of {self.info['company'].split(' (')[0]}. "
+            f"Learn more at {self.info['website']}."
+        )
+
+    def _experience(self, text):
+        return f"{self.first_name} has {self.info['experience']} of experience as a {self.info['title']}."
+
+    def _metrics(self, text):
+        metrics = self.knowledge['metrics']
+        return (
+            f"{self.first_name} has {metrics['years_experience']} years of experience, has delivered "
+            f"{metrics['websites_delivered']} websites and {metrics['ai_projects']} AI projects, "
+            f"founded {metrics['companies_founded']} company, and has {metrics['client_satisfaction']} "
+            f"client satisfaction."
+        )
+
+    def _skills(self, text):
+        skills = self.knowledge['skills']
+        categories = [key for key, (_, pattern) in SKILL_CATEGORIES.items()
+                      if key in skills and re.search(pattern, text)]
+        if len(categories) == 1:
+            label = SKILL_CATEGORIES[categories[0]][0]
+            return f"{self.first_name}'s {label} skills include {_join(skills[categories[0]])}."
+        if categories:
+            return None
+        lines = [f"{self.first_name}'s skills include:"]
+        for key, values in skills.items():
+            label = SKILL_CATEGORIES.get(key, (key,))[0]
+            lines.append(f"- {label[0].upper() + label[1:]}: {', '.join(values)}")
+        return "\n".join(lines)
+
+    def _projects(self, text):
+        projects = self.knowledge['projects'].values()
+        lines = [f"{self.first_name} has built {len(projects)} major projects:"]
+        for project in projects:
+            lines.append(f"- {project['name']} ({project['status']}): {project['description']}")
+        return "\n".join(lines)
+
+    def _project_detail(self, key, text):
+        project = self.knowledge['projects'][key]
+        if STATUS_QUESTION.search(text):
+            return self._project_status(project, text)
+        if re.search(r"\b(tech|technologies|stack|built with|use|used|uses)\b", text):
+            return f"{project['name']} is built with {_join(project['technologies'])}."
+        return "\n".join([
+            f"{project['name']} ({project['status']}): {project['description']}",
+            "",
+            f"Technologies: {', '.join(project['technologies'])}",
+            f"Key features: {'; '.join(project['features'])}",
+            f"Challenges solved: {'; '.join(project['challenges_solved'])}",
+        ])
+
+    def _project_status(self, project, text):
+        status = project['status'].lower()
+        if status not in PROJECT_STATUSES:
+            # No phrasing for this status; the model can word it
+            return None
+        statement = f"{project['name']} is {PROJECT_STATUSES[status][0]}."
+        asked = [key for key, (_, pattern) in PROJECT_STATUSES.items() if pattern.search(text)]
+        if not YES_NO_QUESTION.match(text) or not asked:
+            return statement
+        return f"{'Yes' if status in asked else 'No'}, {statement}"
+
+
+def create_intent_router_from_env(knowledge):
+    """Build the router from INTENT_ROUTER_* settings, or None if disabled."""
+    if os.getenv('INTENT_ROUTER_ENABLED', 'true').lower() in ('0', 'false', 'off', 'no'):
+        return None
+    return IntentRouter(
+        knowledge,
+        min_confidence=float(os.getenv('INTENT_ROUTER_MIN_CONFIDENCE', 0.75))
+    )
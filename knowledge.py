@@ -0,0 +1,217 @@
+"""
+Knowledge base loading, validation and hot reload.
+
+The knowledge base lives in a JSON (or YAML) file, or a directory of such
+files whose top-level sections are merged. KnowledgeStore polls file mtimes
+and, when something changed, loads and validates the new content, builds all
+derived views (compiled system prompt, /api/knowledge payload, intent router,
+retriever) off to the side and swaps them in as one immutable snapshot.
+Readers only ever read `store.current`, so they never wait on a reload.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_EXTENSIONS = ('.json', '.yaml', '.yml')
+
+PERSONAL_INFO_FIELDS = ('name', 'title', 'experience', 'location', 'email', 'phone', 'website', 'company')
+SUMMARY_FIELDS = ('overview', 'specialization', 'expertise', 'goal')
+PROJECT_TEXT_FIELDS = ('name', 'description', 'status')
+PROJECT_LIST_FIELDS = ('technologies', 'features', 'challenges_solved')
+
+
+class KnowledgeError(ValueError):
+    """The knowledge base could not be loaded or failed validation."""
+
+
+def _require_dict(value, path):
+    if not isinstance(value, dict) or not value:
+        raise KnowledgeError(f"{path} must be a non-empty object")
+    return value
+
+
+def _require_text(value, path):
+    if not isinstance(value, str) or not value.strip():
+        raise KnowledgeError(f"{path} must be a non-empty string")
+
+
+def _require_text_list(value, path):
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise KnowledgeError(f"{path} must be a list of strings")
+
+
+def validate_knowledge(knowledge):
+    """Raise KnowledgeError unless `knowledge` has the shape the app relies on."""
+    _require_dict(knowledge, 'knowledge')
+    info = _require_dict(knowledge.get('personal_info'), 'personal_info')
+    for field in PERSONAL_INFO_FIELDS:
+        _require_text(info.get(field), f'personal_info.{field}')
+
+    summary = _require_dict(knowledge.get('summary'), 'summary')
+    for field in SUMMARY_FIELDS:
+        _require_text(summary.get(field), f'summary.{field}')
+
+    projects = _require_dict(knowledge.get('projects'), 'projects')
+    for key, project in projects.items():
+        _require_dict(project, f'projects.{key}')
+        for field in PROJECT_TEXT_FIELDS:
+            _require_text(project.get(field), f'projects.{key}.{field}')
+        for field in PROJECT_LIST_FIELDS:
+            _require_text_list(project.get(field), f'projects.{key}.{field}')
+
+    skills = _require_dict(knowledge.get('skills'), 'skills')
+    for category, values in skills.items():
+        _require_text_list(values, f'skills.{category}')
+
+    metrics = _require_dict(knowledge.get('metrics'), 'metrics')
+    for key, value in metrics.items():
+        _require_text(value, f'metrics.{key}')
+
+
+def _knowledge_files(path):
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.endswith(KNOWLEDGE_EXTENSIONS) and not name.startswith('.')
+        )
+    return [path]
+
+
+def _read_file(path):
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise KnowledgeError(f"PyYAML is required to load {path}")
+            content = yaml.safe_load(f)
+        else:
+            content = json.load(f)
+    if not isinstance(content, dict):
+        raise KnowledgeError(f"{path} must contain an object at the top level")
+    return content
+
+
+def file_signature(path):
+    """Cheap change detector: (name, mtime, size) of every knowledge file."""
+    try:
+        files = _knowledge_files(path)
+        return tuple((name, os.stat(name).st_mtime_ns, os.stat(name).st_size) for name in files)
+    except OSError:
+        return None
+
+
+def load_knowledge(path):
+    """Load, merge and validate the knowledge base at `path`."""
+    files = _knowledge_files(path)
+    if not files:
+        raise KnowledgeError(f"No knowledge files found in {path}")
+    knowledge = {}
+    for name in files:
+        try:
+            knowledge.update(_read_file(name))
+        except (OSError, ValueError) as e:
+            if isinstance(e, KnowledgeError):
+                raise
+            raise KnowledgeError(f"Could not read {name}: {str(e)}")
+    validate_knowledge(knowledge)
+    return knowledge
+
+
+class KnowledgeSnapshot:
+    """One immutable knowledge version plus everything precomputed from it."""
+
+    __slots__ = ('knowledge', 'version', 'digest', 'loaded_at', 'views')
+
+    def __init__(self, knowledge, views):
+        canonical = json.dumps(knowledge, sort_keys=True, separators=(',', ':'))
+        self.knowledge = knowledge
+        self.digest = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+        # The file's own version field is rarely bumped on edit; the hash always changes
+        declared = knowledge.get('version')
+        self.version = f"{declared}+{self.digest}" if declared else self.digest
+        self.loaded_at = time.time()
+        self.views = views
+
+
+class KnowledgeStore:
+    """Holds the current snapshot and swaps in a new one when the files change.
+
+    build_views(knowledge) returns the dict of derived views for a snapshot.
+    """
+
+    def __init__(self, path, build_views, poll_interval=2.0):
+        self.path = path
+        self.build_views = build_views
+        self.poll_interval = poll_interval
+        self.reloads = 0
+        self.reload_errors = 0
+        self._lock = threading.Lock()
+        self._signature = file_signature(path)
+        self._next_check = time.monotonic() + poll_interval
+        self.current = self._build(load_knowledge(path))
+
+    def _build(self, knowledge):
+        return KnowledgeSnapshot(knowledge, self.build_views(knowledge))
+
+    def reload_due(self):
+        """True once the poll interval has elapsed, i.e. maybe_reload would touch the disk."""
+        return self.poll_interval > 0 and time.monotonic() >= self._next_check
+
+    def maybe_reload(self):
+        """Reload if the poll interval elapsed and the files changed. Never blocks."""
+        if not self.reload_due():
+            return False
+        if not self._lock.acquire(blocking=False):
+            # Another thread is already checking; keep serving the current snapshot
+            return False
+        try:
+            self._next_check = time.monotonic() + self.poll_interval
+            signature = file_signature(self.path)
+            if signature is None or signature == self._signature:
+                return False
+            return self._reload(signature)
+        finally:
+            self._lock.release()
+
+    def reload(self):
+        """Rebuild from disk unconditionally (e.g. after env changes)."""
+        with self._lock:
+            return self._reload(file_signature(self.path))
+
+    def _reload(self, signature):
+        try:
+            snapshot = self._build(load_knowledge(self.path))
+        except Exception as e:
+            # Keep serving the last good version; try again once the files change
+            self.reload_errors += 1
+            self._signature = signature
+            logger.error(f"Knowledge reload failed, keeping version {self.current.version}: {str(e)}")
+            return False
+        self._signature = signature
+        self.current = snapshot
+        self.reloads += 1
+        logger.info(f"Knowledge base reloaded (version {snapshot.version})")
+        return True
+
+    def stats(self):
+        return {
+            'version': self.current.version,
+            'loaded_at': self.current.loaded_at,
+            'reloads': self.reloads,
+            'reload_errors': self.reload_errors
+        }
+
+
+def create_knowledge_store_from_env(build_views, default_path):
+    return KnowledgeStore(
+        os.getenv('KNOWLEDGE_PATH', default_path),
+        build_views,
+        poll_interval=float(os.getenv('KNOWLEDGE_RELOAD_INTERVAL', 2.0))
+    )
@@ -0,0 +1,433 @@
+"""
+In-process metrics with a Prometheus text exposition.
+
+Log lines cannot say how much of a slow /api/chat response was validation,
+prompt building, waiting for an upstream slot, retries or serialization.
+Counters and fixed-bucket histograms recorded here can. Recording is a
+bisect and two list increments on a per-thread shard, with no lock, so a
+request pays a few microseconds in total.
+
+Each gunicorn worker records into its own registry. With the SQLite store,
+workers periodically write a snapshot of their registry to a shared file,
+and GET /metrics sums the snapshots of every worker, so a scrape sees the
+whole dyno whichever worker answers it. Snapshots of exited workers are
+kept, so counters do not go backwards when gunicorn replaces a worker.
+"""
+
+import itertools
+import json
+import logging
+import math
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds: sub-millisecond local stages up to slow upstream calls
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Timer:
+    """Context manager passing the monotonic time spent in its block to histogram.observe."""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class _Sharded:
+    """Per-thread slot lists, so recording takes no lock and loses no update.
+
+    Each thread only ever writes its own list; readers sum all of them.
+    A reader may see a count without its sum for an instant, which a
+    scrape can live with. When a thread exits, its counts are folded into
+    a base total and its list is dropped, so short-lived threads (a batch's
+    thread pool, a thread per connection) do not pile up shards.
+    """
+
+    __slots__ = ('_size', '_local', '_shards', '_base', '_lock')
+
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._shards = []
+        self._base = [0] * size
+        self._lock = threading.Lock()
+
+    def shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = [0] * self._size
+            # Only the thread's local dict refers to the owner, so it is
+            # collected when the thread exits, which retires the shard
+            owner = self._local.owner = _ShardOwner()
+            weakref.finalize(owner, self._retire, shard)
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._base = [base + value for base, value in zip(self._base, shard)]
+            self._shards = [other for other in self._shards if other is not shard]
+
+    def totals(self):
+        with self._lock:
+            shards = list(self._shards)
+            base = self._base
+        return [sum(values) for values in zip(base, *shards)]
+
+
+class _ShardOwner:
+    __slots__ = ('__weakref__',)
+
+
+class _CounterChild(_Sharded):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self.shard()
+        shard[0] += amount
+
+    @property
+    def value(self):
+        return self.totals()[0]
+
+
+class _HistogramChild(_Sharded):
+    __slots__ = ('buckets',)
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One slot per bucket, the overflow (+Inf) slot, then the sum
+        super().__init__(len(buckets) + 2)
+
+    def observe(self, value):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self.shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self):
+        """Context manager observing the monotonic time spent in its block."""
+        return Timer(self)
+
+    def counts_and_sum(self):
+        totals = self.totals()
+        return totals[:-1], totals[-1]
+
+
+class _Family:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # Unlabelled metrics are reported (as zero) before their first update
+            self.labels()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def children(self):
+        return list(self._children.items())
+
+
+class Counter(_Family):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Histogram(_Family):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+
+def estimate_quantile(buckets, counts, quantile):
+    """Interpolate a quantile from bucket counts, as PromQL's histogram_quantile does."""
+    total = sum(counts)
+    if not total:
+        return math.nan
+    rank = quantile * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= rank:
+            if index == len(buckets):
+                # Past the last finite bucket all we know is the lower bound
+                return buckets[-1]
+            lower = buckets[index - 1] if index else 0.0
+            return lower + (buckets[index] - lower) * (rank - seen) / count
+        seen += count
+    return buckets[-1]
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isnan(value):
+            return 'NaN'
+        return repr(value)
+    return str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class SQLiteMetricsStore(SQLiteStore):
+    """Per-worker snapshots in a SQLite file shared by all workers on a dyno."""
+
+    def __init__(self, path, retention=86400):
+        super().__init__(path)
+        self.retention = retention
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS worker_metrics ("
+            "worker TEXT PRIMARY KEY, snapshot TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def save(self, worker, snapshot):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO worker_metrics (worker, snapshot, updated_at) VALUES (?, ?, ?)",
+            (worker, json.dumps(snapshot, separators=(',', ':')), now)
+        )
+        conn.execute("DELETE FROM worker_metrics WHERE updated_at < ?", (now - self.retention,))
+
+    def load(self):
+        rows = self._connect().execute("SELECT snapshot FROM worker_metrics").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+class MetricsRegistry:
+    def __init__(self, store=None, flush_interval=5.0):
+        self.store = store
+        self.flush_interval = flush_interval
+        self._families = {}
+        self._next_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+    def _register(self, family):
+        if family.name in self._families:
+            raise ValueError(f"Metric {family.name} is already registered")
+        self._families[family.name] = family
+        return family
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        """This process's values as plain JSON-serializable data."""
+        snapshot = {}
+        for name, family in self._families.items():
+            if family.kind == 'counter':
+                snapshot[name] = [[list(values), child.value] for values, child in family.children()]
+            else:
+                snapshot[name] = [[list(values), *child.counts_and_sum()] for values, child in family.children()]
+        return snapshot
+
+    def _worker_id(self):
+        # Recomputed after a fork, so workers forked from a preloaded app do not share a row
+        pid = os.getpid()
+        if pid != self._worker_pid:
+            self._worker_pid = pid
+            # The start time keeps a reused pid from taking over an exited worker's row
+            self._worker = f"{pid}-{id(self):x}-{time.time():.6f}"
+        return self._worker
+
+    def flush(self):
+        if self.store is None:
+            return
+        try:
+            self.store.save(self._worker_id(), self.snapshot())
+        except Exception as e:
+            logger.warning(f"Metrics flush failed: {str(e)}")
+
+    def flush_due(self):
+        """True once maybe_flush would write to the store."""
+        return self.store is not None and time.monotonic() >= self._next_flush
+
+    def maybe_flush(self):
+        """Cheap enough to call after every request; writes at most once per flush_interval."""
+        if not self.flush_due():
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_flush = time.monotonic() + self.flush_interval
+            self.flush()
+        finally:
+            self._flush_lock.release()
+
+    def collect(self):
+        """Snapshots to report: every worker's with a store, else just this process's."""
+        if self.store is None:
+            return [self.snapshot()]
+        self.flush()
+        try:
+            return self.store.load()
+        except Exception as e:
+            logger.warning(f"Metrics load failed, reporting this worker only: {str(e)}")
+            return [self.snapshot()]
+
+    def merged(self):
+        """{name: {label values: value or [counts, sum]}} summed over collect()."""
+        merged = {name: {} for name in self._families}
+        for snapshot in self.collect():
+            for name, entries in snapshot.items():
+                family = self._families.get(name)
+                if family is None:
+                    continue
+                target = merged[name]
+                for entry in entries:
+                    values = tuple(entry[0])
+                    if family.kind == 'counter':
+                        target[values] = target.get(values, 0) + entry[1]
+                    elif len(entry[1]) == len(family.buckets) + 1:
+                        counts, total = target.get(values, ([0] * len(entry[1]), 0.0))
+                        target[values] = ([a + b for a, b in zip(counts, entry[1])], total + entry[2])
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, values_map in self.merged().items():
+            family = self._families[name]
+            lines.append(f"# HELP {name} {family.documentation}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            if family.kind == 'counter':
+                for values in sorted(values_map):
+                    pairs = list(zip(family.labelnames, values))
+                    lines.append(f"{name}{_format_labels(pairs)} {_format_value(values_map[values])}")
+                continue
+
+            quantile_lines = []
+            for values in sorted(values_map):
+                pairs = list(zip(family.labelnames, values))
+                counts, total = values_map[values]
+                cumulative = 0
+                for bound, count in zip(family.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(pairs + [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(pairs)} {cumulative}")
+                for quantile in QUANTILES:
+                    estimate = float(estimate_quantile(family.buckets, counts, quantile))
+                    quantile_lines.append(
+                        f"{name}_quantile{_format_labels(pairs + [('quantile', quantile)])} {_format_value(estimate)}"
+                    )
+            # Bucket-interpolated p50/p95/p99 for reading the page without PromQL
+            lines.append(f"# HELP {name}_quantile Quantiles estimated from the {name} buckets")
+            lines.append(f"# TYPE {name}_quantile gauge")
+            lines.extend(quantile_lines)
+        return '\n'.join(lines) + '\n'
+
+
+def count_attempts(func, attempt_seconds, retries, errors):
+    """Wrap a call_with_retries attempt to time it and count retries and errors by type."""
+    calls = itertools.count()
+
+    def attempt(timeout):
+        if next(calls):
+            retries.inc()
+        start = time.perf_counter()
+        try:
+            return func(timeout)
+        except Exception as e:
+            errors.labels(type(e).__name__).inc()
+            raise
+        finally:
+            attempt_seconds.observe(time.perf_counter() - start)
+    return attempt
+
+
+def async_count_attempts(func, attempt_seconds, retries, errors):
+    """Async twin of count_attempts."""
+    calls = itertools.count()
+
+    async def attempt(timeout):
+        if next(calls):
+            retries.inc()
+        start = time.perf_counter()
+        try:
+            return await func(timeout)
+        except Exception as e:
+            errors.labels(type(e).__name__).inc()
+            raise
+        finally:
+            attempt_seconds.observe(time.perf_counter() - start)
+    return attempt
+
+
+def create_metrics_from_env():
+    """Build the registry from METRICS_* settings."""
+    backend_name = os.getenv('METRICS_BACKEND', 'memory').lower()
+    flush_interval = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+    if backend_name == 'sqlite':
+        store = SQLiteMetricsStore(os.getenv('METRICS_PATH', 'metrics.sqlite3'))
+    elif backend_name == 'memory':
+        store = None
+    else:
+        raise ValueError(f"Unknown METRICS_BACKEND: {backend_name}")
+    return MetricsRegistry(store, flush_interval=flush_interval)
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI ChatCompletion API
+Used by the streaming test and benchmarks so nothing talks to the real API
+
+Point the app at it with:
+    OPENAI_API_BASE=http://127.0.0.1:8001/v1 python app.py
+"""
+
+import argparse
+import json
+import os
+import random
+import ssl
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSE = (
+    "Manuel David is a Software Developer & AI Engineer based in Atlanta, GA "
+    "with 2+ years of experience building full-stack and AI-driven applications."
+)
+
+
+def make_self_signed_cert(directory):
+    """Write a throwaway certificate for 127.0.0.1 with the openssl CLI; returns (certfile, keyfile)."""
+    certfile = os.path.join(directory, 'mock-cert.pem')
+    keyfile = os.path.join(directory, 'mock-key.pem')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-keyout', keyfile, '-out', certfile,
+        '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1,DNS:localhost'
+    ], check=True, capture_output=True)
+    return certfile, keyfile
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler_class, mock, ssl_context=None):
+        self.mock = mock
+        self.ssl_context = ssl_context
+        super().__init__(address, handler_class)
+
+    def finish_request(self, request, client_address):
+        # Runs on the connection's own thread, so slow handshakes do not hold up accept()
+        self.mock._connected()
+        if self.mock.connect_latency:
+            time.sleep(self.mock.connect_latency)
+        if self.ssl_context is None:
+            super().finish_request(request, client_address)
+            return
+        try:
+            request = self.ssl_context.wrap_socket(request, server_side=True)
+        except (ssl.SSLError, OSError):
+            return
+        try:
+            super().finish_request(request, client_address)
+        finally:
+            request.close()
+
+
+class MockOpenAIServer:
+    """Threaded HTTP server answering POST /v1/chat/completions.
+
+    latency: seconds before the first byte of any response (the median when
+        latency_sigma is set)
+    latency_sigma: spread of a log-normal latency distribution around
+        `latency`; 0 gives a fixed latency. Real API latency is long-tailed:
+        0.5 puts p99 at about 3.2x the median
+    token_delay: seconds between streamed tokens (also added per token to
+        non-streaming responses, so both modes take the same total time)
+    prompt_token_latency: extra seconds per prompt token (~4 characters),
+        modelling the time the model spends reading a longer prompt
+    error_status: if set, every request fails with this HTTP status
+    error_rate: fraction of requests that fail with a 500 after the latency
+    rate_limit_rate: fraction of requests rejected at once with a 429 and
+        Retry-After, as the API does when a quota is exhausted
+    seed: seeds the latency and error draws, so runs are repeatable
+    echo: answer "Answer to: <user message>" instead of response_text, so
+        callers can tell which question a response belongs to
+    capacity: requests served at once; the rest wait their turn, like an
+        API that is already saturated
+    certfile/keyfile: serve HTTPS with this certificate (see
+        make_self_signed_cert), so TLS handshakes cost what they do for real
+    connect_latency: seconds added to every new connection before it is
+        served, modelling the TCP and TLS round trips to a distant API
+    model_profiles: {model: {'latency': ..., 'token_delay': ...}} overriding
+        latency and token_delay for requests naming that model, since a
+        smaller model answers sooner and streams faster
+    answer_length: callable(request body) -> words in the answer, repeating
+        response_text as needed; answers are cut at the request's max_tokens
+        with finish_reason "length", as the API does
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, token_delay=0.0,
+                 response_text=DEFAULT_RESPONSE, error_status=None, prompt_token_latency=0.0, echo=False,
+                 capacity=None, latency_sigma=0.0, error_rate=0.0, rate_limit_rate=0.0, seed=None,
+                 certfile=None, keyfile=None, connect_latency=0.0, model_profiles=None, answer_length=None):
+        self.latency = latency
+        self.model_profiles = model_profiles or {}
+        self.answer_length = answer_length
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+        self.token_delay = token_delay
+        self.prompt_token_latency = prompt_token_latency
+        self.response_text = response_text
+        self.error_status = error_status
+        self.echo = echo
+        self._capacity = threading.Semaphore(capacity) if capacity else None
+        self._capacity_size = capacity
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.last_request = None
+        self.connect_latency = connect_latency
+        self.connections = 0
+        self._lock = threading.Lock()
+        ssl_context = None
+        if certfile:
+            ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            ssl_context.load_cert_chain(certfile, keyfile)
+        self._httpd = _MockHTTPServer((host, port), self._handler_class(), self, ssl_context)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        scheme = 'https' if self._httpd.ssl_context is not None else 'http'
+        return f"{scheme}://{host}:{port}/v1"
+
+    def _connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def answer(self, body):
+        if self.echo:
+            messages = body.get('messages') or [{}]
+            return f"Answer to: {messages[-1].get('content', '')}"
+        if self.answer_length is not None:
+            words = self.response_text.split(' ')
+            return ' '.join(words[i % len(words)] for i in range(self.answer_length(body)))
+        return self.response_text
+
+    def profile(self, model):
+        """(latency, token_delay) for requests naming this model."""
+        profile = self.model_profiles.get(model, {})
+        return profile.get('latency', self.latency), profile.get('token_delay', self.token_delay)
+
+    def draw(self, model=None):
+        """Return (latency, outcome) for one request; outcome is 'ok', 'error' or 'rate_limited'."""
+        with self._lock:
+            roll = self._random.random()
+            latency = self.profile(model)[0]
+            if self.latency_sigma and latency:
+                latency *= self._random.lognormvariate(0.0, self.latency_sigma)
+            if roll < self.rate_limit_rate:
+                self.rate_limited += 1
+                return latency, 'rate_limited'
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.errors += 1
+                return latency, 'error'
+        return latency, 'ok'
+
+    def config(self):
+        """The settings a load test result should be compared under."""
+        return {
+            'latency': self.latency,
+            'latency_sigma': self.latency_sigma,
+            'token_delay': self.token_delay,
+            'prompt_token_latency': self.prompt_token_latency,
+            'error_rate': self.error_rate,
+            'rate_limit_rate': self.rate_limit_rate,
+            'error_status': self.error_status,
+            'capacity': self._capacity_size,
+            'tls': self._httpd.ssl_context is not None,
+            'connect_latency': self.connect_latency,
+            'model_profiles': self.model_profiles,
+        }
+
+    def tokens(self, text=None):
+        words = (text or self.response_text).split(' ')
+        return [word if i == 0 else ' ' + word for i, word in enumerate(words)]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; with Nagle on, the body
+            # would wait ~40 ms for the client's delayed ACK on a kept-alive connection
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                if server._capacity is None:
+                    self._handle_post()
+                    return
+                with server._capacity:
+                    self._handle_post()
+
+            def _handle_post(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                with server._lock:
+                    server.calls += 1
+                    server.last_request = body
+
+                if not self.path.endswith('/chat/completions'):
+                    self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+                    return
+
+                model = body.get('model', 'gpt-4')
+                latency, outcome = server.draw(model)
+                if outcome == 'rate_limited':
+                    self._send_json(429, {
+                        'error': {'message': 'Rate limit reached (mock)', 'type': 'requests'}
+                    }, headers={'Retry-After': '1'})
+                    return
+
+                prompt_tokens = sum(len(m.get('content', '')) // 4 for m in body.get('messages', []))
+                time.sleep(latency + server.prompt_token_latency * prompt_tokens)
+
+                if outcome == 'error':
+                    self._send_json(500, {
+                        'error': {'message': 'The server had an error (mock)', 'type': 'server_error'}
+                    })
+                    return
+
+                if server.error_status:
+                    self._send_json(server.error_status, {
+                        'error': {'message': 'Mock upstream error', 'type': 'mock_error'}
+                    }, headers={'Retry-After': '1'} if server.error_status == 429 else None)
+                    return
+
+                answer = server.answer(body)
+                tokens = server.tokens(answer)
+                finish_reason = 'stop'
+                if body.get('max_tokens') and len(tokens) > body['max_tokens']:
+                    tokens = tokens[:body['max_tokens']]
+                    answer = ''.join(tokens)
+                    finish_reason = 'length'
+                token_delay = server.profile(model)[1]
+                if body.get('stream'):
+                    self._stream(model, tokens, token_delay, finish_reason)
+                else:
+                    time.sleep(token_delay * len(tokens))
+                    self._send_json(200, {
+                        'id': 'chatcmpl-mock',
+                        'object': 'chat.completion',
+                        'created': int(time.time()),
+                        'model': model,
+                        'choices': [{
+                            'index': 0,
+                            'message': {'role': 'assistant', 'content': answer},
+                            'finish_reason': finish_reason
+                        }],
+                        'usage': {
+                            'prompt_tokens': prompt_tokens,
+                            'completion_tokens': len(tokens),
+                            'total_tokens': prompt_tokens + len(tokens)
+                        }
+                    })
+
+            def _stream(self, model, tokens, token_delay, finish_reason):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                for token in tokens:
+                    chunk = {
+                        'id': 'chatcmpl-mock',
+                        'object': 'chat.completion.chunk',
+                        'created': int(time.time()),
+                        'model': model,
+                        'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                    time.sleep(token_delay)
+                if finish_reason != 'stop':
+                    chunk = {
+                        'id': 'chatcmpl-mock',
+                        'object': 'chat.completion.chunk',
+                        'created': int(time.time()),
+                        'model': model,
+                        'choices': [{'index': 0, 'delta': {}, 'finish_reason': finish_reason}]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local mock of the OpenAI ChatCompletion API')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.5, help='(median) seconds before the first byte')
+    parser.add_argument('--latency-sigma', type=float, default=0.0,
+                        help='log-normal spread of the latency (0 = fixed)')
+    parser.add_argument('--token-delay', type=float, default=0.02, help='seconds between tokens')
+    parser.add_argument('--prompt-token-latency', type=float, default=0.0,
+                        help='extra seconds per prompt token')
+    parser.add_argument('--error-status', type=int, default=None)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests failing with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction of requests rejected with 429')
+    parser.add_argument('--capacity', type=int, default=None, help='requests served at once')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--certfile', default=None, help='serve HTTPS with this certificate')
+    parser.add_argument('--keyfile', default=None)
+    parser.add_argument('--connect-latency', type=float, default=0.0,
+                        help='seconds added to every new connection')
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(port=args.port, latency=args.latency,
+                              token_delay=args.token_delay, error_status=args.error_status,
+                              prompt_token_latency=args.prompt_token_latency, capacity=args.capacity,
+                              latency_sigma=args.latency_sigma, error_rate=args.error_rate,
+                              rate_limit_rate=args.rate_limit_rate, seed=args.seed,
+                              certfile=args.certfile, keyfile=args.keyfile,
+                              connect_latency=args.connect_latency)
+    print(f"Mock OpenAI API listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Fixed question corpus for local benchmarks, starting from the questions in
+test_chatbot.py and extended with the kinds of questions visitors ask.
+"""
+
+from test_chatbot import TEST_QUESTIONS
+
+QUESTIONS = TEST_QUESTIONS + [
+    "What is Manuel's email?",
+    "What's Manuel's phone number?",
+    "How do I get in touch with Manuel?",
+    "Where is Manuel based?",
+    "What is his website?",
+    "What company did Manuel found?",
+    "How many years of experience does Manuel have?",
+    "How many websites has Manuel delivered?",
+    "What are Manuel's frontend skills?",
+    "What databases does Manuel use?",
+    "What is Manuel's tech stack?",
+    "What has Manuel built?",
+    "Is Therapist AI live?",
+    "What technologies does the Cold Email SaaS use?",
+    "Tell me about the Nouvo.dev Platform",
+    "What challenges did Manuel solve on the Pop Up drink website?",
+    "Compare Manuel's AI projects",
+    "Why should I hire Manuel?",
+    "How did Manuel make Therapist AI's voice sound natural?",
+    "What are Manuel's skills and which projects use them?",
+    "Is Manuel a good fit for a senior AI engineering role?",
+    "What kind of roles is Manuel looking for?",
+    "Does Manuel know Kubernetes?",
+    "What does Manuel do for fun?",
+]
@@ -0,0 +1,259 @@
+"""
+Retry, backoff and circuit breaking for upstream OpenAI calls.
+
+The old retry_on_failure decorator slept a fixed second between attempts and
+retried every exception, including authentication errors that can never
+succeed. During an outage each request held a worker for 3+ seconds and then
+failed anyway. This module retries only transient errors, backs off with
+full jitter while honoring Retry-After, bounds every request by a total
+deadline, and trips a per-process circuit breaker so that once upstream is
+known to be down requests fail fast with a 503 instead of waiting.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def retryable_errors():
+    """Errors that can succeed on a later attempt. Authentication, permission and
+    invalid request errors are deliberately absent.
+
+    openai is imported here rather than at the top: an error to classify means
+    the upstream client is already loaded, and a worker that never calls it
+    does not pay for the import (see upstream.py).
+    """
+    import openai
+    return (
+        openai.error.RateLimitError,
+        openai.error.APIError,
+        openai.error.APIConnectionError,
+        openai.error.Timeout,
+        openai.error.ServiceUnavailableError,
+        openai.error.TryAgain,
+    )
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+    def __init__(self, retry_after):
+        super().__init__("AI service is temporarily unavailable (circuit open)")
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(Exception):
+    """Raised when no time is left in the request's upstream budget."""
+
+    def __init__(self, last_error=None):
+        super().__init__("Upstream deadline exceeded")
+        self.last_error = last_error
+
+
+def is_retryable(error):
+    return isinstance(error, retryable_errors())
+
+
+def retry_after_seconds(error):
+    """Seconds requested by an upstream Retry-After header, if any."""
+    headers = getattr(error, 'headers', None) or {}
+    value = headers.get('Retry-After') if hasattr(headers, 'get') else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, bounded by a total deadline per request."""
+
+    def __init__(self, max_attempts=3, base_delay=0.25, max_delay=4.0, deadline=15.0, jitter=True):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.jitter = jitter
+
+    def backoff(self, attempt, error=None):
+        """Delay before retry number `attempt` (0-based), at least any Retry-After."""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        requested = retry_after_seconds(error)
+        if requested is not None:
+            delay = max(delay, requested)
+        return delay
+
+
+class CircuitBreaker:
+    """Per-process breaker: closed -> open after repeated failures -> half-open probe."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go upstream right now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(retry_after=max(1, int(remaining + 0.999)))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit breaker closed, upstream recovered")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit breaker opened after {self.failures} failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def record_neutral(self):
+        """The call failed for a non-transient reason, or never finished."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'rejected': self.rejected
+        }
+
+
+def _record_outcome(breaker, error):
+    if breaker is None:
+        return
+    if error is None:
+        breaker.record_success()
+    elif is_retryable(error):
+        breaker.record_failure()
+    else:
+        breaker.record_neutral()
+
+
+def _effective_deadline(policy, deadline):
+    own = time.monotonic() + policy.deadline
+    return own if deadline is None else min(own, deadline)
+
+
+def call_with_retries(func, policy, breaker=None, deadline=None):
+    """Call func(timeout) until it succeeds, a non-retryable error occurs or the deadline passes.
+
+    `timeout` is the time left in the request budget, to be passed on as the
+    upstream request timeout. `deadline` (a time.monotonic() value) can only
+    shorten the policy's own budget, e.g. to fit a batch deadline.
+    """
+    deadline = _effective_deadline(policy, deadline)
+    last_error = None
+    for attempt in range(policy.max_attempts):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError(last_error)
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = func(remaining)
+        except Exception as e:
+            _record_outcome(breaker, e)
+            last_error = e
+            logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
+            if not is_retryable(e) or attempt == policy.max_attempts - 1:
+                raise
+            delay = policy.backoff(attempt, e)
+            if time.monotonic() + delay >= deadline:
+                logger.warning("Not retrying: backoff would exceed the request deadline")
+                raise
+            time.sleep(delay)
+        except BaseException:
+            # Cancelled mid-call: free the half-open probe or the breaker never closes
+            if breaker is not None:
+                breaker.record_neutral()
+            raise
+        else:
+            _record_outcome(breaker, None)
+            return result
+    raise last_error
+
+
+async def async_call_with_retries(func, policy, breaker=None, deadline=None):
+    """Async twin of call_with_retries; func(timeout) returns an awaitable."""
+    deadline = _effective_deadline(policy, deadline)
+    last_error = None
+    for attempt in range(policy.max_attempts):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError(last_error)
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = await func(remaining)
+        except Exception as e:
+            _record_outcome(breaker, e)
+            last_error = e
+            logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
+            if not is_retryable(e) or attempt == policy.max_attempts - 1:
+                raise
+            delay = policy.backoff(attempt, e)
+            if time.monotonic() + delay >= deadline:
+                logger.warning("Not retrying: backoff would exceed the request deadline")
+                raise
+            await asyncio.sleep(delay)
+        except BaseException:
+            # Cancelled mid-call: free the half-open probe or the breaker never closes
+            if breaker is not None:
+                breaker.record_neutral()
+            raise
+        else:
+            _record_outcome(breaker, None)
+            return result
+    raise last_error
+
+
+def create_retry_policy_from_env():
+    return RetryPolicy(
+        max_attempts=int(os.getenv('RETRY_MAX_ATTEMPTS', 3)),
+        base_delay=float(os.getenv('RETRY_BASE_DELAY', 0.25)),
+        max_delay=float(os.getenv('RETRY_MAX_DELAY', 4.0)),
+        deadline=float(os.getenv('UPSTREAM_DEADLINE', 15.0))
+    )
+
+
+def create_circuit_breaker_from_env():
+    return CircuitBreaker(
+        failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5)),
+        reset_timeout=float(os.getenv('CIRCUIT_RESET_TIMEOUT', 30.0))
+    )
@@ -0,0 +1,195 @@
+"""
+Retrieval-based prompt slimming.
+
+The full system prompt pretty-prints every project, skill and metric as JSON
+on every request, even for "what's his email?". This module chunks the
+knowledge base into sections (personal info, summary, each project, each
+skill category, metrics), indexes them once with BM25, and assembles a
+per-question prompt from a compact header, the professional summary and the
+top-k sections. Questions asking for every match ("Which projects use
+Firebase?") get a larger k, since the answer is spread over many sections.
+"""
+
+import logging
+import math
+import os
+import re
+from collections import Counter
+
+from cache import normalize_message
+
+logger = logging.getLogger(__name__)
+
+STOP_WORDS = frozenset("""
+    a an the is are was were be what whats which who how do does did can could
+    i me my you your about tell of in on at for to and or his he him has have
+    with from by it its that this manuel manuels david
+""".split())
+
+# Questions whose answer is every section that matches, not the best few
+LIST_QUESTION = re.compile(r"\b(which|all|every|each|list|any)\b|\bprojects\b.*\b(use|uses|using|with)\b")
+
+# Question words that should pull in a section even without lexical overlap
+SYNONYMS = {
+    'contact': ['email', 'phone'],
+    'reach': ['email', 'phone'],
+    'touch': ['email', 'phone'],
+    'where': ['location'],
+    'based': ['location'],
+    'live': ['location'],
+    'tech': ['skills_overview'],
+    'stack': ['skills_overview'],
+    'skill': ['skills_overview'],
+    'project': ['portfolio_overview'],
+    'built': ['portfolio_overview'],
+    'build': ['portfolio_overview'],
+    'made': ['portfolio_overview'],
+    'experience': ['years_experience', 'experience'],
+    'ai': ['ai_ml', 'openai'],
+    'database': ['databases'],
+    'career': ['goal', 'seeking', 'role'],
+    'looking': ['seeking', 'role'],
+}
+
+
+def estimate_tokens(text):
+    """Rough GPT token count (~4 characters per token for English)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def tokenize(text):
+    tokens = []
+    for word in normalize_message(text).split():
+        if word in STOP_WORDS:
+            continue
+        # Crude plural folding so "projects" matches "project"
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class Chunk:
+    __slots__ = ('id', 'title', 'text')
+
+    def __init__(self, id, title, text):
+        self.id = id
+        self.title = title
+        self.text = text
+
+
+def chunk_knowledge(knowledge):
+    """Split the knowledge dict into self-contained prompt sections."""
+    info = knowledge['personal_info']
+    chunks = [
+        Chunk('personal_info', 'PERSONAL INFO', "\n".join(
+            f"- {key.replace('_', ' ').title()}: {value}" for key, value in info.items()
+        )),
+        Chunk('summary', 'PROFESSIONAL SUMMARY', " ".join(knowledge['summary'].values())),
+    ]
+    for key, project in knowledge['projects'].items():
+        chunks.append(Chunk(f"project:{key}", f"PROJECT: {project['name']}", "\n".join([
+            f"Status: {project['status']}",
+            f"Description: {project['description']}",
+            f"Technologies: {', '.join(project['technologies'])}",
+            f"Features: {'; '.join(project['features'])}",
+            f"Challenges solved: {'; '.join(project['challenges_solved'])}",
+        ])))
+    for category, skills in knowledge['skills'].items():
+        chunks.append(Chunk(f"skills:{category}", f"SKILLS ({category})", ", ".join(skills)))
+    chunks.append(Chunk('skills:skills_overview', 'SKILLS', "\n".join(
+        f"- {category}: {', '.join(skills)}" for category, skills in knowledge['skills'].items()
+    )))
+    chunks.append(Chunk('metrics', 'METRICS', "\n".join(
+        f"- {key.replace('_', ' ')}: {value}" for key, value in knowledge['metrics'].items()
+    )))
+    # Overview for "what has he built?" style questions that name no project
+    chunks.append(Chunk('projects:portfolio_overview', 'PROJECTS', "\n".join(
+        f"- {project['name']} ({project['status']}): {project['description']}"
+        for project in knowledge['projects'].values()
+    )))
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over a small, fixed set of documents."""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = [Counter(doc) for doc in documents]
+        self._lengths = [len(doc) for doc in documents]
+        self._avg_length = sum(self._lengths) / max(1, len(documents))
+        doc_freq = Counter(term for doc in documents for term in set(doc))
+        n = len(documents)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def scores(self, query_terms):
+        results = []
+        for term_freqs, length in zip(self._term_freqs, self._lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self._avg_length)
+            for term in query_terms:
+                tf = term_freqs.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+
+class KnowledgeRetriever:
+    """Builds per-question system prompts from the most relevant knowledge sections."""
+
+    def __init__(self, knowledge, instructions, top_k=4, list_top_k=8, min_relative_score=0.3):
+        self.top_k = top_k
+        self.list_top_k = list_top_k
+        self.min_relative_score = min_relative_score
+        self.instructions = instructions
+        self.chunks = chunk_knowledge(knowledge)
+        self.index = BM25Index([
+            tokenize(chunk.id.replace(':', ' ') + ' ' + chunk.title + ' ' + chunk.text)
+            for chunk in self.chunks
+        ])
+        info = knowledge['personal_info']
+        self.header = (
+            f"You are an AI assistant representing {info['name']}, a {info['title']}.\n"
+            f"{info['name']} is based in {info['location']}, has {info['experience']} of experience "
+            f"and can be reached at {info['email']}.\n\n"
+            f"Relevant knowledge about {info['name'].split()[0]}:\n"
+        )
+        self._by_id = {chunk.id: chunk for chunk in self.chunks}
+
+    def retrieve(self, question):
+        terms = tokenize(question)
+        terms += tokenize(" ".join(synonym for term in terms for synonym in SYNONYMS.get(term, [])))
+        scores = self.index.scores(terms)
+        ranked = sorted(range(len(self.chunks)), key=lambda i: -scores[i])
+        top_k = self.list_top_k if LIST_QUESTION.search(normalize_message(question)) else self.top_k
+        # Drop weak matches that only share an incidental word with the question
+        cutoff = max(scores) * self.min_relative_score
+        selected = [self.chunks[i] for i in ranked[:top_k] if scores[i] > 0 and scores[i] >= cutoff]
+        if not selected:
+            # Nothing specific asked ("Tell me about Manuel"): give an overview
+            selected = [self._by_id['projects:portfolio_overview']]
+        # The summary is short and answers what BM25 cannot match ("what does he want next?")
+        summary = self._by_id['summary']
+        return [summary] + [chunk for chunk in selected if chunk is not summary]
+
+    def build_prompt(self, question):
+        sections = "\n\n".join(f"{chunk.title}:\n{chunk.text}" for chunk in self.retrieve(question))
+        return f"{self.header}\n{sections}\n\n{self.instructions}"
+
+
+def create_retriever_from_env(knowledge, instructions):
+    """Build the retriever from PROMPT_RETRIEVAL_* settings, or None if disabled."""
+    if os.getenv('PROMPT_RETRIEVAL_ENABLED', 'true').lower() in ('0', 'false', 'off', 'no'):
+        return None
+    return KnowledgeRetriever(
+        knowledge,
+        instructions,
+        top_k=int(os.getenv('PROMPT_RETRIEVAL_TOP_K', 4)),
+        list_top_k=int(os.getenv('PROMPT_RETRIEVAL_LIST_TOP_K', 8))
+    )
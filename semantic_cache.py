@@ -0,0 +1,155 @@
+"""
+Semantic near-duplicate answer cache.
+
+The exact-match cache in cache.py misses paraphrases such as "What has Manuel
+built?" vs "What projects has Manuel built?". This tier embeds each question
+with a hashed word + character n-gram vectorizer (offline, no model download)
+and looks up the nearest previously answered question in a NumPy cosine
+similarity index. Answers are only reused above a configurable threshold.
+"""
+
+import logging
+import os
+import threading
+import zlib
+
+import numpy as np
+
+from cache import normalize_message, prompt_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no signal for this bot; every question mentions Manuel
+STOP_WORDS = frozenset("""
+    a an the is are was were be what whats which who whom how do does did can
+    could would should i me my you your about tell of in on at for to and or
+    any his he him has have had with from by it its that this there some
+    manuel manuels david project projects work
+""".split())
+
+
+class HashedNgramVectorizer:
+    """Stateless vectorizer: hashed word unigrams plus character n-grams."""
+
+    def __init__(self, dim=512, ngram_range=(3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text):
+        words = normalize_message(text).split()
+        content_words = [w for w in words if w not in STOP_WORDS] or words
+        for word in content_words:
+            yield 'w:' + word
+            padded = f" {word} "
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+                for i in range(len(padded) - n + 1):
+                    yield padded[i:i + n]
+
+    def transform(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            # crc32 is stable across processes, unlike hash()
+            vector[zlib.crc32(feature.encode('utf-8')) % self.dim] += 1.0
+        np.log1p(vector, out=vector)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class VectorIndex:
+    """Fixed-capacity cosine index over unit vectors, overwriting the oldest row when full."""
+
+    def __init__(self, dim, max_entries=10000, initial_capacity=256):
+        self.dim = dim
+        self.max_entries = max_entries
+        self._vectors = np.zeros((min(initial_capacity, max_entries), dim), dtype=np.float32)
+        self._payloads = []
+        self._next = 0
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def add(self, vector, payload):
+        size = len(self._payloads)
+        if size < self.max_entries:
+            if size == len(self._vectors):
+                grown = np.zeros((min(size * 2, self.max_entries), self.dim), dtype=np.float32)
+                grown[:size] = self._vectors
+                self._vectors = grown
+            self._vectors[size] = vector
+            self._payloads.append(payload)
+        else:
+            self._vectors[self._next] = vector
+            self._payloads[self._next] = payload
+            self._next = (self._next + 1) % self.max_entries
+
+    def search(self, vector):
+        """Return (score, payload) of the nearest stored vector, or (0.0, None)."""
+        size = len(self._payloads)
+        if size == 0:
+            return 0.0, None
+        scores = self._vectors[:size] @ vector
+        best = int(np.argmax(scores))
+        return float(scores[best]), self._payloads[best]
+
+    def clear(self):
+        self._vectors[:] = 0
+        self._payloads = []
+        self._next = 0
+
+
+class SemanticCache:
+    def __init__(self, threshold=0.8, max_entries=10000, vectorizer=None):
+        self.threshold = threshold
+        self.vectorizer = vectorizer or HashedNgramVectorizer()
+        self.index = VectorIndex(self.vectorizer.dim, max_entries=max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._fingerprint = None
+        self._lock = threading.Lock()
+
+    def _check_prompt(self, system_prompt):
+        # Answers are only valid for the knowledge they were generated from
+        fingerprint = prompt_fingerprint(system_prompt)
+        if fingerprint != self._fingerprint:
+            self.index.clear()
+            self._fingerprint = fingerprint
+
+    def get(self, message, system_prompt):
+        vector = self.vectorizer.transform(message)
+        with self._lock:
+            self._check_prompt(system_prompt)
+            score, answer = self.index.search(vector)
+            if answer is not None and score >= self.threshold:
+                self.hits += 1
+                logger.info(f"Semantic cache hit (similarity {score:.3f})")
+                return answer
+            self.misses += 1
+            return None
+
+    def set(self, message, system_prompt, response):
+        vector = self.vectorizer.transform(message)
+        with self._lock:
+            self._check_prompt(system_prompt)
+            self.index.add(vector, response)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'threshold': self.threshold,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'size': len(self.index)
+        }
+
+
+def create_semantic_cache_from_env():
+    """Build the semantic cache from SEMANTIC_CACHE_* settings, or None if disabled."""
+    if os.getenv('SEMANTIC_CACHE_ENABLED', 'true').lower() in ('0', 'false', 'off', 'no'):
+        return None
+    return SemanticCache(
+        threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.8)),
+        max_entries=int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', 10000))
+    )
@@ -0,0 +1,228 @@
+"""
+Server-side conversation sessions for multi-turn chat.
+
+Without history every request is answered in isolation, so a follow-up like
+"what tech did that one use?" has nothing to refer to. A request may carry a
+client-generated `session_id`; its earlier turns are then sent to the model
+between the system prompt and the new question.
+
+History is kept small on purpose: turn records use __slots__, each session
+is trimmed to a token budget by dropping its oldest exchanges, and idle
+sessions are evicted by TTL and an LRU bound. The SQLite backend keeps
+sessions across worker restarts and shares them between gunicorn workers.
+"""
+
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from retrieval import estimate_tokens
+from sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+def validate_session_id(value):
+    """Return (True, session_id) or (False, error message)."""
+    if not isinstance(value, str) or not SESSION_ID_PATTERN.match(value):
+        return False, "session_id must be 8-64 letters, digits, '-' or '_'"
+    return True, value
+
+
+class Turn:
+    __slots__ = ('role', 'content', 'tokens')
+
+    def __init__(self, role, content, tokens=None):
+        self.role = role
+        self.content = content
+        self.tokens = estimate_tokens(content) if tokens is None else tokens
+
+    def as_message(self):
+        return {'role': self.role, 'content': self.content}
+
+
+def trim_turns(turns, max_tokens):
+    """Drop the oldest exchanges until the history fits max_tokens.
+
+    The latest exchange is always kept, even if it alone is over budget.
+    """
+    total = sum(turn.tokens for turn in turns)
+    start = 0
+    while total > max_tokens and len(turns) - start > 2:
+        # Drop a whole user/assistant exchange so history never starts mid-answer
+        for turn in turns[start:start + 2]:
+            total -= turn.tokens
+        start += 2
+    return turns[start:] if start else turns
+
+
+class _Session:
+    __slots__ = ('turns', 'expires_at')
+
+    def __init__(self, turns, expires_at):
+        self.turns = turns
+        self.expires_at = expires_at
+
+
+class MemorySessionBackend:
+    """Sessions for a single worker: an LRU of __slots__ records with TTL."""
+
+    def __init__(self, max_sessions=10000, ttl=1800):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            if session.expires_at <= now:
+                del self._sessions[session_id]
+                return []
+            # append() always builds a new list, so handing this one out is safe
+            return session.turns
+
+    def append(self, session_id, new_turns, max_tokens):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.expires_at <= time.monotonic():
+                session = self._sessions[session_id] = _Session([], expires_at)
+            session.turns = trim_turns(session.turns + new_turns, max_tokens)
+            session.expires_at = expires_at
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionBackend(SQLiteStore):
+    """Sessions in a SQLite file, shared by workers and kept across restarts."""
+
+    PURGE_EVERY = 64
+
+    def __init__(self, path, max_sessions=10000, ttl=1800):
+        super().__init__(path)
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._appends = itertools.count()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions ("
+            "id TEXT PRIMARY KEY, turns TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS chat_sessions_expiry ON chat_sessions (expires_at)")
+
+    @staticmethod
+    def _decode(text):
+        return [Turn(role, content, tokens) for role, content, tokens in json.loads(text)]
+
+    def get(self, session_id):
+        # Wall-clock time, since sessions are shared between processes
+        row = self._connect().execute(
+            "SELECT turns FROM chat_sessions WHERE id = ? AND expires_at > ?", (session_id, time.time())
+        ).fetchone()
+        return self._decode(row[0]) if row else []
+
+    def append(self, session_id, new_turns, max_tokens):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT turns FROM chat_sessions WHERE id = ? AND expires_at > ?", (session_id, now)
+            ).fetchone()
+            turns = trim_turns((self._decode(row[0]) if row else []) + new_turns, max_tokens)
+            encoded = json.dumps([[turn.role, turn.content, turn.tokens] for turn in turns],
+                                 separators=(',', ':'))
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_sessions (id, turns, expires_at) VALUES (?, ?, ?)",
+                (session_id, encoded, now + self.ttl)
+            )
+            if next(self._appends) % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM chat_sessions WHERE expires_at <= ?", (now,))
+                # Least recently used sessions expire first, so expiry order is LRU order
+                conn.execute(
+                    "DELETE FROM chat_sessions WHERE id IN ("
+                    "SELECT id FROM chat_sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_sessions,)
+                )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def clear(self):
+        self._connect().execute("DELETE FROM chat_sessions")
+
+    def __len__(self):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM chat_sessions WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+
+class SessionStore:
+    def __init__(self, backend, max_history_tokens=1000):
+        self.backend = backend
+        self.max_history_tokens = max_history_tokens
+
+    def history(self, session_id):
+        """Earlier turns as chat messages, oldest first ([] for a new session)."""
+        try:
+            return [turn.as_message() for turn in self.backend.get(session_id)]
+        except Exception as e:
+            # A broken session store degrades to single-turn answers
+            logger.warning(f"Session lookup failed: {str(e)}")
+            return []
+
+    def append(self, session_id, user_message, assistant_message):
+        try:
+            self.backend.append(
+                session_id,
+                [Turn('user', user_message), Turn('assistant', assistant_message)],
+                self.max_history_tokens
+            )
+        except Exception as e:
+            logger.warning(f"Session store failed: {str(e)}")
+
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__,
+            'sessions': len(self.backend),
+            'max_history_tokens': self.max_history_tokens
+        }
+
+
+def create_session_store_from_env():
+    """Build the session store from SESSIONS_* settings, or None if disabled."""
+    backend_name = os.getenv('SESSIONS_BACKEND', 'memory').lower()
+    max_sessions = int(os.getenv('SESSIONS_MAX', 10000))
+    ttl = float(os.getenv('SESSIONS_TTL', 1800))
+
+    if backend_name in ('off', 'none', 'disabled'):
+        return None
+    if backend_name == 'sqlite':
+        path = os.getenv('SESSIONS_PATH', 'sessions.sqlite3')
+        backend = SQLiteSessionBackend(path, max_sessions=max_sessions, ttl=ttl)
+    elif backend_name == 'memory':
+        backend = MemorySessionBackend(max_sessions=max_sessions, ttl=ttl)
+    else:
+        raise ValueError(f"Unknown SESSIONS_BACKEND: {backend_name}")
+
+    return SessionStore(backend, max_history_tokens=int(os.getenv('SESSIONS_MAX_HISTORY_TOKENS', 1000)))
@@ -0,0 +1,100 @@
+"""
+Single-flight coalescing of identical in-flight questions.
+
+When a portfolio link goes viral, many visitors click the same suggested
+question within the same second, and every one of them misses the cache
+because the first answer has not come back yet. SingleFlight lets the first
+request for a key (normalized message plus system prompt fingerprint) make
+the upstream call while later identical requests wait for it and share its
+result, or its error. Coalescing is per worker process; across workers the
+response cache takes over as soon as the first answer is stored.
+"""
+
+import asyncio
+import os
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Return func(), sharing one call among concurrent callers with the same key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, func):
+        """Async twin of do; func() returns an awaitable."""
+        future = self._async_calls.get(key)
+        if future is not None:
+            with self._lock:
+                self.coalesced += 1
+            # Shield so a follower's disconnect does not cancel the leader's call
+            return await asyncio.shield(future)
+
+        future = self._async_calls[key] = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self.leaders += 1
+        try:
+            result = await func()
+        except BaseException as e:
+            # Also covers the leader being cancelled, so followers never hang
+            future.set_exception(e if isinstance(e, Exception) else Exception("Upstream call was cancelled"))
+            # Mark retrieved so an unshared failure does not log "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._async_calls[key]
+
+    def stats(self):
+        return {
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._calls) + len(self._async_calls)
+        }
+
+
+def create_single_flight_from_env():
+    if os.getenv('SINGLE_FLIGHT_ENABLED', 'true').lower() in ('0', 'false', 'off', 'no'):
+        return None
+    return SingleFlight()
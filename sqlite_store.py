@@ -0,0 +1,34 @@
+"""
+Shared base for the SQLite-backed stores.
+
+The response cache, sessions, admission control and metrics can each keep
+their state in a SQLite file so every gunicorn worker on the host sees the
+same data. They all need the same connection handling: one connection per
+thread (sqlite3 connections are not shared across threads), in WAL mode so
+readers never wait on the writer, and reopened after a fork.
+"""
+
+import os
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """A SQLite file with a connection per thread and process."""
+
+    BUSY_TIMEOUT = 5
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        # A connection opened before a fork (gunicorn preload_app) must not be used by the child
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
@@ -0,0 +1,87 @@
+"""
+Precomputed, ETag-enabled responses for payloads that only change on reload.
+
+`/` and `/api/knowledge` used to rebuild and re-jsonify their dicts on every
+hit, and the portfolio frontend fetches `/api/knowledge` on every page view.
+A PrecomputedResponse serializes its payload to bytes once, compresses it
+once, and answers conditional GETs with 304 so browsers and the CDN can do
+the work. Serving is framework-neutral: `render()` returns status, body and
+headers for Flask or aiohttp to wrap.
+"""
+
+import gzip
+import hashlib
+import json
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Below this size compression costs more than it saves
+MIN_COMPRESS_SIZE = 256
+
+
+def _accepted_encodings(accept_encoding):
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _etag_matches(if_none_match, etags):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
+
+
+class PrecomputedResponse:
+    """A JSON payload serialized, hashed and compressed once."""
+
+    __slots__ = ('body', 'cache_control', 'variants', '_etags')
+
+    def __init__(self, payload, cache_control='no-cache'):
+        self.body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self.cache_control = cache_control
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        # Each representation gets its own strong validator
+        self.variants = {None: (self.body, f'"{digest}"')}
+        if len(self.body) >= MIN_COMPRESS_SIZE:
+            if brotli is not None:
+                self.variants['br'] = (brotli.compress(self.body, quality=11), f'"{digest}-br"')
+            self.variants['gzip'] = (gzip.compress(self.body, compresslevel=9, mtime=0), f'"{digest}-gzip"')
+        self._etags = frozenset(etag for _, etag in self.variants.values())
+
+    @property
+    def etag(self):
+        return self.variants[None][1]
+
+    def render(self, if_none_match=None, accept_encoding=None):
+        """Return (status, body, headers) for a GET with the given request headers."""
+        encoding = None
+        if len(self.variants) > 1:
+            accepted = _accepted_encodings(accept_encoding)
+            encoding = next((name for name in ('br', 'gzip') if name in self.variants and name in accepted), None)
+        body, etag = self.variants[encoding]
+
+        headers = {'ETag': etag, 'Cache-Control': self.cache_control}
+        if len(self.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+        if _etag_matches(if_none_match, self._etags):
+            return 304, b'', headers
+        headers['Content-Type'] = 'application/json'
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return 200, body, headers
@@ -0,0 +1,242 @@
+"""
+Structured, off-thread request logging.
+
+By default every /api/chat request writes half a dozen text lines from the
+request thread, each formatted eagerly. With LOG_FORMAT=json:
+
+- log records go through a QueueHandler to a background QueueListener, so
+  formatting and stdout writes happen off the request thread;
+- the per-step INFO chatter is dropped at the level check (LOG_LEVEL
+  defaults to WARNING), and hot-path calls use lazy %-style arguments;
+- each request produces one JSON line carrying its request id (Heroku's
+  X-Request-ID when present), status, duration, stage timings and notes
+  such as the cache result;
+- successful, fast request lines can be sampled with LOG_SAMPLE_RATE, while
+  errors and requests slower than LOG_SLOW_MS are always written.
+"""
+
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+
+from metrics import Timer
+
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,128}$')
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_current = contextvars.ContextVar('request_record', default=None)
+
+
+class RequestRecord:
+    __slots__ = ('request_id', 'start', 'stages', 'counts', 'fields', 'token', '_lock')
+
+    def __init__(self, request_id, start):
+        self.request_id = request_id
+        self.start = start
+        self.stages = {}
+        self.counts = {}
+        self.fields = {}
+        self.token = None
+        # A batch's questions add their stages from several threads at once
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            if name in self.stages:
+                self.stages[name] += seconds
+                self.counts[name] = self.counts.get(name, 1) + 1
+            else:
+                self.stages[name] = seconds
+
+
+def current_request_id():
+    record = _current.get()
+    return record.request_id if record is not None else None
+
+
+def note(key, value):
+    """Attach a field to the current request's log line (no-op outside a logged request)."""
+    record = _current.get()
+    if record is not None:
+        record.fields[key] = value
+
+
+class LoggedStage:
+    """A stage histogram that also adds each timing to the current request's log line."""
+
+    __slots__ = ('name', 'histogram')
+
+    def __init__(self, name, histogram):
+        self.name = name
+        self.histogram = histogram
+
+    def observe(self, seconds):
+        self.histogram.observe(seconds)
+        record = _current.get()
+        if record is not None:
+            record.add_stage(self.name, seconds)
+
+    def time(self):
+        return Timer(self)
+
+
+class RequestLogger:
+    def __init__(self, logger, sample_rate=1.0, slow_ms=1000.0):
+        self.logger = logger
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.written = 0
+        self.sampled_out = 0
+
+    def begin(self, request_id=None):
+        """Start the current request's record; returns its request id."""
+        if not request_id or not REQUEST_ID_PATTERN.match(request_id):
+            # Uniqueness, not secrecy: os.urandom can cost tens of microseconds a call on VMs
+            request_id = f'{random.getrandbits(64):016x}'
+        record = RequestRecord(request_id, time.perf_counter())
+        record.token = _current.set(record)
+        return request_id
+
+    def finish(self, method, route, status, **fields):
+        """Write the current request's line, unless sampled out, and end the record; returns its request id."""
+        record = _current.get()
+        if record is None:
+            return None
+        _current.reset(record.token)
+        duration_ms = (time.perf_counter() - record.start) * 1000
+        if (status < 400 and duration_ms < self.slow_ms and self.sample_rate < 1.0
+                and random.random() >= self.sample_rate):
+            self.sampled_out += 1
+            return record.request_id
+        self.written += 1
+        line = {
+            'request_id': record.request_id,
+            'method': method,
+            'route': route,
+            'status': status,
+            'duration_ms': round(duration_ms, 2),
+            'stages_ms': {name: round(seconds * 1000, 3) for name, seconds in record.stages.items()},
+        }
+        if record.counts:
+            line['stage_counts'] = record.counts
+        line.update(record.fields)
+        line.update(fields)
+        # Serialized by the listener thread, like every other record
+        self.logger.info('request', extra={'request': line})
+        return record.request_id
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; request summaries are merged in as fields."""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+                  .isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            payload['request_id'] = request_id
+        summary = getattr(record, 'request', None)
+        if summary:
+            payload.update(summary)
+        if record.exc_info:
+            payload['exc'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records unformatted, so the listener thread does the formatting.
+
+    The stock QueueHandler renders the message and traceback on the calling
+    thread, which is the work this handler exists to move. Log arguments
+    must therefore not be mutated after the call, which holds for this app.
+    """
+
+    def prepare(self, record):
+        record.request_id = current_request_id()
+        return record
+
+
+_listener = None
+_pipeline = None
+
+
+def _start_listener():
+    global _listener
+    handler, output = _pipeline
+    handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # The listener thread does not survive a fork (gunicorn preload), so each worker starts its own
+    if _listener is not None:
+        _start_listener()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(log_format=None, level=None, stream=None):
+    """Set up root logging from LOG_FORMAT/LOG_LEVEL; replaces existing root handlers."""
+    global _pipeline
+    log_format = (log_format or os.getenv('LOG_FORMAT', 'text')).lower()
+    if log_format not in ('text', 'json'):
+        raise ValueError(f"Unknown LOG_FORMAT: {log_format}")
+    level = (level or os.getenv('LOG_LEVEL') or ('WARNING' if log_format == 'json' else 'INFO')).upper()
+
+    stop_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    if log_format == 'text':
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(output)
+        return
+
+    output.setFormatter(JsonFormatter())
+    handler = DeferredQueueHandler(queue.SimpleQueue())
+    root.addHandler(handler)
+    _pipeline = (handler, output)
+    _start_listener()
+    atexit.register(stop_logging)
+
+
+def create_request_logger_from_env():
+    """The per-request JSON line writer, or None outside LOG_FORMAT=json."""
+    if os.getenv('LOG_FORMAT', 'text').lower() != 'json':
+        return None
+    logger = logging.getLogger('chatbot.request')
+    # Request lines are INFO but must survive LOG_LEVEL=WARNING
+    logger.setLevel(logging.INFO)
+    return RequestLogger(
+        logger,
+        sample_rate=float(os.getenv('LOG_SAMPLE_RATE', 1.0)),
+        slow_ms=float(os.getenv('LOG_SLOW_MS', 1000))
+    )
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Test script for admission control
+Checks per-client rate limiting, the global in-flight cap with its bounded
+queue, and that the SQLite store is shared between workers
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Sets up the test environment, so it is imported before app
+from conftest import using_upstream
+import app as chatbot
+from admission import (
+    AdmissionController,
+    AdmissionRejected,
+    MemoryAdmissionStore,
+    SQLiteAdmissionStore,
+    client_key,
+)
+from mock_openai import MockOpenAIServer
+
+
+def admission_enabled(upstream, controller):
+    return using_upstream(upstream, admission=controller)
+
+
+def post_chat(message="Tell me about Manuel David", client_ip='203.0.113.1'):
+    client = chatbot.app.test_client()
+    start = time.perf_counter()
+    response = client.post('/api/chat', json={'message': message},
+                           headers={'X-Forwarded-For': client_ip})
+    return response, time.perf_counter() - start
+
+
+def test_client_key():
+    """Only the hop appended by the trusted proxy identifies the client"""
+    print("🔍 Testing client key extraction...")
+    assert client_key('10.0.0.1') == '10.0.0.1'
+    assert client_key('10.0.0.1', '203.0.113.7') == '203.0.113.7'
+    # A client-supplied X-Forwarded-For entry cannot pick the key
+    assert client_key('10.0.0.1', '1.2.3.4, 203.0.113.7') == '203.0.113.7'
+    assert client_key('10.0.0.1', '1.2.3.4, 203.0.113.7', trusted_proxies=0) == '10.0.0.1'
+    print("✅ Client key test passed!")
+
+
+def test_rate_limit_per_client():
+    """A client over its bucket gets 429 with Retry-After; other clients do not"""
+    print("🔍 Testing per-client rate limiting...")
+    controller = AdmissionController(MemoryAdmissionStore(), rate=0.2, burst=2)
+    with MockOpenAIServer() as upstream, admission_enabled(upstream, controller):
+        statuses = [post_chat()[0].status_code for _ in range(2)]
+        limited, elapsed = post_chat()
+        other, _ = post_chat(client_ip='203.0.113.2')
+        calls = upstream.calls
+
+    print(f"Rejected in {elapsed * 1000:.1f} ms with Retry-After {limited.headers.get('Retry-After')}")
+    assert statuses == [200, 200]
+    assert limited.status_code == 429
+    assert int(limited.headers['Retry-After']) == 5
+    assert other.status_code == 200
+    assert calls == 3
+    print("✅ Rate limit test passed!")
+
+
+def test_batch_larger_than_burst_is_charged_in_full():
+    """A batch over the burst runs once, then the client waits out every message it sent"""
+    print("🔍 Testing batch cost against the burst...")
+    with tempfile.TemporaryDirectory() as directory:
+        stores = [MemoryAdmissionStore(), SQLiteAdmissionStore(os.path.join(directory, 'admission.sqlite3'))]
+        for store in stores:
+            controller = AdmissionController(store, rate=0.2, burst=2)
+            controller.check_rate('203.0.113.1', cost=10)
+            try:
+                controller.check_rate('203.0.113.1')
+                raise AssertionError("batch debt was not charged")
+            except AdmissionRejected as e:
+                # 8 tokens owed plus the one this request needs, at 0.2 per second
+                assert 44 <= e.retry_after <= 45
+            # From a bucket that is not full, the batch must wait for it to refill
+            controller.check_rate('203.0.113.2')
+            try:
+                controller.check_rate('203.0.113.2', cost=10)
+                raise AssertionError("oversized batch admitted from a partial bucket")
+            except AdmissionRejected as e:
+                assert e.retry_after == 5
+
+    controller = AdmissionController(MemoryAdmissionStore(), rate=0.2, burst=2)
+    with MockOpenAIServer() as upstream, admission_enabled(upstream, controller):
+        client = chatbot.app.test_client()
+        headers = {'X-Forwarded-For': '203.0.113.3'}
+        messages = [f"Question {i}" for i in range(10)]
+        first = client.post('/api/chat/batch', json={'messages': messages}, headers=headers)
+        second = client.post('/api/chat/batch', json={'messages': messages}, headers=headers)
+    assert first.status_code == 200
+    assert second.status_code == 429 and int(second.headers['Retry-After']) >= 40
+    print("✅ Batch cost test passed!")
+
+
+def test_overload_rejected_fast():
+    """Past the in-flight cap and queue, requests fail fast instead of piling up"""
+    print("🔍 Testing in-flight cap and bounded queue...")
+    controller = AdmissionController(MemoryAdmissionStore(), rate=0, max_in_flight=2,
+                                     queue_size=2, queue_timeout=0.3)
+    with MockOpenAIServer(latency=1.0) as upstream, admission_enabled(upstream, controller):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda i: post_chat(f"Question {i}"), range(8)))
+        calls = upstream.calls
+
+    ok = [elapsed for response, elapsed in results if response.status_code == 200]
+    rejected = sorted(elapsed for response, elapsed in results if response.status_code == 429)
+    print(f"{len(ok)} answered, {len(rejected)} rejected "
+          f"(fastest {rejected[0] * 1000:.0f} ms, slowest {rejected[-1] * 1000:.0f} ms)")
+    assert len(ok) == 2 and calls == 2
+    assert len(rejected) == 6
+    assert all(response.headers.get('Retry-After') for response, _ in results if response.status_code == 429)
+    # Four found the queue full, two waited out the queue timeout
+    assert rejected[3] < 0.2
+    assert all(elapsed < 0.6 for elapsed in rejected)
+    assert controller.stats()['in_flight'] == 0
+    print("✅ Overload test passed!")
+
+
+class SlowStore(MemoryAdmissionStore):
+    """A store whose bucket check waits, as SQLite does on another worker's lock."""
+
+    def take(self, key, cost, rate, burst):
+        time.sleep(0.5)
+        return super().take(key, cost, rate, burst)
+
+
+def test_async_rate_checks_off_the_event_loop():
+    """In the aiohttp mode slow store calls hold a thread each, not the loop every request shares"""
+    print("🔍 Testing async admission off the event loop...")
+    from aiohttp.test_utils import TestClient, TestServer
+    import async_app
+
+    async def run():
+        async with TestClient(TestServer(async_app.create_app())) as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*[
+                client.post('/api/chat', json={'message': f'Question {i}'},
+                            headers={'X-Forwarded-For': f'203.0.113.{i}'})
+                for i in range(4)
+            ])
+            return [response.status for response in responses], time.perf_counter() - start
+
+    controller = AdmissionController(SlowStore(), rate=1, burst=5)
+    with MockOpenAIServer() as upstream, admission_enabled(upstream, controller):
+        statuses, elapsed = asyncio.run(run())
+
+    print(f"4 requests with a 500 ms rate check each took {elapsed * 1000:.0f} ms")
+    assert statuses == [200] * 4
+    # On the loop the four checks would run one after another: 2 s
+    assert elapsed < 1.2
+    print("✅ Async admission test passed!")
+
+
+class SlowAcquireStore(MemoryAdmissionStore):
+    """A store whose slot grant waits, as SQLite does on another worker's lock."""
+
+    def try_acquire(self, max_in_flight, lease_ttl):
+        time.sleep(0.2)
+        return super().try_acquire(max_in_flight, lease_ttl)
+
+
+def test_async_cancellation_releases_slots():
+    """Calls cancelled at a batch deadline, or while their slot is being granted, give it back"""
+    print("🔍 Testing slot release on cancellation...")
+    import async_app
+
+    async def cancel_while_granting(controller):
+        acquiring = asyncio.ensure_future(controller.async_acquire())
+        await asyncio.sleep(0.05)
+        acquiring.cancel()
+        try:
+            await acquiring
+            raise AssertionError("acquire was not cancelled")
+        except asyncio.CancelledError:
+            pass
+        # The grant lands after the cancel; it must be handed straight back
+        await asyncio.sleep(0.4)
+        return controller.stats()['in_flight']
+
+    granting = AdmissionController(SlowAcquireStore(), rate=0)
+    assert asyncio.run(cancel_while_granting(granting)) == 0
+
+    async def cancel_mid_call():
+        # What the batch deadline does to questions still waiting on the model
+        call = asyncio.ensure_future(
+            async_app.get_openai_response('Tell me about Manuel David', chatbot.knowledge_store.current)
+        )
+        await asyncio.sleep(0.3)
+        assert controller.stats()['in_flight'] == 1
+        call.cancel()
+        try:
+            await call
+            raise AssertionError("call was not cancelled")
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0.1)
+        await chatbot.upstream.aclose()
+        return controller.stats()['in_flight']
+
+    controller = AdmissionController(MemoryAdmissionStore(), rate=0)
+    with MockOpenAIServer(latency=2.0) as upstream, admission_enabled(upstream, controller):
+        in_flight = asyncio.run(cancel_mid_call())
+
+    assert in_flight == 0, in_flight
+    print("✅ Cancellation test passed!")
+
+
+def test_sqlite_store_shared():
+    """Two stores on one file behave like two workers sharing one limit"""
+    print("🔍 Testing SQLite admission store sharing...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'admission.sqlite3')
+        first = AdmissionController(SQLiteAdmissionStore(path), rate=0.1, burst=2,
+                                    max_in_flight=1, queue_size=0)
+        second = AdmissionController(SQLiteAdmissionStore(path), rate=0.1, burst=2,
+                                     max_in_flight=1, queue_size=0)
+        first.check_rate('203.0.113.1')
+        second.check_rate('203.0.113.1')
+        try:
+            first.check_rate('203.0.113.1')
+            raise AssertionError("bucket was not shared")
+        except AdmissionRejected:
+            pass
+
+        lease = first.acquire()
+        try:
+            second.acquire()
+            raise AssertionError("in-flight cap was not shared")
+        except AdmissionRejected:
+            pass
+        first.release(lease)
+        second.release(second.acquire())
+    print("✅ SQLite store test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Admission Control Test Suite")
+    print("=" * 50)
+    test_client_key()
+    test_rate_limit_per_client()
+    test_batch_larger_than_burst_is_charged_in_full()
+    test_overload_rejected_fast()
+    test_async_rate_checks_off_the_event_loop()
+    test_async_cancellation_releases_slots()
+    test_sqlite_store_shared()
+    print("\n🎉 All admission tests passed!")
+
+
+if __name__ == "__main__":
+    main()
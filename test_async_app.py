@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test script for the asyncio serving mode
+Sends the same requests to async_app and the Flask app and checks they
+agree: the routes, CORS preflights for allowed and other origins, CORS and
+Vary headers on plain and streamed responses, 400s for bad input, and how
+upstream failures and admission rejections map to 503 and 429
+"""
+
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+# Sets up the test environment, so it is imported before app
+from conftest import using_upstream
+import app as chatbot
+import async_app
+from admission import AdmissionController, MemoryAdmissionStore
+from mock_openai import MockOpenAIServer
+from resilience import CircuitBreaker
+
+ALLOWED = chatbot.ALLOWED_ORIGINS[0]
+OTHER = 'https://example.com'
+CHAT_ROUTES = ('/api/chat', '/api/chat/stream', '/api/chat/batch')
+
+
+class Reply:
+    """Status, headers and body of a response from either app."""
+
+    def __init__(self, status, headers, body, vary):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.vary = {value.strip() for values in vary for value in values.split(',')}
+
+
+def send_flask(requests):
+    client = chatbot.app.test_client()
+    replies = []
+    for method, path, kwargs in requests:
+        response = client.open(path, method=method, **kwargs)
+        replies.append(Reply(response.status_code, response.headers, response.get_data(),
+                             response.headers.getlist('Vary')))
+        response.close()
+    return replies
+
+
+def send_async(requests):
+    async def run():
+        replies = []
+        async with TestClient(TestServer(async_app.create_app())) as client:
+            for method, path, kwargs in requests:
+                kwargs = dict(kwargs)
+                if 'data' in kwargs:
+                    kwargs['headers'] = {'Content-Type': kwargs.pop('content_type')}
+                response = await client.request(method, path, **kwargs)
+                replies.append(Reply(response.status, response.headers, await response.read(),
+                                     response.headers.getall('Vary', [])))
+        return replies
+    return asyncio.run(run())
+
+
+def send_both(requests):
+    """The same requests through the Flask app, then the async app."""
+    return send_flask(requests), send_async(requests)
+
+
+def test_routes_match_the_flask_app():
+    """Every GET and POST route in app.py is served by async_app, and nothing else"""
+    print("🔍 Testing route parity...")
+    flask_routes = {
+        (method, rule.rule) for rule in chatbot.app.url_map.iter_rules() if rule.endpoint != 'static'
+        for method in rule.methods & {'GET', 'POST'}
+    }
+    async_routes = {
+        (route.method, route.resource.canonical) for route in async_app.create_app().router.routes()
+        if route.method in ('GET', 'POST')
+    }
+    assert async_routes == flask_routes, async_routes ^ flask_routes
+    print("✅ Route parity test passed!")
+
+
+def test_cors_preflight():
+    """Allowed origins get the CORS grant on preflight; other origins get none"""
+    print("🔍 Testing CORS preflight...")
+    requests = [
+        ('OPTIONS', path, {'headers': {'Origin': origin, 'Access-Control-Request-Method': 'POST'}})
+        for origin in (ALLOWED, OTHER) for path in CHAT_ROUTES
+    ]
+    flask_replies, async_replies = send_both(requests)
+    for (_, path, kwargs), flask_reply, async_reply in zip(requests, flask_replies, async_replies):
+        origin = kwargs['headers']['Origin']
+        assert async_reply.status == flask_reply.status == 200, path
+        for name in ('Access-Control-Allow-Origin', 'Access-Control-Allow-Credentials'):
+            assert async_reply.headers.get(name) == flask_reply.headers.get(name), (path, origin, name)
+        if origin == ALLOWED:
+            assert async_reply.headers['Access-Control-Allow-Origin'] == ALLOWED
+            assert 'POST' in async_reply.headers['Access-Control-Allow-Methods']
+            assert async_reply.headers['Access-Control-Max-Age'] == '3600'
+        else:
+            assert 'Access-Control-Allow-Origin' not in async_reply.headers
+            assert 'Access-Control-Allow-Methods' not in async_reply.headers
+        assert 'Origin' in async_reply.vary
+    print("✅ CORS preflight test passed!")
+
+
+def test_cors_headers_on_responses():
+    """Plain and streamed responses carry the origin grant and Vary: Origin"""
+    print("🔍 Testing CORS headers on responses...")
+    requests = [
+        (method, path, dict(kwargs, headers={'Origin': origin}))
+        for origin in (ALLOWED, OTHER)
+        for method, path, kwargs in (
+            ('GET', '/health', {}),
+            ('GET', '/api/knowledge', {}),
+            ('POST', '/api/chat', {'json': {'message': 'Tell me about Manuel'}}),
+            ('POST', '/api/chat/stream', {'json': {'message': 'Tell me about Manuel'}}),
+        )
+    ]
+    with MockOpenAIServer() as upstream, using_upstream(upstream):
+        flask_replies, async_replies = send_both(requests)
+    for (_, path, kwargs), flask_reply, async_reply in zip(requests, flask_replies, async_replies):
+        origin = kwargs['headers']['Origin']
+        assert async_reply.status == flask_reply.status == 200, path
+        expected = origin if origin == ALLOWED else None
+        assert async_reply.headers.get('Access-Control-Allow-Origin') == expected, (path, origin)
+        assert flask_reply.headers.get('Access-Control-Allow-Origin') == expected, (path, origin)
+        # flask-cors leaves Vary out for origins it does not allow; async_app always sends it
+        assert 'Origin' in async_reply.vary, path
+        assert 'Origin' in flask_reply.vary or origin != ALLOWED, path
+    streamed = async_replies[3]
+    assert streamed.headers['Content-Type'].startswith('text/event-stream')
+    assert b'event: done' in streamed.body
+    print("✅ CORS response header test passed!")
+
+
+def test_bad_input_is_400():
+    """Malformed bodies are rejected the same way in both modes"""
+    print("🔍 Testing input validation...")
+    bodies = [
+        {'json': {}},
+        {'json': {'message': ''}},
+        {'json': {'message': 42}},
+        {'json': {'message': 'Hi', 'session_id': 'not a valid id!'}},
+        {'data': 'not json', 'content_type': 'application/json'},
+    ]
+    requests = [('POST', path, body) for path in ('/api/chat', '/api/chat/stream') for body in bodies]
+    requests += [
+        ('POST', '/api/chat/batch', {'json': {'message': 'Hi'}}),
+        ('POST', '/api/chat/batch', {'json': {'messages': []}}),
+    ]
+    flask_replies, async_replies = send_both(requests)
+    for (_, path, body), flask_reply, async_reply in zip(requests, flask_replies, async_replies):
+        assert async_reply.status == flask_reply.status == 400, (path, body)
+    print("✅ Input validation test passed!")
+
+
+def test_error_mapping():
+    """Upstream failures and an open breaker are 503s; rate-limited clients get 429 with Retry-After"""
+    print("🔍 Testing error status mapping...")
+    chat = {'json': {'message': 'Tell me about Manuel'}}
+    with MockOpenAIServer(error_status=500) as upstream:
+        for send in (send_flask, send_async):
+            with using_upstream(upstream, circuit_breaker=CircuitBreaker(failure_threshold=1)):
+                failed, stream_failed, rejected = send([
+                    ('POST', '/api/chat', chat),
+                    ('POST', '/api/chat/stream', chat),
+                    ('POST', '/api/chat', chat),
+                ])
+            assert failed.status == 503, send.__name__
+            # The first failure opened the breaker, so these never reach upstream
+            assert stream_failed.status == 503 and rejected.status == 503, send.__name__
+            assert int(rejected.headers['Retry-After']) >= 1, send.__name__
+
+    with MockOpenAIServer() as upstream:
+        for send in (send_flask, send_async):
+            controller = AdmissionController(MemoryAdmissionStore(), rate=0.1, burst=1)
+            with using_upstream(upstream, admission=controller):
+                allowed, limited = send([('POST', '/api/chat', chat)] * 2)
+            assert allowed.status == 200, send.__name__
+            assert limited.status == 429 and int(limited.headers['Retry-After']) == 10, send.__name__
+    print("✅ Error mapping test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Async Serving Mode Test Suite")
+    print("=" * 50)
+    test_routes_match_the_flask_app()
+    test_cors_preflight()
+    test_cors_headers_on_responses()
+    test_bad_input_is_400()
+    test_error_mapping()
+    print("\n🎉 All async serving mode tests passed!")
+
+
+if __name__ == "__main__":
+    main()
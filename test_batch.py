@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test script for the batch chat endpoint
+Runs POST /api/chat/batch against a slow local fake upstream (mock_openai.py)
+and checks de-duplication, input ordering, the concurrency limit, the batch
+deadline and NDJSON streaming
+"""
+
+import json
+import time
+
+# Sets up the test environment, so it is imported before app
+from conftest import patched, using_upstream
+import app as chatbot
+from batch import BatchSettings
+from mock_openai import MockOpenAIServer
+
+MESSAGES = [
+    "What projects has Manuel built?",
+    "what projects has manuel built",
+    "What are Manuel's skills?",
+    "",
+    {"message": "Where is Manuel based?"},
+]
+
+
+def post_batch(upstream, messages, settings, stream=False):
+    with using_upstream(upstream, batch_settings=settings):
+        client = chatbot.app.test_client()
+        start = time.perf_counter()
+        response = client.post('/api/chat/batch', json={'messages': messages, 'stream': stream})
+        # Streamed bodies are produced lazily; read them while the upstream is still up
+        response.get_data()
+    return response, time.perf_counter() - start
+
+
+def test_batch_dedupes_and_keeps_order():
+    """Duplicates share one upstream call; results come back in input order"""
+    print("🔍 Testing batch de-duplication and ordering...")
+    with MockOpenAIServer(latency=0.3, echo=True) as upstream:
+        response, elapsed = post_batch(upstream, MESSAGES, BatchSettings(concurrency=4))
+        calls = upstream.calls
+
+    results = response.json['results']
+    print(f"{len(MESSAGES)} messages, {calls} upstream calls, {elapsed * 1000:.0f} ms")
+    assert response.status_code == 200
+    assert calls == 3
+    assert [result['index'] for result in results] == list(range(len(MESSAGES)))
+    assert results[0]['response'] == "Answer to: What projects has Manuel built?"
+    assert results[1]['response'] == results[0]['response']
+    assert results[2]['response'] == "Answer to: What are Manuel's skills?"
+    assert results[3]['status'] == 'error' and results[3]['code'] == 400
+    assert results[4]['response'] == "Answer to: Where is Manuel based?"
+    # Three unique questions in parallel take about one upstream round trip
+    assert elapsed < 0.3 * 2
+    print("✅ Batch de-duplication and ordering test passed!")
+
+
+def test_batch_concurrency_limit():
+    """No more than `concurrency` upstream calls run at once"""
+    print("🔍 Testing batch concurrency limit...")
+    messages = [f"Question number {i}" for i in range(6)]
+    with MockOpenAIServer(latency=0.2) as upstream:
+        response, elapsed = post_batch(upstream, messages, BatchSettings(concurrency=2))
+
+    print(f"6 questions at concurrency 2: {elapsed * 1000:.0f} ms")
+    assert response.status_code == 200
+    assert all(result['status'] == 'success' for result in response.json['results'])
+    assert 0.2 * 3 <= elapsed < 0.2 * 6
+    print("✅ Batch concurrency limit test passed!")
+
+
+def test_batch_deadline():
+    """Questions still unanswered at the batch deadline fail with 504"""
+    print("🔍 Testing batch deadline...")
+    with MockOpenAIServer(latency=2.0) as upstream:
+        response, elapsed = post_batch(upstream, ["First question", "Second question"],
+                                       BatchSettings(concurrency=2, deadline=0.3))
+
+    print(f"Batch returned after {elapsed * 1000:.0f} ms")
+    assert response.status_code == 200
+    assert [result['code'] for result in response.json['results']] == [504, 504]
+    assert elapsed < 1.0
+    print("✅ Batch deadline test passed!")
+
+
+def test_batch_ndjson_stream():
+    """stream: true returns one JSON line per input item as it finishes"""
+    print("🔍 Testing NDJSON batch stream...")
+    with MockOpenAIServer(latency=0.1, echo=True) as upstream:
+        response, _ = post_batch(upstream, MESSAGES, BatchSettings(concurrency=4), stream=True)
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('application/x-ndjson')
+    assert sorted(line['index'] for line in lines) == list(range(len(MESSAGES)))
+    assert all(line['status'] == 'success' for line in lines if line['index'] != 3)
+    # The invalid item is known up front, so it is sent first
+    assert lines[0]['index'] == 3 and lines[0]['code'] == 400
+    print("✅ NDJSON batch stream test passed!")
+
+
+def test_batch_rejects_bad_body():
+    """A body without a messages list is a 400, not a batch of errors"""
+    print("🔍 Testing batch validation...")
+    client = chatbot.app.test_client()
+    with patched(chatbot, batch_settings=BatchSettings(max_messages=3)):
+        assert client.post('/api/chat/batch', json={'message': 'hi'}).status_code == 400
+        assert client.post('/api/chat/batch', json={'messages': []}).status_code == 400
+        assert client.post('/api/chat/batch', json={'messages': ['a', 'b', 'c', 'd']}).status_code == 400
+    print("✅ Batch validation test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Batch Chat Endpoint Test Suite")
+    print("=" * 50)
+    test_batch_dedupes_and_keeps_order()
+    test_batch_concurrency_limit()
+    test_batch_deadline()
+    test_batch_ndjson_stream()
+    test_batch_rejects_bad_body()
+    print("\n🎉 All batch tests passed!")
+
+
+if __name__ == "__main__":
+    main()
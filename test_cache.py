@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the response cache
+Checks key normalization, LRU and TTL eviction in both backends, and that
+the SQLite backend round-trips answers between stores sharing one file
+"""
+
+import os
+import tempfile
+import time
+
+from cache import MemoryBackend, ResponseCache, SQLiteBackend, make_cache_key, normalize_message
+
+PROMPT = "You are a portfolio assistant."
+
+
+def backends(directory, **settings):
+    return [MemoryBackend(**settings), SQLiteBackend(os.path.join(directory, 'cache.sqlite3'), **settings)]
+
+
+def test_keys_fold_trivial_variants():
+    """Case, punctuation and whitespace do not change the key; the prompt does"""
+    print("🔍 Testing cache keys...")
+    assert normalize_message("  What's Manuel's EMAIL?? ") == "whats manuels email"
+    key = make_cache_key("What's Manuel's email?", PROMPT)
+    assert make_cache_key("whats manuels   email", PROMPT) == key
+    assert make_cache_key("What's Manuel's phone?", PROMPT) != key
+    assert make_cache_key("What's Manuel's email?", PROMPT + " Be brief.") != key
+    print("✅ Cache key test passed!")
+
+
+def test_lru_eviction():
+    """Past max_entries the least recently used answer goes first"""
+    print("🔍 Testing LRU eviction...")
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in backends(directory, max_entries=2):
+            backend.set('a', 'answer a')
+            time.sleep(0.01)
+            backend.set('b', 'answer b')
+            time.sleep(0.01)
+            # Reading a makes b the oldest
+            assert backend.get('a') == 'answer a'
+            time.sleep(0.01)
+            backend.set('c', 'answer c')
+            assert backend.get('b') is None, type(backend).__name__
+            assert backend.get('a') == 'answer a' and backend.get('c') == 'answer c'
+            assert len(backend) == 2
+    print("✅ LRU eviction test passed!")
+
+
+def test_ttl_expiry():
+    """Answers older than the TTL are misses and are dropped"""
+    print("🔍 Testing TTL expiry...")
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in backends(directory, ttl=0.05):
+            backend.set('a', 'answer a')
+            assert backend.get('a') == 'answer a'
+            time.sleep(0.1)
+            assert backend.get('a') is None, type(backend).__name__
+            backend.set('b', 'answer b')
+            assert len(backend) == 1
+    print("✅ TTL expiry test passed!")
+
+
+def test_sqlite_round_trip():
+    """An answer stored by one worker is served to another sharing the file"""
+    print("🔍 Testing SQLite round-trip...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'cache.sqlite3')
+        first = ResponseCache(SQLiteBackend(path))
+        second = ResponseCache(SQLiteBackend(path))
+        answer = "Manuel can be reached at manuel@example.com — or by phone. 📞"
+        first.set("What's Manuel's email?", PROMPT, answer)
+        assert second.get("what's manuel's email", PROMPT) == answer
+        assert second.get("What's Manuel's email?", PROMPT + " Be brief.") is None
+
+        stats = second.stats()
+        assert stats['backend'] == 'SQLiteBackend'
+        assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+        first.clear()
+        assert second.get("What's Manuel's email?", PROMPT) is None
+    print("✅ SQLite round-trip test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Response Cache Test Suite")
+    print("=" * 50)
+    test_keys_fold_trivial_variants()
+    test_lru_eviction()
+    test_ttl_expiry()
+    test_sqlite_round_trip()
+    print("\n🎉 All response cache tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,16 @@ import sys
 # BASE_URL = "http://localhost:8000"  # For local testing
 BASE_URL = "https://manueldavid-resweb-ai-c4296bfdf0b7.herokuapp.com"  # Heroku deployment
 
+# Test questions
+TEST_QUESTIONS = [
+    "Tell me about Manuel David",
+    "What projects has Manuel built?",
+    "How can I contact Manuel?",
+    "What are Manuel's skills in AI?",
+    "Tell me about the Resume Site AI project",
+    "What is Manuel's favorite food?"  # This should return "I don't know"
+]
+
 def test_health():
     """Test the health endpoint"""
     print("🔍 Testing health endpoint...")
@@ -65,22 +75,12 @@ def main():
     print("🤖 Manuel David Portfolio Chatbot Test Suite")
     print("=" * 50)
     
-    # Test questions
-    test_questions = [
-        "Tell me about Manuel David",
-        "What projects has Manuel built?",
-        "How can I contact Manuel?",
-        "What are Manuel's skills in AI?",
-        "Tell me about the Resume Site AI project",
-        "What is Manuel's favorite food?"  # This should return "I don't know"
-    ]
-    
     # Run tests
     health_ok = test_health()
     knowledge_ok = test_knowledge()
     
     chat_results = []
-    for question in test_questions:
+    for question in TEST_QUESTIONS:
         result = test_chat(question)
         chat_results.append(result)
     
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script for the local intent router
+Checks that fact questions are answered from the knowledge base, that
+project status questions get a yes or no, and that questions which only
+share a keyword with a rule fall through to the model
+"""
+
+import json
+import os
+
+from intent_router import IntentRouter
+
+KNOWLEDGE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge_base.json')
+
+ROUTED = {
+    "What is Manuel's email?": 'email',
+    "What's Manuel's phone number?": 'phone',
+    "What's his number?": 'phone',
+    "How do I get in touch with Manuel?": 'contact',
+    "What is his email and phone number?": 'contact',
+    "Where is Manuel based?": 'location',
+    "Where does Manuel live?": 'location',
+    "What is his website?": 'website',
+    "What company did Manuel found?": 'company',
+    "How many years of experience does Manuel have?": 'experience',
+    "How many websites has Manuel delivered?": 'metrics',
+    "What are Manuel's frontend skills?": 'skills',
+    "What programming languages does Manuel know?": 'skills',
+    "What projects has Manuel built?": 'projects',
+    "Is Therapist AI live?": 'project_detail',
+    "What technologies does the Cold Email SaaS use?": 'project_detail',
+}
+
+FALLS_THROUGH = [
+    # A rule's keyword, but not that rule's question
+    "Where did Manuel go to school?",
+    "Where did Manuel work before?",
+    "Does Manuel live stream?",
+    "Is Manuel available to call next week?",
+    "What number of years has he coded?",
+    "What did Manuel build at his last job?",
+    "Did Manuel build anything with Stripe?",
+    "What languages does Manuel speak?",
+    # Open-ended or spanning several intents
+    "Compare Manuel's AI projects",
+    "Why should I hire Manuel?",
+    "What are Manuel's skills and which projects use them?",
+    "What does Manuel do for fun?",
+]
+
+
+def load_router():
+    with open(KNOWLEDGE_FILE, 'r', encoding='utf-8') as f:
+        return IntentRouter(json.load(f))
+
+
+def test_fact_questions_are_routed():
+    """Questions a rule fully accounts for are answered locally"""
+    print("🔍 Testing routed questions...")
+    router = load_router()
+    for question, intent in ROUTED.items():
+        route = router.route(question)
+        assert route is not None, question
+        assert route.intent == intent, (question, route.intent)
+        assert route.confidence >= router.min_confidence and route.answer
+    info = router.knowledge['personal_info']
+    assert info['phone'] in router.route("What's Manuel's phone number?").answer
+    assert info['location'] in router.route("Where is Manuel based?").answer
+    print("✅ Routed questions test passed!")
+
+
+def test_status_questions_get_a_straight_answer():
+    """Yes/no status questions are answered yes or no, in a sentence that reads"""
+    print("🔍 Testing project status answers...")
+    router = load_router()
+    expected = {
+        "Is Therapist AI live?": "No, Therapist AI is a prototype.",
+        "Is Therapist AI a prototype?": "Yes, Therapist AI is a prototype.",
+        "Is the Cold Email SaaS a prototype?": "No, Cold Email SaaS is live.",
+        "Has the Cold Email SaaS launched?": "Yes, Cold Email SaaS is live.",
+        "What's the status of Therapist AI?": "Therapist AI is a prototype.",
+    }
+    for question, answer in expected.items():
+        route = router.route(question)
+        assert route is not None and route.intent == 'project_detail', question
+        assert route.answer == answer, (question, route.answer)
+
+    # A status the router has no sentence for is left to the model
+    router.knowledge['projects']['therapist_ai']['status'] = 'In private beta'
+    assert router.route("Is Therapist AI live?") is None
+    print("✅ Project status test passed!")
+
+
+def test_keyword_matches_fall_through():
+    """A shared keyword is not enough to answer locally"""
+    print("🔍 Testing fall-throughs...")
+    router = load_router()
+    for question in FALLS_THROUGH:
+        route = router.route(question)
+        assert route is None, (question, route.intent)
+    print("✅ Fall-through test passed!")
+
+
+def test_threshold_is_applied():
+    """Raising the threshold sends partial matches to the model too"""
+    print("🔍 Testing the confidence threshold...")
+    router = load_router()
+    route = router.route("What is Manuel's email?")
+    assert route.confidence == 0.95
+    strict = load_router()
+    strict.min_confidence = 0.96
+    assert strict.route("What is Manuel's email?") is None
+    print("✅ Threshold test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Intent Router Test Suite")
+    print("=" * 50)
+    test_fact_questions_are_routed()
+    test_status_questions_get_a_straight_answer()
+    test_keyword_matches_fall_through()
+    test_threshold_is_applied()
+    print("\n🎉 All intent router tests passed!")
+
+
+if __name__ == "__main__":
+    main()
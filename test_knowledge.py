@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for the knowledge base
+Checks validation of the knowledge file, hot reload of an edit with a new
+version, and that a bad edit is rejected while the last good version keeps
+serving
+"""
+
+import copy
+import json
+import os
+import tempfile
+import time
+
+from knowledge import KnowledgeError, KnowledgeStore, load_knowledge, validate_knowledge
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+KNOWLEDGE_PATH = os.path.join(HERE, 'knowledge_base.json')
+
+
+def build_views(knowledge):
+    return {'name': knowledge['personal_info']['name']}
+
+
+def write_knowledge(path, knowledge):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(knowledge, f)
+    # Make sure the poll sees a new mtime even on coarse-grained filesystems
+    stamp = time.time() + 1
+    os.utime(path, (stamp, stamp))
+
+
+def wait_for_poll(store):
+    time.sleep(store.poll_interval * 2)
+
+
+def test_validation():
+    """The shipped knowledge base is valid; missing or mistyped fields name their path"""
+    print("🔍 Testing knowledge validation...")
+    knowledge = load_knowledge(KNOWLEDGE_PATH)
+    validate_knowledge(knowledge)
+
+    project = next(iter(knowledge['projects']))
+    for mutate, path in [
+        (lambda k: k['personal_info'].pop('email'), 'personal_info.email'),
+        (lambda k: k['projects'][project].update(technologies='Python'), f'projects.{project}.technologies'),
+        (lambda k: k.update(skills={}), 'skills'),
+    ]:
+        candidate = copy.deepcopy(knowledge)
+        mutate(candidate)
+        try:
+            validate_knowledge(candidate)
+            raise AssertionError(f"{path} was not validated")
+        except KnowledgeError as e:
+            assert path in str(e), str(e)
+    print("✅ Validation test passed!")
+
+
+def test_edit_is_reloaded_with_a_new_version():
+    """An edit is picked up on the next poll, and the version changes even if `version` does not"""
+    print("🔍 Testing hot reload...")
+    knowledge = load_knowledge(KNOWLEDGE_PATH)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'knowledge_base.json')
+        write_knowledge(path, knowledge)
+        store = KnowledgeStore(path, build_views, poll_interval=0.01)
+        before = store.current
+        assert store.maybe_reload() is False
+
+        edited = copy.deepcopy(knowledge)
+        edited['personal_info']['name'] = 'Manuel D.'
+        write_knowledge(path, edited)
+        wait_for_poll(store)
+        assert store.maybe_reload() is True
+
+    assert store.current.views['name'] == 'Manuel D.'
+    assert store.current.version != before.version
+    assert store.current.version.startswith(f"{knowledge['version']}+")
+    # A snapshot taken before the reload still holds the old content
+    assert before.views['name'] == knowledge['personal_info']['name']
+    assert store.stats()['reloads'] == 1
+    print(f"Reloaded {before.version} -> {store.current.version}")
+    print("✅ Hot reload test passed!")
+
+
+def test_bad_edit_keeps_last_good_version():
+    """Invalid JSON or content fails the reload; the previous snapshot keeps serving"""
+    print("🔍 Testing rejection of a bad edit...")
+    knowledge = load_knowledge(KNOWLEDGE_PATH)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'knowledge_base.json')
+        write_knowledge(path, knowledge)
+        store = KnowledgeStore(path, build_views, poll_interval=0.01)
+        good = store.current
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"personal_info": ')
+        wait_for_poll(store)
+        assert store.maybe_reload() is False
+
+        invalid = copy.deepcopy(knowledge)
+        invalid['summary']['overview'] = ''
+        write_knowledge(path, invalid)
+        wait_for_poll(store)
+        assert store.maybe_reload() is False
+
+    assert store.current is good
+    assert store.stats()['reload_errors'] == 2 and store.stats()['reloads'] == 0
+    print("✅ Bad edit test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Knowledge Base Test Suite")
+    print("=" * 50)
+    test_validation()
+    test_edit_is_reloaded_with_a_new_version()
+    test_bad_edit_keeps_last_good_version()
+    print("\n🎉 All knowledge base tests passed!")
+
+
+if __name__ == "__main__":
+    main()
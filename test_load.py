@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline load-testing harness
+Checks the mock's injected latency spread, 500s and 429s, a short load run
+against the app served in-process, and that --compare flags regressions
+"""
+
+import statistics
+import threading
+
+import requests
+from werkzeug.serving import make_server
+
+# Sets up the test environment, so it is imported before app
+from conftest import using_upstream
+import app as chatbot
+from bench_load import compare, run_load, summarize
+from mock_openai import MockOpenAIServer
+
+
+def test_mock_fault_injection():
+    """Seeded draws hit the configured error and rate-limit fractions"""
+    print("🔍 Testing mock fault injection...")
+    mock = MockOpenAIServer(latency=0.1, latency_sigma=0.5, error_rate=0.1, rate_limit_rate=0.05, seed=7)
+    # Never started, so only the listening socket needs closing
+    mock._httpd.server_close()
+    draws = [mock.draw() for _ in range(10000)]
+    latencies = sorted(latency for latency, _ in draws)
+    outcomes = [outcome for _, outcome in draws]
+    print(f"500s {outcomes.count('error')}, 429s {outcomes.count('rate_limited')}, "
+          f"median {statistics.median(latencies) * 1000:.0f} ms, p99 {latencies[9900] * 1000:.0f} ms")
+    assert 900 < outcomes.count('error') < 1100
+    assert 400 < outcomes.count('rate_limited') < 600
+    assert 0.09 < statistics.median(latencies) < 0.11
+    # Long tail: a log-normal with sigma 0.5 puts p99 near 3.2x the median
+    assert latencies[9900] > 2.5 * statistics.median(latencies)
+    print("✅ Fault injection test passed!")
+
+
+def test_mock_sends_rate_limits():
+    """Rate-limited requests come back at once as 429 with Retry-After"""
+    print("🔍 Testing mock 429 responses...")
+    with MockOpenAIServer(latency=1.0, rate_limit_rate=1.0) as upstream:
+        response = requests.post(f'{upstream.url}/chat/completions', json={'messages': []}, timeout=5)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+    assert response.elapsed.total_seconds() < 0.5
+    print("✅ Rate limit response test passed!")
+
+
+def test_load_run_and_compare():
+    """A short run reports every endpoint, and a slower run is flagged against it"""
+    print("🔍 Testing a short load run...")
+    server = make_server('127.0.0.1', 0, chatbot.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    mix = {'chat': 2, 'chat_stream': 1, 'knowledge': 1, 'health': 1}
+    try:
+        with MockOpenAIServer(latency=0.02, token_delay=0.001) as upstream, using_upstream(upstream):
+            samples, elapsed = run_load(f'http://127.0.0.1:{server.server_port}', mix,
+                                        duration=1.5, concurrency=4, seed=1)
+    finally:
+        server.shutdown()
+
+    results = summarize(samples, elapsed)
+    print(f"{results['overall']['requests']} requests, {results['overall']['throughput']} ok/s")
+    assert set(results) == {'chat', 'chat_stream', 'knowledge', 'health', 'overall'}
+    assert results['overall']['error_rate'] == 0
+    assert 'ttfb_ms' in results['chat_stream']
+
+    current = {'meta': {}, 'results': results}
+    assert compare(current, current, 0.15) == []
+    slower = {'meta': {}, 'results': {'chat': dict(results['chat'], latency_ms={
+        key: value * 2 + 5 for key, value in results['chat']['latency_ms'].items()
+    })}}
+    regressions = compare(slower, current, 0.15)
+    assert any(regression.startswith('chat p95') for regression in regressions)
+    print("✅ Load run test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Load Harness Test Suite")
+    print("=" * 50)
+    test_mock_fault_injection()
+    test_mock_sends_rate_limits()
+    test_load_run_and_compare()
+    print("\n🎉 All load harness tests passed!")
+
+
+if __name__ == "__main__":
+    main()
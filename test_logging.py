@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for structured request logging
+Checks the per-request JSON line and its X-Request-ID, that streamed and
+batch requests are logged with their whole body and every question's stages,
+sampling of fast successes, and that the queue handler formats records on the
+listener thread
+"""
+
+import io
+import json
+import logging
+import threading
+import time
+
+# Sets up the test environment, so it is imported before app
+from conftest import using_upstream
+import app as chatbot
+from mock_openai import MockOpenAIServer
+import structured_logging
+from structured_logging import JsonFormatter, LoggedStage, RequestLogger
+
+
+def request_logger(**settings):
+    """A RequestLogger writing JSON lines straight into a buffer."""
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger('test.request')
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return RequestLogger(logger, **settings), stream
+
+
+def logged(request_log):
+    """App globals that send each request's line and stage timings to request_log."""
+    return {
+        'request_log': request_log,
+        'stages': {stage: LoggedStage(stage, child) for stage, child in chatbot.stages.items()},
+    }
+
+
+def lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_one_line_per_request():
+    """A chat request writes one line with its stages, cache result and the inbound request id"""
+    print("🔍 Testing the per-request line...")
+    request_log, stream = request_logger()
+    with MockOpenAIServer() as upstream, using_upstream(upstream, **logged(request_log)):
+        client = chatbot.app.test_client()
+        response = client.post('/api/chat', json={'message': 'Tell me about Manuel'},
+                               headers={'X-Request-ID': 'router-42'})
+        invalid = client.post('/api/chat', json={'message': ''}, headers={'X-Request-ID': 'not valid!'})
+
+    assert response.status_code == 200
+    assert response.headers['X-Request-ID'] == 'router-42'
+    first, second = lines(stream)
+    assert first['request_id'] == 'router-42'
+    assert first['route'] == '/api/chat' and first['status'] == 200
+    assert first['cache'] == 'miss'
+    assert set(first['stages_ms']) >= {'validate', 'cache_lookup', 'prompt_build', 'upstream', 'serialize'}
+    assert first['stages_ms']['upstream'] <= first['duration_ms']
+
+    # A malformed inbound id is replaced, not echoed
+    assert second['status'] == 400
+    assert second['request_id'] == invalid.headers['X-Request-ID'] != 'not valid!'
+    print("✅ Request line test passed!")
+
+
+def test_streams_and_batches_log_their_whole_body():
+    """Streamed routes are finished after the last chunk, batch questions add their stages from threads"""
+    print("🔍 Testing the line for streamed and batch requests...")
+    request_log, stream = request_logger()
+    with MockOpenAIServer(token_delay=0.01) as upstream, using_upstream(upstream, **logged(request_log)):
+        client = chatbot.app.test_client()
+        start = time.perf_counter()
+        streamed = client.post('/api/chat/stream', json={'message': 'Tell me about Manuel'},
+                               headers={'X-Request-ID': 'router-43'})
+        assert lines(stream) == []
+        body = streamed.get_data(as_text=True)
+        streamed.close()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        batch = client.post('/api/chat/batch', json={'messages': ['First question', 'Second question']})
+
+    assert 'event: done' in body
+    assert streamed.headers['X-Request-ID'] == 'router-43'
+    streamed_line, batch_line = lines(stream)
+    print(f"Stream took {elapsed_ms:.0f} ms, logged {streamed_line['duration_ms']:.0f} ms")
+    assert streamed_line['request_id'] == 'router-43' and streamed_line['route'] == '/api/chat/stream'
+    assert streamed_line['duration_ms'] >= elapsed_ms / 2
+    assert streamed_line['cache'] == 'miss' and 'upstream' in streamed_line['stages_ms']
+
+    assert batch.status_code == 200
+    assert batch_line['route'] == '/api/chat/batch'
+    assert batch_line['stage_counts']['upstream'] == 2
+    print("✅ Streamed and batch line test passed!")
+
+
+def test_success_sampling():
+    """Fast successes are sampled; errors and slow requests are always written"""
+    print("🔍 Testing success sampling...")
+    request_log, stream = request_logger(sample_rate=0.0, slow_ms=50)
+    for status in (200, 200, 503):
+        request_log.begin()
+        assert request_log.finish('POST', '/api/chat', status) is not None
+    assert [line['status'] for line in lines(stream)] == [503]
+    assert request_log.sampled_out == 2
+
+    # With slow_ms=0 every request counts as slow
+    request_log, stream = request_logger(sample_rate=0.0, slow_ms=0)
+    request_log.begin()
+    request_log.finish('GET', '/health', 200)
+    assert [line['route'] for line in lines(stream)] == ['/health']
+    print("✅ Sampling test passed!")
+
+
+def test_queue_handler_formats_off_thread():
+    """JSON mode hands records to the listener thread unformatted"""
+    print("🔍 Testing the queue handler...")
+    stream = io.StringIO()
+    formatted_on = []
+    original_format = JsonFormatter.format
+
+    def record_thread(self, record):
+        formatted_on.append(threading.current_thread())
+        return original_format(self, record)
+
+    JsonFormatter.format = record_thread
+    try:
+        structured_logging.configure_logging('json', 'INFO', stream=stream)
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            logging.getLogger('test').exception("Failed for %s", 'someone')
+        logging.getLogger('test').debug("dropped at the level check")
+        structured_logging.stop_logging()
+    finally:
+        JsonFormatter.format = original_format
+        structured_logging.configure_logging('text', 'INFO')
+
+    [line] = lines(stream)
+    assert line['msg'] == 'Failed for someone'
+    assert line['level'] == 'ERROR'
+    assert 'ValueError: boom' in line['exc']
+    assert formatted_on and threading.current_thread() not in formatted_on
+    print("✅ Queue handler test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Structured Logging Test Suite")
+    print("=" * 50)
+    test_one_line_per_request()
+    test_streams_and_batches_log_their_whole_body()
+    test_success_sampling()
+    test_queue_handler_formats_off_thread()
+    print("\n🎉 All structured logging tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script for the /metrics endpoint
+Checks the Prometheus text output, that a chat request records its stages,
+retries, errors and token usage, and that the SQLite store sums workers
+"""
+
+import os
+import tempfile
+import threading
+
+# Sets up the test environment, so it is imported before app
+from conftest import using_upstream
+import app as chatbot
+from metrics import MetricsRegistry, SQLiteMetricsStore, estimate_quantile
+from mock_openai import MockOpenAIServer
+from resilience import RetryPolicy
+
+
+def scrape():
+    """Parse GET /metrics into {'name{labels}': value}."""
+    response = chatbot.app.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def delta(before, after, name):
+    return after.get(name, 0) - before.get(name, 0)
+
+
+def test_histogram_rendering():
+    """Buckets are cumulative and quantiles are interpolated within buckets"""
+    print("🔍 Testing Prometheus rendering...")
+    registry = MetricsRegistry()
+    histogram = registry.histogram('demo_seconds', 'Demo', ('stage',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 5.0):
+        histogram.labels('a"b').observe(value)
+    registry.counter('demo_total', 'Demo counter').inc(2)
+
+    text = registry.render()
+    assert 'demo_seconds_bucket{stage="a\\"b",le="0.1"} 2' in text
+    assert 'demo_seconds_bucket{stage="a\\"b",le="1.0"} 3' in text
+    assert 'demo_seconds_bucket{stage="a\\"b",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{stage="a\\"b"} 4' in text
+    assert '# TYPE demo_total counter\ndemo_total 2' in text
+    assert estimate_quantile((0.1, 1.0), [2, 1, 1], 0.5) == 0.1
+    assert abs(estimate_quantile((0.1, 1.0), [2, 1, 1], 0.75) - 1.0) < 1e-9
+    print("✅ Rendering test passed!")
+
+
+def test_chat_request_recorded():
+    """A chat request shows up in the stage histograms and the token counter"""
+    print("🔍 Testing chat request instrumentation...")
+    before = scrape()
+    with MockOpenAIServer() as upstream, using_upstream(upstream):
+        response = chatbot.app.test_client().post('/api/chat', json={'message': 'Tell me about Manuel'})
+    after = scrape()
+
+    assert response.status_code == 200
+    for stage in ('validate', 'cache_lookup', 'prompt_build', 'upstream', 'upstream_attempt', 'serialize'):
+        assert delta(before, after, f'chatbot_stage_seconds_count{{stage="{stage}"}}') == 1, stage
+    assert delta(before, after, 'chatbot_requests_total{route="/api/chat",status="200"}') == 1
+    assert delta(before, after, 'chatbot_cache_lookups_total{result="miss"}') == 1
+    assert delta(before, after, 'chatbot_upstream_tokens_total{kind="completion"}') > 0
+    assert delta(before, after, 'chatbot_upstream_tokens_total{kind="prompt"}') > 0
+    print("✅ Chat instrumentation test passed!")
+
+
+def test_retries_and_errors_counted():
+    """Each failed attempt is counted by exception type, and attempts after the first as retries"""
+    print("🔍 Testing retry and error counters...")
+    before = scrape()
+    retry_policy = RetryPolicy(max_attempts=3, base_delay=0.01, jitter=False)
+    with MockOpenAIServer(error_status=500) as upstream, using_upstream(upstream, retry_policy=retry_policy):
+        response = chatbot.app.test_client().post('/api/chat', json={'message': 'Tell me about Manuel'})
+    after = scrape()
+
+    assert response.status_code == 503
+    assert delta(before, after, 'chatbot_upstream_retries_total') == 2
+    assert delta(before, after, 'chatbot_upstream_errors_total{type="APIError"}') == 3
+    assert delta(before, after, 'chatbot_stage_seconds_count{stage="upstream_attempt"}') == 3
+    assert delta(before, after, 'chatbot_requests_total{route="/api/chat",status="503"}') == 1
+    print("✅ Retry counter test passed!")
+
+
+def test_sqlite_store_sums_workers():
+    """Two registries sharing a file report the sum of both, as two workers would"""
+    print("🔍 Testing cross-worker aggregation...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'metrics.sqlite3')
+        workers = [MetricsRegistry(SQLiteMetricsStore(path)) for _ in range(2)]
+        for i, registry in enumerate(workers):
+            registry.counter('demo_total', 'Demo', ('kind',)).labels('a').inc(i + 1)
+            registry.histogram('demo_seconds', 'Demo').observe(0.01)
+        workers[0].flush()
+
+        text = workers[1].render()
+        assert 'demo_total{kind="a"} 3' in text
+        assert 'demo_seconds_count 2' in text
+    print("✅ Aggregation test passed!")
+
+
+def test_exited_threads_do_not_keep_shards():
+    """Counts from short-lived threads survive, but their per-thread shards do not pile up"""
+    print("🔍 Testing shard cleanup...")
+    registry = MetricsRegistry()
+    counter = registry.counter('demo_total', 'Demo').labels()
+    histogram = registry.histogram('demo_seconds', 'Demo').labels()
+
+    def work():
+        counter.inc()
+        histogram.observe(0.01)
+
+    for _ in range(20):
+        threads = [threading.Thread(target=work) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(counter._shards) <= 10
+    assert len(histogram._shards) <= 10
+    assert counter.value == 200
+    counts, total = histogram.counts_and_sum()
+    assert sum(counts) == 200 and abs(total - 2.0) < 1e-9
+    print("✅ Shard cleanup test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Metrics Test Suite")
+    print("=" * 50)
+    test_histogram_rendering()
+    test_chat_request_recorded()
+    test_retries_and_errors_counted()
+    test_sqlite_store_sums_workers()
+    test_exited_threads_do_not_keep_shards()
+    print("\n🎉 All metrics tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for upstream retries and the circuit breaker
+Runs the chat route against a local fake upstream (mock_openai.py) during a
+simulated outage and reports the worker time spent per request
+"""
+
+import asyncio
+import time
+
+# Sets up the test environment, so it is imported before app
+from conftest import using_upstream
+import app as chatbot
+from mock_openai import MockOpenAIServer
+from resilience import CircuitBreaker, RetryPolicy, async_call_with_retries
+
+# What retry_on_failure used to do: 3 attempts, a fixed 1s sleep, no breaker
+LEGACY_POLICY = RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=1.0, jitter=False)
+
+
+def post_chat(client, message="Tell me about Manuel David"):
+    start = time.perf_counter()
+    response = client.post('/api/chat', json={'message': message})
+    return response, time.perf_counter() - start
+
+
+def configure(upstream, policy=None, breaker=None):
+    return using_upstream(
+        upstream,
+        retry_policy=policy or RetryPolicy(base_delay=0.05, max_delay=0.2, deadline=5.0),
+        circuit_breaker=breaker or CircuitBreaker(failure_threshold=3, reset_timeout=0.5)
+    )
+
+
+def test_auth_error_not_retried():
+    """Authentication errors can never succeed, so they are tried exactly once"""
+    print("🔍 Testing that auth errors are not retried...")
+    with MockOpenAIServer(error_status=401) as upstream, configure(upstream):
+        response, _ = post_chat(chatbot.app.test_client())
+    print(f"Status: {response.status_code}, upstream calls: {upstream.calls}")
+    assert response.status_code == 503
+    assert upstream.calls == 1
+
+
+def test_retry_after_honored():
+    """A 429 with Retry-After waits at least that long before retrying"""
+    print("\n🔍 Testing Retry-After handling...")
+    policy = RetryPolicy(max_attempts=2, base_delay=0.01, deadline=5.0)
+    with MockOpenAIServer(error_status=429) as upstream, configure(upstream, policy=policy):
+        response, elapsed = post_chat(chatbot.app.test_client())
+    print(f"Status: {response.status_code}, upstream calls: {upstream.calls}, elapsed: {elapsed:.2f}s")
+    assert response.status_code == 503
+    assert upstream.calls == 2
+    assert elapsed >= 1.0
+
+
+def test_outage_worker_time():
+    """During an outage the breaker opens and requests fail fast with 503"""
+    print("\n🔍 Simulating an upstream outage...")
+    requests_during_outage = 20
+    client = chatbot.app.test_client()
+    with MockOpenAIServer(error_status=500) as upstream:
+        with configure(upstream, policy=LEGACY_POLICY, breaker=CircuitBreaker(failure_threshold=10**9)):
+            legacy_times = [post_chat(client)[1] for _ in range(2)]
+
+        upstream.calls = 0
+        with configure(upstream):
+            results = [post_chat(client) for _ in range(requests_during_outage)]
+
+    legacy_per_request = sum(legacy_times) / len(legacy_times)
+    new_total = sum(elapsed for _, elapsed in results)
+    print(f"Legacy retry: {legacy_per_request:.2f}s of worker time per request")
+    print(f"New policy: {new_total / requests_during_outage * 1000:.1f} ms per request "
+          f"({upstream.calls} upstream calls for {requests_during_outage} requests)")
+    print(f"Worker time saved over {requests_during_outage} requests: "
+          f"{legacy_per_request * requests_during_outage - new_total:.1f}s")
+    assert all(response.status_code == 503 for response, _ in results)
+    assert results[-1][0].headers.get('Retry-After')
+    assert upstream.calls <= 3
+    assert new_total < legacy_per_request
+
+
+def test_breaker_recovers():
+    """Once upstream is back, a half-open probe closes the breaker"""
+    print("\n🔍 Testing recovery after the outage...")
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.5)
+    with MockOpenAIServer(error_status=500) as upstream, configure(upstream, breaker=breaker):
+        client = chatbot.app.test_client()
+        for _ in range(3):
+            post_chat(client)
+        assert breaker.state == CircuitBreaker.OPEN
+
+        upstream.error_status = None
+        time.sleep(breaker.reset_timeout)
+        response, _ = post_chat(client)
+    print(f"Status after recovery: {response.status_code}, breaker: {breaker.state}")
+    assert response.status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_probe_frees_the_breaker():
+    """A half-open probe cancelled mid-call, e.g. at a batch deadline, lets the next request probe"""
+    print("\n🔍 Testing a cancelled half-open probe...")
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(breaker.reset_timeout)
+
+    async def slow_call(timeout):
+        await asyncio.sleep(10)
+
+    async def probe_and_cancel():
+        probe = asyncio.ensure_future(async_call_with_retries(slow_call, RetryPolicy(max_attempts=1), breaker))
+        await asyncio.sleep(0.05)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        probe.cancel()
+        try:
+            await probe
+            raise AssertionError("probe was not cancelled")
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(probe_and_cancel())
+    # Raises CircuitOpenError if the cancelled probe still counts as in flight
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    print("✅ Cancelled probe test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Upstream Resilience Test Suite")
+    print("=" * 50)
+    test_auth_error_not_retried()
+    test_retry_after_honored()
+    test_outage_worker_time()
+    test_breaker_recovers()
+    test_cancelled_probe_frees_the_breaker()
+    print("\n✅ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    main()
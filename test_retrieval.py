@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for prompt retrieval
+Checks that questions get the knowledge sections their answer needs: the
+named project or fact, every matching project for "which projects..."
+questions, and the summary for questions BM25 cannot match
+"""
+
+import json
+import os
+
+from retrieval import KnowledgeRetriever, estimate_tokens
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+with open(os.path.join(HERE, 'knowledge_base.json'), encoding='utf-8') as f:
+    KNOWLEDGE = json.load(f)
+
+RETRIEVER = KnowledgeRetriever(KNOWLEDGE, "Answer from the sections above.")
+
+
+def retrieved(question):
+    return [chunk.id for chunk in RETRIEVER.retrieve(question)]
+
+
+def projects_using(technology):
+    return {f"project:{key}" for key, project in KNOWLEDGE['projects'].items()
+            if any(technology in item for item in project['technologies'])}
+
+
+def test_specific_questions_get_their_section():
+    """A question about one thing gets that thing's section and stays within top-k"""
+    print("🔍 Testing specific questions...")
+    expected = {
+        "What's Manuel's email?": 'personal_info',
+        "What technologies does the Cold Email SaaS use?": 'project:cold_email_saas',
+        "Tell me about the Nouvo.dev Platform": 'project:nouvo_platform',
+        "What databases does Manuel use?": 'skills:databases',
+        "How many websites has Manuel delivered?": 'metrics',
+    }
+    for question, chunk_id in expected.items():
+        chunk_ids = retrieved(question)
+        assert chunk_id in chunk_ids, (question, chunk_ids)
+        # The summary rides along on top of the top-k
+        assert len(chunk_ids) <= RETRIEVER.top_k + 1, (question, chunk_ids)
+    print("✅ Specific question test passed!")
+
+
+def test_list_questions_get_every_match():
+    """"Which projects use X?" gets every project using X, not just the best three"""
+    print("🔍 Testing list questions...")
+    for technology in ('Firebase', 'React'):
+        expected = projects_using(technology)
+        assert len(expected) > RETRIEVER.top_k
+        chunk_ids = set(retrieved(f"Which projects use {technology}?"))
+        assert expected <= chunk_ids, (technology, expected - chunk_ids)
+    print("✅ List question test passed!")
+
+
+def test_summary_is_always_included():
+    """Career and open questions share no words with any section; the summary still answers them"""
+    print("🔍 Testing the summary section...")
+    for question in ("What does he want next in his career?", "What kind of roles is Manuel looking for?",
+                     "What's Manuel's email?"):
+        assert retrieved(question)[0] == 'summary', question
+    assert retrieved("Tell me about Manuel") == ['summary', 'projects:portfolio_overview']
+    prompt = RETRIEVER.build_prompt("What does he want next in his career?")
+    assert KNOWLEDGE['summary']['goal'] in prompt
+    print(f"Career question prompt: ~{estimate_tokens(prompt)} tokens")
+    print("✅ Summary test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Prompt Retrieval Test Suite")
+    print("=" * 50)
+    test_specific_questions_get_their_section()
+    test_list_questions_get_every_match()
+    test_summary_is_always_included()
+    print("\n🎉 All prompt retrieval tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for the semantic cache
+Checks that paraphrases hit and unrelated questions miss around the
+similarity threshold, that a new system prompt fingerprint empties the
+index, and that a full index overwrites its oldest entries
+"""
+
+from semantic_cache import HashedNgramVectorizer, SemanticCache, VectorIndex
+
+PROMPT = "You are a portfolio assistant."
+ANSWER = "Manuel has built the Nouvo.dev Platform, Therapist AI and more."
+
+
+def similarity(first, second):
+    vectorizer = HashedNgramVectorizer()
+    return float(vectorizer.transform(first) @ vectorizer.transform(second))
+
+
+def test_threshold_hit_and_miss():
+    """Paraphrases reuse the answer; questions below the threshold fall through"""
+    print("🔍 Testing similarity threshold...")
+    cache = SemanticCache(threshold=0.8)
+    cache.set("What projects has Manuel built?", PROMPT, ANSWER)
+    assert cache.get("What has Manuel built?", PROMPT) == ANSWER
+    assert cache.get("What's Manuel's email?", PROMPT) is None
+
+    # The same pair either side of the threshold
+    stored, asked = "What are Manuel's frontend skills?", "What are Manuel's backend skills?"
+    score = similarity(stored, asked)
+    print(f"Similarity of a near miss: {score:.3f}")
+    assert 0.0 < score < 0.8
+    for threshold, expected in ((score - 0.01, 'frontend answer'), (score + 0.01, None)):
+        cache = SemanticCache(threshold=threshold)
+        cache.set(stored, PROMPT, 'frontend answer')
+        assert cache.get(asked, PROMPT) == expected, threshold
+
+    assert cache.stats()['hits'] == 0 and cache.stats()['misses'] == 1
+    print("✅ Threshold test passed!")
+
+
+def test_prompt_change_invalidates():
+    """Answers generated from an older system prompt are dropped, not served"""
+    print("🔍 Testing invalidation on a prompt change...")
+    cache = SemanticCache()
+    cache.set("What projects has Manuel built?", PROMPT, ANSWER)
+    assert cache.get("What projects has Manuel built?", PROMPT) == ANSWER
+
+    edited = PROMPT + " Manuel also built a new project."
+    assert cache.get("What projects has Manuel built?", edited) is None
+    assert cache.stats()['size'] == 0
+    # And it does not come back under the old prompt either
+    assert cache.get("What projects has Manuel built?", PROMPT) is None
+
+    cache.set("What projects has Manuel built?", edited, 'new answer')
+    assert cache.get("What has Manuel built?", edited) == 'new answer'
+    print("✅ Invalidation test passed!")
+
+
+def test_full_index_overwrites_oldest():
+    """At capacity the index reuses the oldest row and keeps growing no further"""
+    print("🔍 Testing index capacity...")
+    vectorizer = HashedNgramVectorizer()
+    index = VectorIndex(vectorizer.dim, max_entries=2, initial_capacity=1)
+    questions = ["What's Manuel's email?", "Where is Manuel based?", "Is Therapist AI live?"]
+    for question in questions:
+        index.add(vectorizer.transform(question), question)
+    assert len(index) == 2
+    assert index.search(vectorizer.transform(questions[0]))[1] != questions[0]
+    for question in questions[1:]:
+        score, payload = index.search(vectorizer.transform(question))
+        assert payload == question and score > 0.99
+    print("✅ Capacity test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Semantic Cache Test Suite")
+    print("=" * 50)
+    test_threshold_hit_and_miss()
+    test_prompt_change_invalidates()
+    test_full_index_overwrites_oldest()
+    print("\n🎉 All semantic cache tests passed!")
+
+
+if __name__ == "__main__":
+    main()
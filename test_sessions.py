@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for multi-turn sessions
+Checks that follow-ups carry the earlier turns upstream, that history is
+trimmed to its token budget, that idle sessions are evicted, and that the
+SQLite backend is shared between workers
+"""
+
+import os
+import tempfile
+import time
+
+# Sets up the test environment, so it is imported before app
+from conftest import using_upstream
+import app as chatbot
+from mock_openai import MockOpenAIServer
+from sessions import (
+    MemorySessionBackend,
+    SessionStore,
+    SQLiteSessionBackend,
+    Turn,
+    trim_turns,
+)
+
+
+def test_follow_up_sends_history():
+    """The second question in a session reaches the model after the first exchange"""
+    print("🔍 Testing follow-up questions...")
+    client = chatbot.app.test_client()
+    with MockOpenAIServer(echo=True) as upstream, using_upstream(upstream):
+        first = client.post('/api/chat', json={'message': 'Which project used Kafka?',
+                                                'session_id': 'visitor-0001'})
+        second = client.post('/api/chat', json={'message': 'What else did it use?',
+                                                 'session_id': 'visitor-0001'})
+        sent = upstream.last_request['messages']
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert second.get_json()['session_id'] == 'visitor-0001'
+    assert [message['role'] for message in sent] == ['system', 'user', 'assistant', 'user']
+    assert sent[1]['content'] == 'Which project used Kafka?'
+    assert sent[2]['content'] == 'Answer to: Which project used Kafka?'
+    assert sent[3]['content'] == 'What else did it use?'
+    print("✅ Follow-up test passed!")
+
+
+def test_invalid_session_id():
+    """Malformed session ids are rejected before anything is stored"""
+    print("🔍 Testing session id validation...")
+    client = chatbot.app.test_client()
+    for session_id in ['short', 'has spaces in it', 12345678, 'x' * 65]:
+        response = client.post('/api/chat', json={'message': 'Hello there', 'session_id': session_id})
+        assert response.status_code == 400, session_id
+    print("✅ Session id validation test passed!")
+
+
+def test_history_trimmed_to_budget():
+    """Oldest exchanges go first; the latest one is always kept"""
+    print("🔍 Testing history truncation...")
+    turns = [Turn('user' if i % 2 == 0 else 'assistant', f'turn {i}', tokens=100) for i in range(8)]
+    kept = trim_turns(turns, 450)
+    assert [turn.content for turn in kept] == ['turn 4', 'turn 5', 'turn 6', 'turn 7']
+    assert [turn.content for turn in trim_turns(turns[-2:], 50)] == ['turn 6', 'turn 7']
+
+    store = SessionStore(MemorySessionBackend(), max_history_tokens=40)
+    for i in range(5):
+        store.append('visitor-0002', 'question ' * 10, f'answer {i} ' * 10)
+    history = store.history('visitor-0002')
+    assert len(history) == 2 and history[-1]['content'].startswith('answer 4')
+    print("✅ Truncation test passed!")
+
+
+def test_eviction():
+    """Sessions expire after their TTL and the least recently used go past max_sessions"""
+    print("🔍 Testing session eviction...")
+    backend = MemorySessionBackend(max_sessions=2, ttl=0.1)
+    store = SessionStore(backend)
+    store.append('session-a', 'q', 'a')
+    store.append('session-b', 'q', 'a')
+    store.history('session-a')
+    store.append('session-a', 'q2', 'a2')
+    store.append('session-c', 'q', 'a')
+    assert store.history('session-b') == []
+    assert len(store.history('session-a')) == 4
+    time.sleep(0.15)
+    assert store.history('session-a') == [] and store.history('session-c') == []
+    print("✅ Eviction test passed!")
+
+
+def test_sqlite_backend_shared():
+    """Two stores on one file see the same conversation, as two workers would"""
+    print("🔍 Testing SQLite session backend...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sessions.sqlite3')
+        first = SessionStore(SQLiteSessionBackend(path))
+        second = SessionStore(SQLiteSessionBackend(path))
+        first.append('visitor-0003', 'Which project used Kafka?', 'The streaming pipeline.')
+        second.append('visitor-0003', 'What else did it use?', 'Spark and Postgres.')
+        history = first.history('visitor-0003')
+        assert [message['content'] for message in history] == [
+            'Which project used Kafka?', 'The streaming pipeline.',
+            'What else did it use?', 'Spark and Postgres.'
+        ]
+        assert first.stats()['sessions'] == 1
+    print("✅ SQLite backend test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Session Test Suite")
+    print("=" * 50)
+    test_follow_up_sends_history()
+    test_invalid_session_id()
+    test_history_trimmed_to_budget()
+    test_eviction()
+    test_sqlite_backend_shared()
+    print("\n🎉 All session tests passed!")
+
+
+if __name__ == "__main__":
+    main()
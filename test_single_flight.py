@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for single-flight request coalescing
+Fires identical questions at /api/chat concurrently against a slow local fake
+upstream (mock_openai.py) with every cache off, and counts upstream calls
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Sets up the test environment, so it is imported before app
+from conftest import using_upstream
+import app as chatbot
+from mock_openai import MockOpenAIServer
+
+CONCURRENCY = 20
+
+
+def post_concurrently(messages):
+    def post(message):
+        return chatbot.app.test_client().post('/api/chat', json={'message': message})
+
+    with ThreadPoolExecutor(max_workers=len(messages)) as pool:
+        return list(pool.map(post, messages))
+
+
+def test_identical_questions_share_one_call():
+    """N identical concurrent questions cause exactly one upstream call"""
+    print("🔍 Testing single-flight coalescing...")
+    # Trivial variants normalize to the same question
+    messages = ["What projects has Manuel built?", "what projects has manuel built"] * (CONCURRENCY // 2)
+    with MockOpenAIServer(latency=0.5) as upstream, using_upstream(upstream):
+        responses = post_concurrently(messages)
+        calls = upstream.calls
+
+    print(f"{len(messages)} concurrent identical questions, {calls} upstream call(s)")
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.json['response'] for response in responses}) == 1
+    assert calls == 1
+    print("✅ Single-flight coalescing test passed!")
+
+
+def test_distinct_questions_not_coalesced():
+    """Different questions still get their own upstream calls"""
+    print("🔍 Testing distinct questions are not coalesced...")
+    messages = [f"Question number {i}" for i in range(5)]
+    with MockOpenAIServer(latency=0.2) as upstream, using_upstream(upstream):
+        responses = post_concurrently(messages)
+        calls = upstream.calls
+
+    assert all(response.status_code == 200 for response in responses)
+    assert calls == len(messages)
+    print("✅ Distinct questions test passed!")
+
+
+def test_errors_are_shared():
+    """Waiters get the leader's error instead of retrying the upstream themselves"""
+    print("🔍 Testing shared upstream errors...")
+    with MockOpenAIServer(latency=0.3, error_status=500) as upstream, using_upstream(upstream):
+        responses = post_concurrently(["Tell me about Manuel David"] * 10)
+        calls = upstream.calls
+
+    assert all(response.status_code == 503 for response in responses)
+    assert calls == 1
+    print("✅ Shared error test passed!")
+
+
+def test_async_identical_questions_share_one_call():
+    """The asyncio serving mode coalesces the same way"""
+    print("🔍 Testing single-flight coalescing in async mode...")
+    from aiohttp.test_utils import TestClient, TestServer
+    import async_app
+
+    async def run(upstream):
+        async with TestClient(TestServer(async_app.create_app())) as client:
+            responses = await asyncio.gather(*[
+                client.post('/api/chat', json={'message': "Where is Manuel based?"})
+                for _ in range(CONCURRENCY)
+            ])
+            return [(response.status, await response.json()) for response in responses]
+
+    with MockOpenAIServer(latency=0.5) as upstream, using_upstream(upstream):
+        results = asyncio.run(run(upstream))
+        calls = upstream.calls
+
+    print(f"{CONCURRENCY} concurrent identical questions, {calls} upstream call(s)")
+    assert all(status == 200 for status, _ in results)
+    assert calls == 1
+    print("✅ Async single-flight coalescing test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Single-Flight Test Suite")
+    print("=" * 50)
+    test_identical_questions_share_one_call()
+    test_distinct_questions_not_coalesced()
+    test_errors_are_shared()
+    test_async_identical_questions_share_one_call()
+    print("\n🎉 All single-flight tests passed!")
+
+
+if __name__ == "__main__":
+    main()
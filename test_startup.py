@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for cold start
+Checks that importing the app leaves the openai client to first use, and
+that `gunicorn app:app` with the preloaded master from gunicorn.conf.py
+serves chats and replaces a killed worker
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import requests
+
+from bench_startup import HERE, children, wait_for_health
+from bench_async import free_port
+from mock_openai import MockOpenAIServer
+
+
+def wait_for_workers(pid, count, replaced=None, timeout=30):
+    deadline = time.time() + timeout
+    while True:
+        workers = children(pid)
+        if len(workers) >= count and replaced not in workers:
+            return workers
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_openai_is_imported_on_first_use():
+    """import app stays light; warm_up() loads the upstream client"""
+    print("🔍 Testing lazy imports...")
+    script = (
+        "import json, sys; import app; before = 'openai' in sys.modules; app.warm_up(); "
+        "print(json.dumps([before, 'openai' in sys.modules, app.upstream.describe()['loaded']]))"
+    )
+    env = dict(os.environ, OPENAI_API_KEY='sk-test', LOG_LEVEL='ERROR')
+    output = subprocess.run([sys.executable, '-c', script], cwd=HERE, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    before, after, loaded = json.loads(output.strip().splitlines()[-1])
+    assert not before
+    assert after and loaded
+    print("✅ Lazy import test passed!")
+
+
+def test_preloaded_gunicorn_serves_and_respawns():
+    """Workers forked from the preloaded master answer chats, and so does their replacement"""
+    print("🔍 Testing gunicorn with preload_app...")
+    with MockOpenAIServer() as upstream:
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        env = dict(
+            os.environ,
+            PORT=str(port),
+            WEB_CONCURRENCY='2',
+            GUNICORN_PRELOAD='true',
+            OPENAI_API_KEY='sk-test',
+            OPENAI_API_BASE=upstream.url,
+            RESPONSE_CACHE_BACKEND='off',
+            SEMANTIC_CACHE_ENABLED='false',
+            INTENT_ROUTER_ENABLED='false',
+            ADMISSION_BACKEND='off',
+        )
+        # The Procfile command, with no flags: settings come from gunicorn.conf.py
+        process = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:app'], cwd=HERE, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_health(base_url, timeout=30)
+            for i in range(4):
+                response = requests.post(f'{base_url}/api/chat', json={'message': f'Tell me about project {i}'},
+                                         timeout=30)
+                assert response.status_code == 200
+            health = requests.get(f'{base_url}/health', timeout=30).json()
+            assert health['upstream']['loaded']
+
+            # gunicorn forks its workers a few milliseconds apart
+            workers = wait_for_workers(process.pid, 2)
+            os.kill(workers[0], signal.SIGKILL)
+            assert workers[0] not in wait_for_workers(process.pid, 2, replaced=workers[0])
+            for i in range(4):
+                response = requests.post(f'{base_url}/api/chat', json={'message': f'Tell me about skill {i}'},
+                                         timeout=30)
+                assert response.status_code == 200
+        finally:
+            process.terminate()
+            process.wait()
+        calls = upstream.calls
+    assert calls == 8
+    print("✅ Preload test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Cold Start Test Suite")
+    print("=" * 50)
+    test_openai_is_imported_on_first_use()
+    test_preloaded_gunicorn_serves_and_respawns()
+    print("\n🎉 All cold start tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for precomputed responses
+Checks strong ETags and empty 304s on If-None-Match, gzip negotiation from
+Accept-Encoding, and that /api/knowledge and / serve them with a Vary that
+includes Origin
+"""
+
+import gzip
+import json
+
+# Sets up the test environment, so it is imported before app
+import conftest  # noqa: F401
+import app as chatbot
+from static_responses import MIN_COMPRESS_SIZE, PrecomputedResponse
+
+PAYLOAD = {'projects': [f"Project {i}" for i in range(50)]}
+
+
+def test_etag_and_not_modified():
+    """The ETag is strong and stable; any current validator gets an empty 304"""
+    print("🔍 Testing ETag revalidation...")
+    response = PrecomputedResponse(PAYLOAD, cache_control='public, max-age=60')
+    assert response.etag == PrecomputedResponse(dict(PAYLOAD)).etag
+    assert response.etag.startswith('"') and not response.etag.startswith('W/')
+    assert PrecomputedResponse({'projects': []}).etag != response.etag
+
+    status, body, headers = response.render()
+    assert status == 200 and json.loads(body) == PAYLOAD
+    assert headers['ETag'] == response.etag and headers['Cache-Control'] == 'public, max-age=60'
+
+    gzip_etag = response.render(accept_encoding='gzip')[2]['ETag']
+    for if_none_match in (response.etag, f"W/{response.etag}", f'"stale", {gzip_etag}', '*'):
+        status, body, headers = response.render(if_none_match, 'gzip')
+        assert (status, body) == (304, b''), if_none_match
+        assert 'Content-Type' not in headers and 'Content-Encoding' not in headers
+    assert response.render('"stale"')[0] == 200
+    print("✅ ETag test passed!")
+
+
+def test_gzip_negotiation():
+    """gzip is served only when accepted; each encoding has its own ETag"""
+    print("🔍 Testing gzip negotiation...")
+    response = PrecomputedResponse(PAYLOAD)
+    assert len(response.body) >= MIN_COMPRESS_SIZE
+
+    status, body, headers = response.render(accept_encoding='deflate, gzip;q=0.8')
+    assert status == 200 and headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(body) == response.body
+    assert headers['ETag'] != response.etag and headers['Vary'] == 'Accept-Encoding'
+
+    for accept_encoding in (None, '', 'deflate', 'gzip;q=0', 'br;q=0, gzip; q=0.0'):
+        status, body, headers = response.render(accept_encoding=accept_encoding)
+        assert body == response.body and 'Content-Encoding' not in headers, accept_encoding
+        assert headers['ETag'] == response.etag and headers['Vary'] == 'Accept-Encoding'
+
+    # Small payloads are never compressed, so they do not vary
+    small = PrecomputedResponse({'status': 'ok'})
+    status, body, headers = small.render(accept_encoding='gzip')
+    assert body == small.body and 'Content-Encoding' not in headers and 'Vary' not in headers
+    print("✅ gzip negotiation test passed!")
+
+
+def test_flask_routes():
+    """/api/knowledge and / serve the precomputed bytes with CORS-aware Vary"""
+    print("🔍 Testing precomputed routes...")
+    client = chatbot.app.test_client()
+    # The knowledge summary is big enough to compress; the service info is not
+    for path, encoding, vary in (('/api/knowledge', 'gzip', 'Accept-Encoding, Origin'), ('/', None, 'Origin')):
+        first = client.get(path, headers={'Accept-Encoding': 'gzip'})
+        assert first.status_code == 200, path
+        assert first.headers.get('Content-Encoding') == encoding and first.headers['Vary'] == vary, path
+        data = json.loads(gzip.decompress(first.data) if encoding else first.data)
+        assert data, path
+
+        etag = first.headers['ETag']
+        again = client.get(path, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert again.status_code == 304 and again.data == b'', path
+        assert again.headers['ETag'] == etag and again.headers['Vary'] == vary
+    print("✅ Route test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Precomputed Response Test Suite")
+    print("=" * 50)
+    test_etag_and_not_modified()
+    test_gzip_negotiation()
+    test_flask_routes()
+    print("\n🎉 All precomputed response tests passed!")
+
+
+if __name__ == "__main__":
+    main()
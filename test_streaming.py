@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming chat endpoint
+Runs the app against a local fake upstream (mock_openai.py) and compares
+time-to-first-byte with total response time
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from werkzeug.serving import make_server
+
+# Sets up the test environment, so it is imported before app
+from conftest import using_upstream
+import app as chatbot
+from mock_openai import MockOpenAIServer
+
+
+@contextmanager
+def running_app(upstream):
+    with using_upstream(upstream):
+        server = make_server('127.0.0.1', 0, chatbot.app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{server.server_port}"
+        finally:
+            server.shutdown()
+
+
+def read_events(response):
+    """Yield (event, payload) for each SSE event"""
+    event = 'message'
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith('event: '):
+            event = line[len('event: '):]
+        elif line.startswith('data: '):
+            yield event, json.loads(line[len('data: '):])
+            event = 'message'
+
+
+def test_stream_time_to_first_byte():
+    """First token should arrive long before the full completion"""
+    print("🔍 Testing streaming time-to-first-byte...")
+    with MockOpenAIServer(latency=0.2, token_delay=0.03) as upstream:
+        with running_app(upstream) as base_url:
+            start = time.perf_counter()
+            response = requests.post(
+                f"{base_url}/api/chat/stream",
+                json={"message": "Tell me about Manuel David"},
+                stream=True
+            )
+            assert response.status_code == 200
+            assert response.headers['Content-Type'].startswith('text/event-stream')
+
+            first_byte = None
+            deltas = []
+            final = None
+            for event, payload in read_events(response):
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                if event == 'done':
+                    final = payload
+                else:
+                    deltas.append(payload['delta'])
+            total = time.perf_counter() - start
+
+    assert first_byte is not None, "no events were streamed"
+    print(f"Time to first byte: {first_byte * 1000:.0f} ms")
+    print(f"Total time: {total * 1000:.0f} ms")
+    assert final['status'] == 'success'
+    assert final['response'] == ''.join(deltas) == upstream.response_text
+    assert first_byte < total / 2
+
+
+def test_stream_flag_on_chat_route():
+    """`stream: true` on /api/chat behaves like /api/chat/stream"""
+    print("\n🔍 Testing stream flag on /api/chat...")
+    with MockOpenAIServer() as upstream:
+        with running_app(upstream) as base_url:
+            response = requests.post(
+                f"{base_url}/api/chat",
+                json={"message": "How can I contact Manuel?", "stream": True},
+                stream=True
+            )
+            events = [event for event, _ in read_events(response)]
+    assert response.status_code == 200
+    assert events[-1] == 'done'
+
+
+def test_stream_error_mapping():
+    """Upstream auth and rate-limit errors still map to 503"""
+    print("\n🔍 Testing streaming error mapping...")
+    for status in (401, 429):
+        with MockOpenAIServer(error_status=status) as upstream:
+            with running_app(upstream) as base_url:
+                response = requests.post(
+                    f"{base_url}/api/chat/stream",
+                    json={"message": "Tell me about Manuel David"}
+                )
+        print(f"Upstream {status} -> {response.status_code}: {response.json()['error']}")
+        assert response.status_code == 503
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Streaming Chat Test Suite")
+    print("=" * 50)
+    test_stream_time_to_first_byte()
+    test_stream_flag_on_chat_route()
+    test_stream_error_mapping()
+    print("\n✅ ALL TESTS PASSED")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test script for model tiering
+Checks that questions are sent to the tier their complexity calls for, that
+a tier over its error or latency budget hands its questions to a faster one
+until its bad samples age out, that max_tokens follows the tier table (with
+tiering off, 500 for every question), that streams are timed to their last
+chunk, and that the chosen model and max_tokens reach the upstream request
+"""
+
+import os
+import time
+
+# Sets up the test environment, so it is imported before app
+from conftest import using_upstream
+import app as chatbot
+from mock_openai import MockOpenAIServer
+from question_corpus import QUESTIONS
+from tiering import (
+    DEFAULT_TIERS,
+    SINGLE_TIER,
+    Tier,
+    TierPolicy,
+    create_tier_policy_from_env,
+    estimate_complexity,
+)
+
+FACT = "What's Manuel's phone number?"
+COMPARISON = "Compare Manuel's AI projects"
+FULL_LIST = "List every project Manuel built with the technologies used"
+COMPOUND = "Why should I hire Manuel?, and compare, his AI projects; list all"
+
+
+def make_policy(clock=None):
+    tiers = [Tier(**row) for row in DEFAULT_TIERS]
+    if clock is None:
+        return TierPolicy(tiers)
+    return TierPolicy(tiers, window=60, min_samples=3, clock=clock)
+
+
+def test_questions_pick_tiers_by_complexity():
+    """Lookups go to the fast tier, synthesis to the larger models"""
+    print("🔍 Testing tier choice...")
+    policy = make_policy()
+    assert policy.choose(FACT).tier.name == 'fast'
+    assert policy.choose("What are Manuel's skills and which projects use them?").tier.name == 'standard'
+    assert policy.choose("Why should I hire Manuel?").tier.name == 'standard'
+    assert policy.choose(COMPARISON).tier.name == 'deep'
+
+    complexity, answer_tokens = estimate_complexity("Tell me about the Nouvo.dev Platform")
+    follow_up, _ = estimate_complexity("Tell me about the Nouvo.dev Platform",
+                                       history=[{'role': 'user', 'content': 'Hi'}])
+    assert follow_up > complexity
+    assert estimate_complexity(FACT)[1] < answer_tokens
+    # Every matching word counts, not just the first: a full list is not a lookup
+    assert policy.choose(FULL_LIST).tier.name != 'fast'
+    assert estimate_complexity(FULL_LIST)[1] > estimate_complexity("What has Manuel built?")[1]
+    print("✅ Tier choice test passed!")
+
+
+def test_degraded_tier_steps_down_until_samples_age_out():
+    """Slow or failing tiers hand their questions to the next faster tier for one window"""
+    print("🔍 Testing fallback to a faster tier...")
+    now = [0.0]
+    policy = make_policy(clock=lambda: now[0])
+    deep, standard = policy.tiers[2], policy.tiers[1]
+
+    for _ in range(3):
+        policy.record(deep, deep.latency_budget * 2, True)
+    choice = policy.choose(COMPARISON)
+    assert choice.tier is standard and choice.preferred is deep
+
+    # Both larger tiers failing: all the way down to the fast tier
+    for _ in range(3):
+        policy.record(standard, 0.5, False)
+    assert policy.choose(COMPARISON).tier.name == 'fast'
+    assert policy.stats()['tiers']['standard']['degraded']
+
+    now[0] += 61
+    assert policy.choose(COMPARISON).tier is deep
+    assert policy.fallbacks == 2
+    print("✅ Fallback test passed!")
+
+
+def test_max_tokens_follow_the_table():
+    """Step-downs keep their preferred tier's cap, and no question gets more than the table allows"""
+    print("🔍 Testing max_tokens against the tier table...")
+    now = [0.0]
+    policy = make_policy(clock=lambda: now[0])
+    largest = max(tier.max_tokens for tier in policy.tiers)
+    questions = set(QUESTIONS) | {FULL_LIST, COMPOUND}
+    assert estimate_complexity(COMPOUND)[1] > largest
+    for degraded in ([], ['deep'], ['deep', 'standard']):
+        for name in degraded:
+            tier = next(tier for tier in policy.tiers if tier.name == name)
+            for _ in range(3):
+                policy.record(tier, tier.latency_budget * 2, True)
+        for question in questions:
+            choice = policy.choose(question)
+            assert choice.max_tokens == choice.preferred.max_tokens, question
+            assert choice.max_tokens >= min(choice.answer_tokens, largest), question
+            assert choice.max_tokens <= largest, question
+    # The comparison stepped down to the fast model still gets deep's cap
+    choice = policy.choose(COMPARISON)
+    assert choice.tier.name == 'fast' and choice.max_tokens == 500
+
+    # With tiering off every question is sent exactly as before tiering
+    single = TierPolicy([Tier(**row) for row in SINGLE_TIER])
+    for question in questions:
+        choice = single.choose(question)
+        assert (choice.tier.model, choice.max_tokens) == ('gpt-4', 500), question
+    print("✅ max_tokens test passed!")
+
+
+def test_streams_are_timed_to_the_last_chunk():
+    """A stream's sample covers the whole body, and an error partway through counts as a failure"""
+    print("🔍 Testing tier samples for streams...")
+    policy = make_policy()
+    fast = policy.tiers[0]
+
+    def broken_stream():
+        yield 'first'
+        raise ConnectionError("upstream went away")
+
+    with policy.track(fast, stream=True) as start:
+        chunks = policy.watch(fast, broken_stream(), start)
+    assert policy.stats()['tiers']['fast']['recent_calls'] == 0
+    try:
+        list(chunks)
+        raise AssertionError("stream error was swallowed")
+    except ConnectionError:
+        pass
+    assert policy.stats()['tiers']['fast']['recent_error_rate'] == 1.0
+
+    with MockOpenAIServer(token_delay=0.01) as upstream, using_upstream(upstream, model_tiers=make_policy()):
+        client = chatbot.app.test_client()
+        start = time.perf_counter()
+        response = client.post('/api/chat/stream', json={'message': FACT})
+        body = response.get_data(as_text=True)
+        elapsed = time.perf_counter() - start
+        fast_stats = chatbot.model_tiers.stats()['tiers']['fast']
+    print(f"Stream took {elapsed * 1000:.0f} ms, recorded {fast_stats['recent_p90_seconds'] * 1000:.0f} ms")
+    assert 'event: done' in body
+    assert fast_stats['recent_calls'] == 1
+    assert fast_stats['recent_p90_seconds'] >= elapsed / 2
+    print("✅ Stream sample test passed!")
+
+
+def test_tier_reaches_the_upstream_request():
+    """The chosen model and max_tokens are what the API is asked for"""
+    print("🔍 Testing upstream requests per tier...")
+    with MockOpenAIServer() as upstream, using_upstream(upstream, model_tiers=make_policy()):
+        client = chatbot.app.test_client()
+
+        assert client.post('/api/chat', json={'message': FACT}).status_code == 200
+        assert upstream.last_request['model'] == 'gpt-3.5-turbo'
+        assert upstream.last_request['max_tokens'] == 200
+
+        assert client.post('/api/chat', json={'message': COMPARISON}).status_code == 200
+        assert upstream.last_request['model'] == 'gpt-4'
+        assert upstream.last_request['max_tokens'] == 500
+
+        assert client.post('/api/chat', json={'message': COMPOUND}).status_code == 200
+        assert upstream.last_request['model'] == 'gpt-4'
+        assert upstream.last_request['max_tokens'] == 500
+
+        tiers = client.get('/health').get_json()['model_tiers']['tiers']
+        assert tiers['fast']['requests'] == 1 and tiers['deep']['recent_calls'] == 2
+        assert 'chatbot_model_tier_requests_total{tier="fast"}' in client.get('/metrics').get_data(as_text=True)
+
+        os.environ['MODEL_TIERING_ENABLED'] = 'false'
+        try:
+            chatbot.model_tiers = create_tier_policy_from_env()
+        finally:
+            del os.environ['MODEL_TIERING_ENABLED']
+        for message in (FACT, COMPOUND):
+            assert client.post('/api/chat', json={'message': message}).status_code == 200
+            assert upstream.last_request['model'] == 'gpt-4'
+            assert upstream.last_request['max_tokens'] == 500
+    print("✅ Upstream tier test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Model Tiering Test Suite")
+    print("=" * 50)
+    test_questions_pick_tiers_by_complexity()
+    test_degraded_tier_steps_down_until_samples_age_out()
+    test_max_tokens_follow_the_table()
+    test_streams_are_timed_to_the_last_chunk()
+    test_tier_reaches_the_upstream_request()
+    print("\n🎉 All model tiering tests passed!")
+
+
+if __name__ == "__main__":
+    main()
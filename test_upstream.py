@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled upstream client
+Checks that sync and async requests reuse kept-alive connections, that
+openai's session rotation does not drop them, and that HTTPS to a
+self-signed mock works with UPSTREAM_CA_BUNDLE
+"""
+
+import asyncio
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+# Sets up the test environment, so it is imported before app
+from conftest import using_upstream
+import app as chatbot
+from mock_openai import MockOpenAIServer, make_self_signed_cert
+from upstream import UpstreamClient
+
+
+def use_client(client):
+    """Install a client mid-process; openai only reads requestssession when a thread's session is renewed."""
+    client.install()
+    openai.api_requestor._thread_context.session_create_time = 0
+
+
+def ask(client, i):
+    response = client.post('/api/chat', json={'message': f'Tell me about project {i}'})
+    assert response.status_code == 200
+    return response
+
+
+def test_sync_requests_share_the_pool():
+    """Requests from several threads reuse at most one connection per thread, even across session rotation"""
+    print("🔍 Testing sync connection reuse...")
+    with MockOpenAIServer() as upstream, using_upstream(upstream):
+        client = chatbot.app.test_client()
+        for i in range(10):
+            ask(client, i)
+        assert upstream.connections == 1
+
+        # openai replaces a thread's session every few minutes; force that now
+        openai.api_requestor._thread_context.session_create_time = 0
+        ask(client, 10)
+        assert upstream.connections == 1
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda i: ask(chatbot.app.test_client(), i), range(40)))
+        connections = upstream.connections
+    print(f"51 requests over {connections} connection(s)")
+    assert connections <= 4
+    print("✅ Sync connection reuse test passed!")
+
+
+def test_async_requests_share_the_pool():
+    """The aiohttp serving mode keeps its upstream connection alive between requests"""
+    print("🔍 Testing async connection reuse...")
+    from aiohttp.test_utils import TestClient, TestServer
+    import async_app
+
+    async def run():
+        async with TestClient(TestServer(async_app.create_app())) as client:
+            statuses = []
+            for i in range(10):
+                response = await client.post('/api/chat', json={'message': f'Tell me about project {i}'})
+                statuses.append(response.status)
+            return statuses
+
+    with MockOpenAIServer() as upstream, using_upstream(upstream):
+        statuses = asyncio.run(run())
+        connections = upstream.connections
+    print(f"10 requests over {connections} connection(s)")
+    assert statuses == [200] * 10
+    assert connections == 1
+    print("✅ Async connection reuse test passed!")
+
+
+def test_tls_with_ca_bundle():
+    """A client trusting the mock's self-signed certificate talks HTTPS over one connection"""
+    print("🔍 Testing HTTPS to a self-signed upstream...")
+    if shutil.which('openssl') is None:
+        print("⚠️  openssl not found, skipping")
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, keyfile = make_self_signed_cert(directory)
+        with MockOpenAIServer(certfile=certfile, keyfile=keyfile) as upstream:
+            client = UpstreamClient(upstream.url, pool_size=2, ca_bundle=certfile)
+            use_client(client)
+            try:
+                for _ in range(3):
+                    response = openai.ChatCompletion.create(
+                        model='gpt-4', messages=[{'role': 'user', 'content': 'Hi'}],
+                        request_timeout=client.request_timeout(5)
+                    )
+                    assert response.choices[0].message.content
+            finally:
+                client.close()
+                use_client(chatbot.upstream)
+            connections = upstream.connections
+    assert upstream.url.startswith('https://')
+    assert connections == 1
+    print("✅ HTTPS test passed!")
+
+
+def main():
+    """Run all tests"""
+    print("🤖 Upstream Client Test Suite")
+    print("=" * 50)
+    test_sync_requests_share_the_pool()
+    test_async_requests_share_the_pool()
+    test_tls_with_ca_bundle()
+    print("\n🎉 All upstream client tests passed!")
+
+
+if __name__ == "__main__":
+    main()
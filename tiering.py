@@ -0,0 +1,273 @@
+"""
+Model tiering by question complexity.
+
+Every question used to go to gpt-4 with max_tokens=500, whether it asked for
+a phone number or a comparison of every AI project. A TierPolicy estimates
+how much reasoning a question needs and how long its answer will be, from
+its wording (no tokenizer download), and picks the first tier in a
+configurable table that covers both: a fast, cheap model with a short cap
+for lookups, gpt-4 for judgement and synthesis. A question's max_tokens is
+the cap of the tier its estimate calls for, whichever tier it lands on, and
+never more than the table allows.
+
+Each tier remembers its last 100 upstream outcomes within MODEL_TIER_WINDOW
+seconds. While a tier's error rate or p90 latency is over its budget,
+questions meant for it go to the next faster tier; once the bad samples age
+out, it gets traffic again.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from cache import normalize_message
+from intent_router import OPEN_ENDED
+from resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# (pattern, complexity, extra answer tokens, max matches): what makes a
+# question harder than a single fact, and what each distinct matching word
+# adds to the answer, up to a cap so padding cannot run up the bill
+SIGNALS = (
+    # Judgement or synthesis; "why should I hire" is still one judgement
+    (OPEN_ENDED, 0.5, 200, 1),
+    # Asking for the whole set: "list every project ... all the technologies"
+    (re.compile(r"\b(all|every|each|list|overview|everything|summar\w*)\b"), 0.15, 100, 2),
+    # A subject with many items; "projects ... built" names it twice
+    (re.compile(r"\b(projects|skills|built|stack|technologies)\b"), 0.15, 100, 1),
+    # A description rather than a fact
+    (re.compile(r"\b(tell me about|explain|describe|details?|detailed|walk me through|in depth|elaborate|"
+                r"challenges|step by step)\b"), 0.15, 100, 2),
+)
+# Another thing asked about in the same question: "skills and which projects use them"
+CLAUSE = re.compile(r"\band\b|,|;|\?\s*\S")
+MAX_CLAUSES = 4
+BASE_ANSWER_TOKENS = 60
+
+# Prices are USD per 1K tokens, used for cost reports; latency_budget is the
+# p90 in seconds above which the tier is skipped
+DEFAULT_TIERS = [
+    {'name': 'fast', 'model': 'gpt-3.5-turbo', 'max_complexity': 0.25, 'max_tokens': 200, 'temperature': 0.3,
+     'latency_budget': 6.0, 'prompt_price': 0.0005, 'completion_price': 0.0015},
+    {'name': 'standard', 'model': 'gpt-4-turbo', 'max_complexity': 0.6, 'max_tokens': 400, 'temperature': 0.7,
+     'latency_budget': 12.0, 'prompt_price': 0.01, 'completion_price': 0.03},
+    {'name': 'deep', 'model': 'gpt-4', 'max_complexity': 1.0, 'max_tokens': 500, 'temperature': 0.7,
+     'latency_budget': 25.0, 'prompt_price': 0.03, 'completion_price': 0.06},
+]
+# What every question got before tiering; used when MODEL_TIERING_ENABLED=false
+SINGLE_TIER = [
+    {'name': 'default', 'model': 'gpt-4', 'max_complexity': 1.0, 'max_tokens': 500, 'temperature': 0.7,
+     'latency_budget': 25.0, 'prompt_price': 0.03, 'completion_price': 0.06},
+]
+
+
+class Tier:
+    __slots__ = ('name', 'model', 'max_complexity', 'max_tokens', 'temperature', 'latency_budget',
+                 'prompt_price', 'completion_price')
+
+    def __init__(self, name, model, max_complexity, max_tokens, temperature=0.7, latency_budget=10.0,
+                 prompt_price=0.0, completion_price=0.0):
+        self.name = name
+        self.model = model
+        self.max_complexity = max_complexity
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.latency_budget = latency_budget
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+
+    def cost(self, prompt_tokens, completion_tokens):
+        return (prompt_tokens * self.prompt_price + completion_tokens * self.completion_price) / 1000
+
+
+class TierChoice:
+    __slots__ = ('tier', 'preferred', 'complexity', 'answer_tokens', 'max_tokens')
+
+    def __init__(self, tier, preferred, complexity, answer_tokens):
+        self.tier = tier
+        self.preferred = preferred
+        self.complexity = complexity
+        self.answer_tokens = answer_tokens
+        # A faster tier stands in for the preferred one, but must not cut its answer short;
+        # estimates past the last tier's cap still get only that cap
+        self.max_tokens = preferred.max_tokens
+
+
+def estimate_complexity(message, history=None):
+    """Return (complexity in [0, 1], expected answer tokens) for a question."""
+    text = normalize_message(message)
+    complexity = 0.0
+    answer_tokens = BASE_ANSWER_TOKENS
+    for pattern, weight, tokens, max_matches in SIGNALS:
+        matches = min(max_matches, len({match.group(0) for match in pattern.finditer(text)}))
+        complexity += weight * matches
+        answer_tokens += tokens * matches
+    # Clauses are counted on the raw message: normalizing drops the commas
+    clauses = min(MAX_CLAUSES, len(CLAUSE.findall(message.lower())))
+    complexity += min(0.3, 0.15 * clauses)
+    answer_tokens += 60 * clauses
+    # Long questions tend to carry context the answer has to address
+    complexity += min(0.2, 0.02 * max(0, len(text.split()) - 10))
+    if history:
+        # Follow-ups lean on the earlier exchange
+        complexity += 0.1
+    return min(1.0, complexity), answer_tokens
+
+
+class TierPolicy:
+    """Picks a tier per question and steps down from tiers that are over their budget."""
+
+    def __init__(self, tiers, window=60.0, min_samples=5, max_samples=100, error_budget=0.2,
+                 clock=time.monotonic):
+        if not tiers:
+            raise ValueError("At least one model tier is required")
+        self.tiers = list(tiers)
+        self.window = window
+        self.min_samples = min_samples
+        self.error_budget = error_budget
+        self.fallbacks = 0
+        self._clock = clock
+        # Bounded, so checking a tier's health stays cheap at any request rate
+        self._samples = {tier.name: deque(maxlen=max_samples) for tier in self.tiers}
+        self._requests = {tier.name: 0 for tier in self.tiers}
+        self._lock = threading.Lock()
+
+    @property
+    def default(self):
+        return self.tiers[-1]
+
+    def preferred_index(self, complexity, answer_tokens):
+        for index, tier in enumerate(self.tiers):
+            if complexity <= tier.max_complexity and answer_tokens <= tier.max_tokens:
+                return index
+        return len(self.tiers) - 1
+
+    def choose(self, message, history=None):
+        complexity, answer_tokens = estimate_complexity(message, history)
+        index = self.preferred_index(complexity, answer_tokens)
+        preferred = self.tiers[index]
+        with self._lock:
+            while index > 0 and self._degraded(self.tiers[index]):
+                index -= 1
+            tier = self.tiers[index]
+            self._requests[tier.name] += 1
+            if tier is not preferred:
+                self.fallbacks += 1
+        if tier is not preferred:
+            logger.warning("Model tier %s is over budget; using %s", preferred.name, tier.name)
+        return TierChoice(tier, preferred, complexity, answer_tokens)
+
+    def record(self, tier, latency, ok):
+        now = self._clock()
+        with self._lock:
+            samples = self._samples[tier.name]
+            samples.append((now, latency, ok))
+            self._prune(samples, now)
+
+    @contextmanager
+    def track(self, tier, stream=False):
+        """Record the latency and outcome of the upstream call made inside the block.
+
+        A streaming call returns as soon as the headers arrive, so with
+        stream=True success is not recorded here: pass the start time this
+        yields to watch() or async_watch(), which record once the stream ends.
+        """
+        start = time.perf_counter()
+        try:
+            yield start
+        except CircuitOpenError:
+            # Rejected locally; says nothing about this tier
+            raise
+        except Exception:
+            self.record(tier, time.perf_counter() - start, False)
+            raise
+        if not stream:
+            self.record(tier, time.perf_counter() - start, True)
+
+    def watch(self, tier, chunks, start):
+        """Yield a stream's chunks, then record its full duration, or its error partway through.
+
+        A client that hangs up closes the generator (GeneratorExit), which
+        records nothing: it says nothing about the tier.
+        """
+        try:
+            yield from chunks
+        except Exception:
+            self.record(tier, time.perf_counter() - start, False)
+            raise
+        self.record(tier, time.perf_counter() - start, True)
+
+    async def async_watch(self, tier, chunks, start):
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except Exception:
+            self.record(tier, time.perf_counter() - start, False)
+            raise
+        self.record(tier, time.perf_counter() - start, True)
+
+    def _prune(self, samples, now):
+        while samples and samples[0][0] < now - self.window:
+            samples.popleft()
+
+    def _health(self, tier):
+        samples = self._samples[tier.name]
+        self._prune(samples, self._clock())
+        if not samples:
+            return 0.0, 0.0, 0
+        latencies = sorted(latency for _, latency, _ in samples)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        return errors / len(samples), latencies[int(len(latencies) * 0.9)], len(samples)
+
+    def _degraded(self, tier):
+        error_rate, p90, count = self._health(tier)
+        if count < self.min_samples:
+            return False
+        return error_rate > self.error_budget or p90 > tier.latency_budget
+
+    def stats(self):
+        with self._lock:
+            tiers = {}
+            for tier in self.tiers:
+                error_rate, p90, count = self._health(tier)
+                tiers[tier.name] = {
+                    'model': tier.model,
+                    'max_tokens': tier.max_tokens,
+                    'requests': self._requests[tier.name],
+                    'recent_calls': count,
+                    'recent_error_rate': round(error_rate, 4),
+                    'recent_p90_seconds': round(p90, 3),
+                    'degraded': self._degraded(tier),
+                }
+            return {'tiers': tiers, 'fallbacks': self.fallbacks}
+
+
+def load_tiers(spec):
+    """Tiers from a JSON list of Tier fields, given inline or as a file path."""
+    spec = spec.strip()
+    if not spec.startswith('['):
+        with open(spec, 'r', encoding='utf-8') as f:
+            spec = f.read()
+    return [Tier(**row) for row in json.loads(spec)]
+
+
+def create_tier_policy_from_env():
+    """Build the tier policy from MODEL_TIER* settings; one gpt-4 tier if tiering is disabled."""
+    if os.getenv('MODEL_TIERING_ENABLED', 'true').lower() in ('0', 'false', 'off', 'no'):
+        tiers = [Tier(**row) for row in SINGLE_TIER]
+    elif os.getenv('MODEL_TIERS'):
+        tiers = load_tiers(os.getenv('MODEL_TIERS'))
+    else:
+        tiers = [Tier(**row) for row in DEFAULT_TIERS]
+    return TierPolicy(
+        tiers,
+        window=float(os.getenv('MODEL_TIER_WINDOW', 60.0)),
+        min_samples=int(os.getenv('MODEL_TIER_MIN_SAMPLES', 5)),
+        error_budget=float(os.getenv('MODEL_TIER_ERROR_BUDGET', 0.2))
+    )
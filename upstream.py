@@ -0,0 +1,174 @@
+"""
+Pooled HTTP clients for OpenAI API calls.
+
+openai 0.28 gives every thread its own requests.Session and replaces it
+every three minutes, dropping its kept-alive connections, and the async
+client opens a new aiohttp.ClientSession - a new TCP and TLS connection -
+for every call. An UpstreamClient is created once per worker and hands
+openai:
+
+- one requests.Session shared by the worker's threads, whose urllib3 pool
+  keeps up to UPSTREAM_POOL_SIZE connections to the API alive;
+- one aiohttp.ClientSession per event loop, with a connector of the same
+  size and an explicit keep-alive timeout;
+- a connect timeout separate from the read budget set by the retry policy.
+
+HTTP/2 (UPSTREAM_HTTP2=true) goes through urllib3's experimental h2
+support and needs the `h2` package; aiohttp only speaks HTTP/1.1, so the
+async path keeps pooled HTTP/1.1 connections either way.
+
+openai, requests and aiohttp take ~0.4 s to import, so they are imported on
+the first upstream call (or by app.warm_up() in a preloaded gunicorn
+master), not when a worker boots.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def make_pooled_session(pool_size, ca_bundle=None):
+    """A requests.Session that openai's periodic session rotation cannot close.
+
+    openai calls close() on its session every few minutes and builds a new
+    one; with a shared pool that would drop every thread's connections.
+    """
+    import openai
+    import requests
+
+    class PooledSession(requests.Session):
+        def merge_environment_settings(self, url, proxies, stream, verify, cert):
+            settings = super().merge_environment_settings(url, proxies, stream, verify, cert)
+            # requests lets REQUESTS_CA_BUNDLE override Session.verify; the configured bundle wins
+            if ca_bundle:
+                settings['verify'] = ca_bundle
+            return settings
+
+        def close(self):
+            pass
+
+        def shutdown(self):
+            super().close()
+
+    session = PooledSession()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_maxsize=pool_size,
+        # Same as openai's own adapter: retry connection failures, never a sent request
+        max_retries=openai.api_requestor.MAX_CONNECTION_RETRIES
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class UpstreamClient:
+    def __init__(self, base_url=None, api_key=None, pool_size=10, connect_timeout=5.0, keepalive=30.0,
+                 ca_bundle=None, http2=False):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.keepalive = keepalive
+        self.ca_bundle = ca_bundle
+        self.http2 = http2
+        self.session = None
+        self._openai = None
+        self._lock = threading.Lock()
+        self._async_session = None
+        self._async_loop = None
+
+    def install(self):
+        """Import openai and point its sync client at this worker's pool, key and base URL."""
+        import openai
+        if self.session is None:
+            self.http2 = self.http2 and enable_http2()
+            self.session = make_pooled_session(self.pool_size, self.ca_bundle)
+        if self.api_key:
+            openai.api_key = self.api_key
+        if self.base_url:
+            openai.api_base = self.base_url
+        openai.requestssession = self.session
+        self._openai = openai
+        return self
+
+    def openai(self):
+        """The openai module, installed on first use."""
+        if self._openai is None:
+            with self._lock:
+                if self._openai is None:
+                    self.install()
+        return self._openai
+
+    def request_timeout(self, read_timeout):
+        """openai's (connect, read) timeout: connect fails fast, read gets the retry budget."""
+        return (self.connect_timeout, read_timeout)
+
+    def async_session(self):
+        """The ClientSession for the running loop, created on first use."""
+        import aiohttp
+        import ssl
+
+        loop = asyncio.get_running_loop()
+        if self._async_session is None or self._async_session.closed or self._async_loop is not loop:
+            ssl_context = ssl.create_default_context(cafile=self.ca_bundle) if self.ca_bundle else True
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive,
+                ssl=ssl_context
+            )
+            self._async_session = aiohttp.ClientSession(connector=connector)
+            self._async_loop = loop
+        return self._async_session
+
+    def bind_async(self):
+        """Make openai's async client use the pooled session in the current task.
+
+        openai reads its session from a ContextVar, and each aiohttp request
+        runs in its own task context, so this is called per upstream call.
+        """
+        self.openai().aiosession.set(self.async_session())
+
+    async def aclose(self):
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
+
+    def close(self):
+        if self.session is not None:
+            self.session.shutdown()
+
+    def describe(self):
+        return {
+            'base_url': self._openai.api_base if self._openai is not None else self.base_url,
+            'loaded': self._openai is not None,
+            'pool_size': self.pool_size,
+            'connect_timeout': self.connect_timeout,
+            'http2': self.http2,
+        }
+
+
+def enable_http2():
+    """Switch urllib3 to HTTP/2 with ALPN fallback; returns whether it is available."""
+    try:
+        import h2  # noqa: F401
+        from urllib3.http2 import inject_into_urllib3
+    except ImportError:
+        logger.warning("UPSTREAM_HTTP2 needs the h2 package and urllib3>=2.3; using HTTP/1.1")
+        return False
+    inject_into_urllib3()
+    return True
+
+
+def create_upstream_client_from_env():
+    return UpstreamClient(
+        base_url=os.getenv('OPENAI_API_BASE'),
+        api_key=os.getenv('OPENAI_API_KEY'),
+        pool_size=int(os.getenv('UPSTREAM_POOL_SIZE', 10)),
+        connect_timeout=float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', 5.0)),
+        keepalive=float(os.getenv('UPSTREAM_KEEPALIVE', 30.0)),
+        ca_bundle=os.getenv('UPSTREAM_CA_BUNDLE') or None,
+        http2=os.getenv('UPSTREAM_HTTP2', 'false').lower() == 'true'
+    )